@@ -57,6 +57,66 @@ VIDEO_CONFIG_YOUTUBE = {
 # Config por defecto (reel)
 VIDEO_CONFIG = VIDEO_CONFIG_REEL
 
+# Salidas adicionales de create_reel: el fondo se decodifica una vez y split lo reparte;
+# cada salida recorta el fondo a su proporción y dibuja legendas y textos a su tamaño
+OUTPUT_TARGETS = {
+    "vertical": {"name": "vertical", "width": 1080, "height": 1920,
+                 "bitrate": VIDEO_CONFIG_REEL["bitrate"]},
+    "horizontal": {"name": "horizontal", "width": 1920, "height": 1080,
+                   "bitrate": VIDEO_CONFIG_YOUTUBE["bitrate"]},
+}
+# Salidas extra del video largo (main.py --format youtube): se componen en el mismo
+# render, cada una recortada de los clips originales (split antes del ajuste)
+YOUTUBE_OUTPUT_TARGETS = ["horizontal"]
+
+# VideoComposer.split_youtube_to_shorts: cortes del video largo en shorts verticales
+SPLIT_SHORTS_CONFIG = {
+    "segment_duration": 30.0,    # Segundos por short
+    "max_workers": 4,            # Shorts codificados a la vez (None = uno por núcleo)
+    "snap_to_keyframes": False,  # Cortes en el keyframe más cercano (solo mueve los cortes)
+    "min_duration": 10.0,        # Ningún short más corto (al ajustar a keyframes)
+    "max_duration": 60.0,        # Ni más largo (límite de YouTube Shorts)
+}
+
+# Backend de composición de VideoComposer.create_reel
+# "ffmpeg": un único filtergraph nativo (texto pre-renderizado con PIL)
+# "moviepy": composición por frame en Python (más lento, se usa como respaldo)
+COMPOSER_BACKEND = "ffmpeg"
+
+# Perfiles de render: borrador y vista previa para aprobar rápido, final para publicar
+# crf=None → calidad por defecto de libx264 (shorts) o VIDEO_CONFIG["bitrate"] (reels)
+# subtitles: "aligned" (timings del TTS o Whisper), "fast" (sin Whisper), "none"
+RENDER_PROFILES = {
+    "draft": {
+        "width": 270, "height": 480, "fps": 15,
+        "preset": "ultrafast", "crf": 36, "audio_bitrate": "64k", "subtitles": "none",
+    },
+    "preview": {
+        "width": 540, "height": 960, "fps": 30,
+        "preset": "veryfast", "crf": 30, "audio_bitrate": "96k", "subtitles": "fast",
+    },
+    "final": {
+        "width": 1080, "height": 1920, "fps": 30,
+        "preset": "fast", "crf": None, "audio_bitrate": None, "subtitles": "aligned",
+    },
+}
+
+# Formato MEZZANINE: copia normalizada de cada clip de la biblioteca
+# Todos comparten parámetros para poder concatenarse con -c copy
+MEZZANINE_CONFIG = {
+    "width": 1080,
+    "height": 1920,
+    "fps": 30,
+    "pix_fmt": "yuv420p",
+    "codec": "libx264",
+    "profile": "high",
+    "level": "4.1",
+    "preset": "medium",
+    "crf": 18,              # Casi sin pérdida: se recodifica al quemar legendas
+    "gop": 30,              # Keyframe cada 1s (GOP cerrado)
+    "dir_name": ".mezzanine",  # Subcarpeta junto a los originales
+}
+
 # ==================== CONFIGURACIÓN DE VOZ (ElevenLabs) ====================
 # Parámetros optimizados para voz NATURAL y NO ROBÓTICA
 TTS_CONFIG = {
@@ -68,6 +128,36 @@ TTS_CONFIG = {
     "use_speaker_boost": True,  # Mejora claridad sin afectar naturalidad
 }
 
+# Narraciones largas (YouTube): síntesis por fragmentos en paralelo
+TTS_CHUNK_CONFIG = {
+    "max_chars": 600,        # Caracteres máximos por fragmento (se corta en frases)
+    "max_workers": 4,        # Peticiones simultáneas (límite del plan de ElevenLabs)
+    "padding": 0.25,         # Silencio (s) entre fragmentos
+    "retries": 2,            # Reintentos por fragmento fallido
+    "request_timeout": 120,  # Timeout (s) de cada petición a ElevenLabs
+}
+
+# Conexiones HTTP del TTS
+TTS_HTTP_CONFIG = {
+    "pool_size": 8,          # Conexiones keep-alive reutilizables (>= max_workers)
+    "health_ttl": 300,       # Segundos que se reutiliza el chequeo de ElevenLabs
+    "health_timeout": 5,     # Timeout (s) del chequeo
+}
+
+# Idiomas del fan-out de shorts (generar_5_cosas): código → clave del guion, voz e idioma
+LOCALES = {
+    "ES": {"key": "short_es", "voice": "carmelo", "name": "español (España)"},
+    "EN": {"key": "short_en", "voice": "adam", "name": "English (US)"},
+    "pt-BR": {"key": "short_pt_br", "voice": "antonio_br", "name": "português do Brasil"},
+    "es-MX": {"key": "short_es_mx", "voice": "jorge", "name": "español de México"},
+}
+
+FANOUT_CONFIG = {
+    "locales": ["ES", "EN"],   # Idiomas por defecto
+    "master": "ES",            # Guion maestro del que se localizan los demás
+    "max_workers": None,       # None = según los núcleos de la máquina
+}
+
 # Voces disponibles en ElevenLabs - ÉPICAS para narración estoica
 AVAILABLE_VOICES = {
     # ⭐ VOZ PREMIUM RECOMENDADA
@@ -96,6 +186,38 @@ SUBTITLE_CONFIG = {
     "size": (900, None),  # Ancho máximo del texto
 }
 
+# ==================== LEGENDAS QUEMADAS CON FFMPEG ====================
+# "ass": un archivo .ass quemado con libass (coste por frame constante)
+# "drawtext": un filtro drawtext por palabra (alternativa sin libass)
+SUBTITLE_BACKEND = "ass"
+
+ASS_SUBTITLE_CONFIG = {
+    "font": "Impact",
+    "fontsize": 80,              # Sobre PlayResY=1920
+    "bold": False,
+    "color": "#FFFFFF",          # Palabras aún no dichas
+    "highlight_color": "#FFD400",  # Palabra que se está diciendo (karaoke)
+    "outline_color": "#000000",
+    "outline": 4,
+    "shadow": 0,
+    "alignment": 5,              # 5 = centro de la pantalla (numpad)
+    "margin_h": 80,
+    "margin_v": 0,
+    "words_per_phrase": 4,       # Palabras por frase en pantalla
+    "max_gap": 0.6,              # Pausa (s) que fuerza nueva frase
+    "fade_ms": 0,
+    "uppercase": False,
+}
+
+# ==================== WHISPER (sincronización de legendas) ====================
+WHISPER_CONFIG = {
+    "model": "tiny",               # Tamaño usado por defecto
+    "mode": "align",               # "align": alinear el guion conocido / "transcribe": transcripción libre
+    "preload": ["tiny"],           # Modelos a pre-cargar al arrancar el servidor
+    "memory_budget_mb": 1024,      # Máximo de memoria para modelos cargados
+    "idle_unload_seconds": 900,    # Descargar tras 15 min sin uso (0 = nunca)
+}
+
 # ==================== KEYWORDS PARA BUSCAR VIDEOS ====================
 VIDEO_KEYWORDS = [
     # Estoicismo y filosofía
@@ -122,6 +244,7 @@ VIDEO_KEYWORDS = [
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 TEMP_DIR = os.path.join(BASE_DIR, "temp")
+PREVIEW_DIR = os.path.join(TEMP_DIR, "previews")  # Renders draft/preview (só o último fica)
 CONTENT_DIR = os.path.join(BASE_DIR, "content")
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 
@@ -129,6 +252,9 @@ ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 IMAGE_CACHE_DIR = os.path.join(ASSETS_DIR, "image_cache")
 PREMIUM_IMAGES_DIR = os.path.join(ASSETS_DIR, "premium_images")
 
+# Índice SQLite de metadatos de la biblioteca de videos (duración, resolución, etc.)
+MEDIA_INDEX_PATH = os.path.join(ASSETS_DIR, "media_index.sqlite3")
+
 # ==================== CONFIGURACIÓN DEL CACHE ====================
 CACHE_CONFIG = {
     "enabled": True,
@@ -137,6 +263,50 @@ CACHE_CONFIG = {
     "max_cache_per_theme": 20,    # Máximo 20 imágenes por tema
 }
 
+# Smart render de shorts: segmentos por clip_N en cache, solo se recodifica lo que cambió
+SMART_RENDER_CONFIG = {
+    "enabled": True,                              # Shorts con video_sequence: render por segmentos
+    "dir": os.path.join(TEMP_DIR, "segments"),    # Cache de segmentos codificados
+    "max_mb": 2000,                               # Tamaño máximo del cache (LRU)
+    "head_seconds": 0,                            # Segmento propio al inicio (variantes de hook)
+    "tail_seconds": 4,                            # Segmento propio al final (variantes de CTA)
+}
+
+# Videos largos (YouTube): fragmentos codificados en paralelo y unidos con -c copy
+CHUNKED_RENDER_CONFIG = {
+    "enabled": True,
+    "min_duration": 90,       # Segundos; los shorts se siguen codificando en una pasada
+    "min_chunk_seconds": 10,  # Fragmentos más cortos no compensan el arranque de ffmpeg
+    "max_workers": None,      # None = un proceso por núcleo
+}
+
+# Cache de renders finales: mismo trabajo (guion, voz, secuencia, perfil, código) = mismo video
+RENDER_CACHE_CONFIG = {
+    "enabled": True,
+    "dir": os.path.join(TEMP_DIR, "render_cache"),  # Copias de los videos de OUTPUT_DIR
+    "max_mb": 5000,                                  # Tamaño máximo del cache (LRU)
+}
+
+# Fondos en loop (backend MoviePy): un ciclo decodificado y escalado una vez
+LOOP_CACHE_CONFIG = {
+    "dir": os.path.join(TEMP_DIR, "loops"),
+    "max_memory_mb": 1024,   # YUV 4:2:0 a 1080x1920: ~11s; ciclos mayores van al disco (memmap)
+    "max_disk_mb": 8000,     # Ciclos mayores usan la concatenación de MoviePy
+}
+
+# Cache de textos rasterizados (hook, CTA, autor, legendas MoviePy): PNG RGBA por contenido
+TEXT_CACHE_CONFIG = {
+    "dir": os.path.join(ASSETS_DIR, "text_cache"),
+    "max_entries": 500,   # Se expulsan los PNG usados hace más tiempo
+}
+
+# Cache de audios TTS por contenido (texto + voz + ajustes)
+TTS_CACHE_CONFIG = {
+    "enabled": True,
+    "dir": os.path.join(TEMP_DIR, "tts_cache"),
+    "max_mb": 500,      # Se expulsan los audios usados hace más tiempo
+}
+
 # Temas disponibles
 AVAILABLE_THEMES = [
     "disciplina", "estoicismo", "coraje", "resiliencia", 
@@ -145,7 +315,7 @@ AVAILABLE_THEMES = [
 ]
 
 # Crear directorios si no existen
-for dir_path in [OUTPUT_DIR, TEMP_DIR, CONTENT_DIR, ASSETS_DIR, IMAGE_CACHE_DIR, PREMIUM_IMAGES_DIR]:
+for dir_path in [OUTPUT_DIR, TEMP_DIR, PREVIEW_DIR, CONTENT_DIR, ASSETS_DIR, IMAGE_CACHE_DIR, PREMIUM_IMAGES_DIR]:
     os.makedirs(dir_path, exist_ok=True)
 
 # Crear subdirectorios del cache por tema
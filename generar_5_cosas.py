@@ -12,12 +12,20 @@ import os
 import json
 import random
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
 from modules.tts_engine import TTSEngine
-from config import OUTPUT_DIR, TEMP_DIR, ASSETS_DIR, GEMINI_API_KEY
+from modules.media_index import get_media_index
+from modules.ffmpeg_render import render_short
+from modules.mezzanine import mezzanines_for, concat_copy, render_background
+from modules.smart_render import render_segmented
+from modules.render_cache import get_render_cache, make_job_key
+from config import (OUTPUT_DIR, TEMP_DIR, PREVIEW_DIR, ASSETS_DIR, GEMINI_API_KEY, SUBTITLE_BACKEND,
+                    LOCALES, FANOUT_CONFIG, RENDER_PROFILES, SMART_RENDER_CONFIG,
+                    ASS_SUBTITLE_CONFIG, WHISPER_CONFIG, MEZZANINE_CONFIG)
 from google import genai
 
 LIBRARY_DIR = os.path.join(ASSETS_DIR, "video_library")
@@ -159,15 +167,86 @@ def generar_guion(client):
             model="gemini-2.0-flash",
             contents=prompt
         )
-        text = response.text.strip()
-        if text.startswith("```"):
-            text = text.replace("```json", "").replace("```", "")
-        return json.loads(text)
+        return parse_json_response(response.text)
     except Exception as e:
         print(f"⚠️ Erro Gemini: {e}")
         return None
 
 
+def parse_json_response(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.replace("```json", "").replace("```", "")
+    return json.loads(text)
+
+
+def get_prompt_localizacao(guion, master, codigos):
+    master_key = LOCALES[master]["key"]
+    saidas = ",\n".join(
+        f'"{LOCALES[c]["key"]}": {{"clip_1": {{"segments": [...]}}, "clip_2": {{"segments": [...]}}, '
+        f'"clip_3": {{"segments": [...]}}}}'
+        for c in codigos
+    )
+    idiomas = "\n".join(f"- {LOCALES[c]['key']}: {LOCALES[c]['name']}" for c in codigos)
+    return f'''
+Você é um LOCALIZADOR de roteiros curtos para vídeos verticais.
+
+Adapte o roteiro abaixo ({LOCALES[master]["name"]}) para CADA idioma listado.
+Não é tradução literal: use expressões naturais para o público local,
+mantendo o mesmo tom calmo, frases curtas e sem emojis.
+
+IDIOMAS:
+{idiomas}
+
+REGRAS:
+- ALINHAMENTO 1:1: o mesmo número de segments em cada clip do original.
+- Mesmo comprimento aproximado (20–35s de narração).
+- O clip_3 SEMPRE termina com CTA pedindo inscrição e notificações, no idioma local.
+
+ROTEIRO ORIGINAL:
+{json.dumps(guion[master_key], ensure_ascii=False, indent=2)}
+
+SAÍDA JSON ESTRITA no formato exato:
+{{
+{saidas}
+}}
+'''
+
+
+def localizar_guion(client, guion, codigos, master=None):
+    """
+    Gera numa ÚNICA chamada ao Gemini as versões que faltam do roteiro
+    codigos: idiomas desejados (chaves de LOCALES); os que já existem no guion são mantidos
+    Retorna uma cópia do guion com as novas chaves (short_pt_br, short_es_mx...):
+    o do chamador (p.ex. o roteiro em edição no servidor) não muda, e uma edição
+    posterior do mestre não fica com traduções antigas
+    """
+    master = master or FANOUT_CONFIG["master"]
+    faltantes = [c for c in codigos if LOCALES[c]["key"] not in guion]
+    if not faltantes:
+        return guion
+    guion = dict(guion)
+
+    print(f"🌍 Localizando roteiro para: {', '.join(faltantes)} (1 chamada)")
+    try:
+        response = client.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=get_prompt_localizacao(guion, master, faltantes)
+        )
+        data = parse_json_response(response.text)
+    except Exception as e:
+        print(f"⚠️ Erro Gemini na localização: {e}")
+        return guion
+
+    for codigo in faltantes:
+        key = LOCALES[codigo]["key"]
+        if key in data:
+            guion[key] = data[key]
+        else:
+            print(f"⚠️ Gemini não devolveu '{key}'")
+    return guion
+
+
 def segments_to_text(short_data):
     segments = []
     for clip in ["clip_1", "clip_2", "clip_3"]:
@@ -185,95 +264,192 @@ def get_audio_duration(audio_path):
 
 
 def seleccionar_videos(duracion_objetivo):
-    import glob
-    videos = glob.glob(os.path.join(LIBRARY_DIR, "*.mp4"))
+    # Durações vêm do índice de mídia (ffprobe só para arquivos novos/alterados)
+    videos = get_media_index().list_directory(LIBRARY_DIR)
     random.shuffle(videos)
 
     selected, total = [], 0
     for v in videos:
         if total >= duracion_objetivo:
             break
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", v],
-            capture_output=True, text=True
-        )
-        try:
-            d = float(result.stdout.strip())
-            selected.append(v)
-            total += d
-        except:
-            continue
+        selected.append(v["path"])
+        total += v["duration"]
     return selected
 
 
-def crear_video(audio_path, timestamp, idioma, duracion_audio, video_sequence=None, text_for_subtitles=None):
+def resolver_grupos(video_sequence):
     """
-    Cria vídeo usando sequência definida ou seleção aleatória
+    Clipes da sequência agrupados por clip_N, na ordem: [("clip_1", [paths]), ...]
+    Vídeos que não existem mais na biblioteca são ignorados
+    """
+    grupos = []
+    for clip in ["clip_1", "clip_2", "clip_3"]:
+        paths = [os.path.join(LIBRARY_DIR, v) for v in video_sequence.get(clip, [])]
+        grupos.append((clip, [p for p in paths if os.path.exists(p)]))
+    return grupos
+
+
+def resolver_videos(video_sequence, duracion_objetivo):
+    """
+    Lista de clipes de fundo: sequência definida ou seleção aleatória
     video_sequence: dict com {"clip_1": [video1, video2], "clip_2": [...], "clip_3": [...]}
-    text_for_subtitles: texto completo para gerar legendas word-by-word
     """
     if video_sequence:
         # Usa sequência ordenada manualmente
-        videos = []
-        for clip in ["clip_1", "clip_2", "clip_3"]:
-            for video_name in video_sequence[clip]:
-                video_path = os.path.join(LIBRARY_DIR, video_name)
-                if os.path.exists(video_path):
-                    videos.append(video_path)
+        videos = [p for _, paths in resolver_grupos(video_sequence) for p in paths]
         
         if not videos:
             print("⚠️ Nenhum vídeo válido na sequência")
             return None
+        return videos
+
+    # Seleção aleatória (modo antigo)
+    return seleccionar_videos(duracion_objetivo) or None
+
+
+def crear_video(audio_path, timestamp, idioma, duracion_audio, video_sequence=None, text_for_subtitles=None,
+                word_timings=None, fondo=None, profile="final", cta_text=None):
+    """
+    Cria vídeo usando sequência definida ou seleção aleatória
+    video_sequence: dict com {"clip_1": [video1, video2], "clip_2": [...], "clip_3": [...]}
+    text_for_subtitles: texto completo para gerar legendas word-by-word
+    word_timings: timings por palavra vindos do TTS (dispensam o Whisper)
+    fondo: fundo já renderizado (render_background) compartilhado entre idiomas;
+        só falta cortar, legendar e adicionar o áudio
+    profile: perfil de RENDER_PROFILES ("draft", "preview" ou "final")
+    cta_text: CTA sobreposto nos últimos SMART_RENDER_CONFIG["tail_seconds"]; no smart
+        render só o segmento final muda entre variantes (os demais vêm do cache)
+    """
+    perfil = RENDER_PROFILES[profile]
+    prefixo = "short" if profile == "final" else profile
+    # Rascunhos/previews ficam fora de OUTPUT_DIR (não entram na lista de vídeos gerados)
+    pasta = OUTPUT_DIR if profile == "final" else PREVIEW_DIR
+    output_path = os.path.join(pasta, f"{prefixo}_{idioma}_{timestamp}.mp4")
+
+    if perfil["subtitles"] == "none":
+        text_for_subtitles = None
+
+    # Cache de renders: um trabalho idêntico (reenvio, re-aprovação) não volta ao ffmpeg
+    # Só com sequência definida: a seleção aleatória nunca se repete
+    cache = get_render_cache() if video_sequence else None
+    cache_key = None
+    if cache:
+        cache_key = make_job_key(
+            {
+                "idioma": idioma, "text": text_for_subtitles, "word_timings": word_timings,
+                "video_sequence": video_sequence, "duration": round(duracion_audio, 3),
+                "profile": perfil, "subtitle_backend": SUBTITLE_BACKEND,
+                "ass_style": ASS_SUBTITLE_CONFIG, "whisper_mode": WHISPER_CONFIG.get("mode"),
+                "mezzanine": MEZZANINE_CONFIG, "cta_text": cta_text,
+            },
+            audio_files=[audio_path],
+            video_files=resolver_videos(video_sequence, duracion_audio + 1.0) or [],
+        )
+        if cache.get(cache_key, output_path):
+            print(f"♻️ Vídeo {idioma} idêntico já renderizado, reaproveitado do cache: {output_path}")
+            return output_path
+
+    ok = _renderizar_short(output_path, audio_path, idioma, duracion_audio, perfil, video_sequence,
+                           text_for_subtitles, word_timings, fondo, cta_text)
+    if ok and cache:
+        cache.put(cache_key, output_path)
+    return output_path if ok else None
+
+
+def _renderizar_short(output_path, audio_path, idioma, duracion_audio, perfil, video_sequence=None,
+                      text_for_subtitles=None, word_timings=None, fondo=None, cta_text=None):
+    """Renderiza o short em output_path (ver crear_video). Retorna True se deu certo"""
+
+    if fondo:
+        # O fundo já está no formato mezzanine: corte por -c copy ou leitura via concat
+        mezzanines = [fondo]
     else:
-        # Seleção aleatória (modo antigo)
-        videos = seleccionar_videos(duracion_audio + 1.0)
+        videos = resolver_videos(video_sequence, duracion_audio + 1.0)
         if not videos:
-            return None
+            return False
+
+        # Cópias mezzanine (1080x1920@30, mesmo GOP/codec) dispensam escala e permitem -c copy
+        mezzanines = mezzanines_for(videos)
 
-    list_file = os.path.join(TEMP_DIR, f"concat_{timestamp}_{idioma}.txt")
-    with open(list_file, "w") as f:
-        for v in videos:
-            f.write(f"file '{os.path.abspath(v)}'\n")
+    formato_mezzanine = (perfil["width"], perfil["height"], perfil["fps"]) == (
+        MEZZANINE_CONFIG["width"], MEZZANINE_CONFIG["height"], MEZZANINE_CONFIG["fps"])
+    if mezzanines and not text_for_subtitles and not cta_text and formato_mezzanine:
+        # Sem overlay nem mudança de tamanho: só concatena e adiciona o áudio, sem codificar vídeo
+        # (perfis menores, como o draft, seguem para render_short, que escala)
+        if concat_copy(mezzanines, output_path, duration=duracion_audio + 1.0, audio_path=audio_path):
+            return True
 
-    temp_video = os.path.join(TEMP_DIR, f"temp_{timestamp}_{idioma}.mp4")
-    subprocess.run([
-        "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file,
-        "-t", str(duracion_audio + 1.0),
-        "-vf", "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920",
-        "-r", "30", "-c:v", "libx264", "-preset", "fast", "-an", temp_video
-    ], capture_output=True)
+    from modules.subtitles import build_cta_filter
 
-    # Se há texto para legendas, usar FFmpeg para adicionar
     if text_for_subtitles:
-        from modules.subtitles import add_subtitles_with_ffmpeg
-        
+        from modules.subtitles import resolve_word_timings
+
         print(f"🎬 Adicionando legendas word-by-word...")
-        
-        # Primeiro, adicionar áudio ao vídeo
-        temp_with_audio = os.path.join(TEMP_DIR, f"temp_audio_{timestamp}_{idioma}.mp4")
-        subprocess.run([
-            "ffmpeg", "-y", "-i", temp_video, "-i", audio_path,
-            "-c:v", "copy", "-c:a", "aac", "-shortest", temp_with_audio
-        ], capture_output=True)
-        
-        # Depois, adicionar legendas com FFmpeg (passando audio_path para Whisper)
-        output_path = os.path.join(OUTPUT_DIR, f"short_{idioma}_{timestamp}.mp4")
-        add_subtitles_with_ffmpeg(temp_with_audio, text_for_subtitles, duracion_audio, output_path, audio_path=audio_path)
-        
-        # Limpar temporário
-        os.remove(temp_with_audio)
-    else:
-        # Modo antigo sem legendas (FFmpeg direto)
-        output_path = os.path.join(OUTPUT_DIR, f"short_{idioma}_{timestamp}.mp4")
-        subprocess.run([
-            "ffmpeg", "-y", "-i", temp_video, "-i", audio_path,
-            "-c:v", "copy", "-c:a", "aac", "-shortest", output_path
-        ], capture_output=True)
+        # Timings do TTS quando existem; senão o Whisper só alinha o roteiro (idioma conhecido)
+        # Perfil "fast": sem Whisper (timings do TTS ou distribuição uniforme)
+        word_timings = resolve_word_timings(text_for_subtitles, duracion_audio,
+                                            audio_path=audio_path if perfil["subtitles"] == "aligned" else None,
+                                            language=idioma, word_timings=word_timings)
+
+    # Smart render: com sequência definida, cada clip_N vira um segmento em cache
+    # e só os segmentos cujas entradas mudaram são codificados de novo
+    if text_for_subtitles and video_sequence and SMART_RENDER_CONFIG["enabled"] and SUBTITLE_BACKEND == "ass":
+        # Mezzanines já criadas quando existem; senão os originais (o segmento escala de qualquer forma)
+        grupos = [(clip, mezzanines_for(paths) or paths) for clip, paths in resolver_grupos(video_sequence)]
+        manifest = render_segmented(grupos, audio_path, duracion_audio + 1.0, output_path,
+                                    word_timings=word_timings, profile=perfil,
+                                    tail_filter=build_cta_filter(cta_text) if cta_text else None,
+                                    audio_bitrate=perfil["audio_bitrate"])
+        if manifest:
+            return True
+        print("⚠️ Smart render falhou, renderizando o vídeo inteiro...")
+
+    # Se há texto para legendas, montar os filtros para o mesmo filtergraph
+    # (libass com o .ass em TEMP_DIR, apagado depois; drawtext como alternativa)
+    # Nada além do .mp4 fica em OUTPUT_DIR: um acerto no cache de renders só restaura o vídeo
+    subtitle_filters = []
+    ass_path = None
+    if text_for_subtitles:
+        from modules.subtitles import build_ass_filter, build_drawtext_filter
+
+        if word_timings:
+            if SUBTITLE_BACKEND == "ass":
+                ass_path = os.path.join(TEMP_DIR, os.path.splitext(os.path.basename(output_path))[0] + ".ass")
+                subtitle_filters.append(build_ass_filter(word_timings, ass_path))
+            subtitle_filters.append(build_drawtext_filter(word_timings))
+
+    # CTA no mesmo trecho que o segmento final do smart render
+    cta_filter = None
+    if cta_text:
+        cta_filter = build_cta_filter(cta_text, start=max(duracion_audio + 1.0 - SMART_RENDER_CONFIG["tail_seconds"], 0))
+
+    # Uma única codificação: concat + escala/crop + legendas + áudio, direto em OUTPUT_DIR
+    sources = mezzanines or videos
+    ok = False
+    for subtitle_filter in subtitle_filters + [None]:
+        if subtitle_filter is None and subtitle_filters:
+            # Se as legendas falharem, gerar o vídeo sem legendas
+            print("⚠️ Falha com legendas, renderizando sem legendas...")
+        filtros = ",".join(f for f in (subtitle_filter, cta_filter) if f) or None
+        ok = render_short(sources, audio_path, duracion_audio + 1.0, output_path,
+                          subtitle_filter=filtros, normalized=bool(mezzanines),
+                          width=perfil["width"], height=perfil["height"], fps=perfil["fps"],
+                          preset=perfil["preset"], crf=perfil["crf"],
+                          audio_bitrate=perfil["audio_bitrate"])
+        if ok:
+            break
+
+    if ass_path and os.path.exists(ass_path):
+        os.remove(ass_path)
+    return ok
+
 
-    os.remove(list_file)
-    os.remove(temp_video)
-    return output_path
+def limpar_previews():
+    """Apaga os renders draft/preview anteriores (PREVIEW_DIR só guarda o último)"""
+    for nome in os.listdir(PREVIEW_DIR):
+        caminho = os.path.join(PREVIEW_DIR, nome)
+        if os.path.isfile(caminho):
+            os.remove(caminho)
 
 
 def generar_solo_guion():
@@ -287,35 +463,147 @@ def generar_solo_guion():
     return guion
 
 
-def crear_video_desde_guion(guion, timestamp=None, video_sequence=None):
+class FalhaLocales(RuntimeError):
+    """Um ou mais idiomas do fan-out falharam (falhas: {código: erro})"""
+
+    def __init__(self, falhas):
+        self.falhas = falhas
+        super().__init__("falha em " + ", ".join(f"{c} ({e})" for c, e in falhas.items()))
+
+
+def falhas_do_manifesto(manifest):
+    """Idiomas do manifesto com erro: {código: erro}"""
+    return {c: saida["error"] for c, saida in manifest["locales"].items() if saida["error"]}
+
+
+def _fanout_workers(n):
+    """Renders simultâneos: configurado ou metade dos núcleos (o x264 já usa várias threads)"""
+    return FANOUT_CONFIG["max_workers"] or max(1, min(n, (os.cpu_count() or 2) // 2))
+
+
+def _narrar(codigo, texto, timestamp):
+    print(f"📝 Texto {codigo} ({len(texto)} chars): {texto[:100]}...")
+    tts = TTSEngine(voice=LOCALES[codigo]["voice"])
+    audio, timings = tts.generate_speech(texto, f"audio_{codigo}_{timestamp}", with_timings=True)
+    duracion = get_audio_duration(audio)
+    print(f"⏱️ Duração áudio {codigo}: {duracion:.2f}s")
+    return audio, timings, duracion
+
+
+def crear_videos_multilocale(guion, locales=None, timestamp=None, video_sequence=None,
+                             fondo_compartido=True, client=None, profile="final", ctas=None):
+    """
+    Fan-out: um roteiro mestre → um short por idioma
+    1. Localiza numa única chamada ao Gemini os idiomas que faltam no guion
+    2. TTS de todos os idiomas em paralelo (rede)
+    3. Fundo renderizado uma vez na duração do áudio mais longo
+    4. Alinhamento + legendas + render de cada idioma num pool do tamanho da máquina
+
+    locales: códigos de LOCALES (padrão FANOUT_CONFIG["locales"])
+    profile: perfil de RENDER_PROFILES aplicado a todos os idiomas
+    ctas: {código: texto} do CTA sobreposto no final (ver crear_video)
+    Retorna o manifesto {timestamp, fondo_compartido, locales: {código: {...}}},
+    salvo também em OUTPUT_DIR/manifest_<timestamp>.json (PREVIEW_DIR nos perfis draft/preview)
+    """
+    locales = [c for c in (locales or FANOUT_CONFIG["locales"]) if c in LOCALES]
+    if timestamp is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if any(LOCALES[c]["key"] not in guion for c in locales):
+        client = client or genai.Client(api_key=GEMINI_API_KEY)
+        guion = localizar_guion(client, guion, locales)
+
+    textos = {c: segments_to_text(guion[LOCALES[c]["key"]]) for c in locales if LOCALES[c]["key"] in guion}
+    manifest = {"timestamp": timestamp, "profile": profile, "fondo_compartido": False, "locales": {}}
+    for codigo in locales:
+        manifest["locales"][codigo] = {
+            "voice": LOCALES[codigo]["voice"], "text": textos.get(codigo),
+            "audio": None, "duration": None, "video": None,
+            "error": None if codigo in textos else "roteiro não localizado",
+        }
+
+    # TTS: limitado pela API, não pela CPU → uma thread por idioma
+    narraciones = {}
+    if textos:
+        with ThreadPoolExecutor(max_workers=len(textos)) as pool:
+            futures = {c: pool.submit(_narrar, c, t, timestamp) for c, t in textos.items()}
+        for codigo, future in futures.items():
+            try:
+                narraciones[codigo] = future.result()
+                audio, _, duracion = narraciones[codigo]
+                manifest["locales"][codigo].update(audio=audio, duration=duracion)
+            except Exception as e:
+                print(f"❌ TTS {codigo}: {e}")
+                manifest["locales"][codigo]["error"] = f"TTS: {e}"
+
+    # Fundo único para todos os idiomas (mesma sequência, só muda a duração)
+    # Com smart render os segmentos saem direto das mezzanines e o fundo não é usado
+    smart = (video_sequence and SMART_RENDER_CONFIG["enabled"] and SUBTITLE_BACKEND == "ass"
+             and RENDER_PROFILES[profile]["subtitles"] != "none")
+    fondo = None
+    if fondo_compartido and narraciones and not smart:
+        duracion_max = max(d for _, _, d in narraciones.values()) + 1.0
+        videos = resolver_videos(video_sequence, duracion_max)
+        if videos:
+            fondo = os.path.join(TEMP_DIR, f"fondo_{timestamp}.mp4")
+            print(f"🧱 Renderizando fundo compartilhado ({', '.join(narraciones)})...")
+            if not render_background(videos, fondo, duracion_max):
+                fondo = None
+    manifest["fondo_compartido"] = bool(fondo)
+
+    with ThreadPoolExecutor(max_workers=_fanout_workers(len(narraciones) or 1)) as pool:
+        futures = {
+            codigo: pool.submit(crear_video, audio, timestamp, codigo, duracion, video_sequence,
+                                text_for_subtitles=textos[codigo], word_timings=timings, fondo=fondo,
+                                profile=profile, cta_text=(ctas or {}).get(codigo))
+            for codigo, (audio, timings, duracion) in narraciones.items()
+        }
+    for codigo, future in futures.items():
+        try:
+            manifest["locales"][codigo]["video"] = future.result()
+            if not manifest["locales"][codigo]["video"]:
+                manifest["locales"][codigo]["error"] = "render falhou"
+        except Exception as e:
+            print(f"❌ Render {codigo}: {e}")
+            manifest["locales"][codigo]["error"] = f"render: {e}"
+
+    if fondo and os.path.exists(fondo):
+        os.remove(fondo)
+
+    sufixo = "" if profile == "final" else f"_{profile}"
+    manifest_path = os.path.join(OUTPUT_DIR if profile == "final" else PREVIEW_DIR,
+                                 f"manifest_{timestamp}{sufixo}.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"🗂️ Manifesto: {manifest_path}")
+    return manifest
+
+
+def crear_video_desde_guion(guion, timestamp=None, video_sequence=None, fondo_compartido=True,
+                            locales=None, profile="final"):
     """
     STEP 2: Cria vídeos a partir de um roteiro já aprovado
     video_sequence: dict com sequência de vídeos por clip
     Exemplo: {"clip_1": ["video1.mp4", "video2.mp4"], ...}
+    fondo_compartido: renderiza o fundo uma única vez (na duração do áudio
+        mais longo) e cada idioma só recebe legendas + áudio
+    locales: idiomas a gerar (padrão FANOUT_CONFIG["locales"], ES e EN)
+    profile: "draft"/"preview" para conferir o corte rápido, "final" para publicar
+        (o áudio do preview fica no cache TTS e é reaproveitado no final)
+
+    Lança FalhaLocales se algum idioma falhou (TTS, localização ou render),
+    para o chamador (servidor) não reportar sucesso
     """
-    if timestamp is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
     print("🎬 Criando vídeos a partir do roteiro aprovado...")
     
     try:
-        # ESPANHOL
-        text_es = segments_to_text(guion["short_es"])
-        print(f"📝 Texto ES completo ({len(text_es)} chars): {text_es[:100]}...")
-        tts_es = TTSEngine(voice="carmelo")
-        audio_es = tts_es.generate_speech(text_es, f"audio_ES_{timestamp}")
-        dur_es = get_audio_duration(audio_es)
-        print(f"⏱️ Duração áudio ES: {dur_es:.2f}s")
-        crear_video(audio_es, timestamp, "ES", dur_es, video_sequence, text_for_subtitles=text_es)
-
-        # INGLÊS
-        text_en = segments_to_text(guion["short_en"])
-        print(f"📝 Texto EN completo ({len(text_en)} chars): {text_en[:100]}...")
-        tts_en = TTSEngine(voice="adam")
-        audio_en = tts_en.generate_speech(text_en, f"audio_EN_{timestamp}")
-        dur_en = get_audio_duration(audio_en)
-        print(f"⏱️ Duração áudio EN: {dur_en:.2f}s")
-        crear_video(audio_en, timestamp, "EN", dur_en, video_sequence, text_for_subtitles=text_en)
+        manifest = crear_videos_multilocale(guion, locales, timestamp, video_sequence,
+                                            fondo_compartido=fondo_compartido, profile=profile)
+        falhas = falhas_do_manifesto(manifest)
+        for codigo, erro in falhas.items():
+            print(f"❌ {codigo}: {erro}")
+        if falhas:
+            raise FalhaLocales(falhas)
 
         print("✅ Shorts gerados com sucesso")
         print(f"📂 Output: {OUTPUT_DIR}")
@@ -329,6 +617,7 @@ def crear_video_desde_guion(guion, timestamp=None, video_sequence=None):
 def main():
     """
     Modo automático completo (geração + criação de vídeo)
+    Retorna True se todos os idiomas foram gerados
     """
     print("🎬 GENERADOR DE SHORTS – NARCISISMO & RELAÇÕES TÓXICAS")
     print("=" * 60)
@@ -336,17 +625,22 @@ def main():
     guion = generar_solo_guion()
     if not guion:
         print("❌ Falha ao gerar roteiro")
-        return
+        return False
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    crear_video_desde_guion(guion, timestamp)
+    try:
+        return crear_video_desde_guion(guion, timestamp)
+    except FalhaLocales as e:
+        # Os idiomas que deram certo já estão em OUTPUT_DIR
+        print(f"❌ Idiomas com falha: {', '.join(e.falhas)}")
+        return False
 
 
 def gerar_shorts():
     """
     Função pública para execução via interface (Flask, botão, etc.)
     """
-    main()
+    return main()
 
 
 if __name__ == "__main__":
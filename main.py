@@ -23,7 +23,8 @@ from modules.content_generator import ContentGenerator
 from modules.tts_engine import TTSEngine
 from modules.video_composer import VideoComposer
 from modules.image_generator import ImageGenerator
-from config import OUTPUT_DIR, ELEVENLABS_API_KEY, GEMINI_API_KEY
+from modules.media_index import get_media_index
+from config import ELEVENLABS_API_KEY, GEMINI_API_KEY, YOUTUBE_OUTPUT_TARGETS
 
 
 def check_api_keys():
@@ -125,8 +126,7 @@ def generate_video(theme: str = "estoicismo", voice: str = "carmelo") -> str:
     audio_path = tts.generate_speech(narration, f"audio_{timestamp}")
     
     # Obtener duración del audio
-    from moviepy.editor import AudioFileClip, VideoFileClip, concatenate_videoclips
-    import glob
+    from moviepy.editor import AudioFileClip
     import random
     
     audio_clip = AudioFileClip(audio_path)
@@ -134,8 +134,9 @@ def generate_video(theme: str = "estoicismo", voice: str = "carmelo") -> str:
     audio_clip.close()
     
     # USAR BIBLIOTECA DE VIDEOS (no generar nuevos)
+    # Las duraciones salen del índice de medios, sin abrir cada clip
     LIBRARY_DIR = os.path.join(os.path.dirname(__file__), "assets", "video_library")
-    library_videos = glob.glob(os.path.join(LIBRARY_DIR, "*.mp4"))
+    library_videos = get_media_index().list_directory(LIBRARY_DIR)
     
     print(f"\n[4/5] Seleccionando videos de la biblioteca...")
     print(f"    📚 Videos disponibles: {len(library_videos)}")
@@ -153,50 +154,24 @@ def generate_video(theme: str = "estoicismo", voice: str = "carmelo") -> str:
     for v in library_videos:
         if total_video_duration >= audio_duration:
             break
-        motion_videos.append(v)
-        clip = VideoFileClip(v)
-        total_video_duration += clip.duration
-        clip.close()
+        motion_videos.append(v["path"])
+        total_video_duration += v["duration"]
     
     print(f"    ✓ Seleccionados: {len(motion_videos)} videos ({total_video_duration:.1f}s)")
     
     if motion_videos:
         print(f"\n✓ {len(motion_videos)} videos de biblioteca seleccionados")
-        
-        # Concatenar videos
-        print("🎬 Concatenando videos...")
-        clips = [VideoFileClip(v) for v in motion_videos]
-        
-        # Loop videos hasta cubrir duración del audio
-        total_motion_duration = sum(c.duration for c in clips)
-        if total_motion_duration < audio_duration:
-            loops_needed = int(audio_duration / total_motion_duration) + 1
-            clips = clips * loops_needed
-        
-        concat_clip = concatenate_videoclips(clips, method="compose")
-        concat_clip = concat_clip.subclip(0, min(audio_duration, concat_clip.duration))
-        
-        # Resize a 1080x1920
-        concat_clip = concat_clip.resize((1080, 1920))
-        
-        temp_video_path = os.path.join(OUTPUT_DIR, f"temp_motion_{timestamp}.mp4")
-        concat_clip.write_videofile(temp_video_path, fps=composer.fps, codec="libx264")
-        
-        for c in clips:
-            c.close()
-        concat_clip.close()
-        
-        video_path = temp_video_path
     else:
         print("❌ No hay videos en la biblioteca")
         return None
     
     # Componer reel final con audio
+    # Los clips se concatenan, repiten y escalan dentro del mismo render (una sola codificación)
     print("\n[5/5] Componiendo video final con audio...")
     output_name = f"reel_{theme}_{timestamp}"
         
     output_path = composer.create_reel(
-        background_video=video_path,
+        background_video=motion_videos,
         audio_path=audio_path,
         subtitles_text=None,
         author=None,
@@ -206,10 +181,6 @@ def generate_video(theme: str = "estoicismo", voice: str = "carmelo") -> str:
         username=None
     )
     
-    # Limpiar archivos temporales
-    if os.path.exists(video_path) and "temp" in video_path:
-        os.remove(video_path)
-    
     elapsed = time.time() - start_time
     print("\n" + "=" * 50)
     print(f"✅ VIDEO GENERADO EXITOSAMENTE")
@@ -263,10 +234,11 @@ def generate_youtube_video(theme: str = "estoicismo", voice: str = "carmelo") ->
     # Generar audio completo
     print("\n[3/6] Generando audio (~7 minutos)...")
     full_narration = content_gen.get_youtube_narration(scripts)
-    audio_path = tts.generate_speech(full_narration, f"youtube_audio_{timestamp}")
+    # Por fragmentos en paralelo: más rápido y un fallo solo repite su fragmento
+    audio_path, _ = tts.generate_speech_chunked(full_narration, f"youtube_audio_{timestamp}")
     
     # Obtener duración del audio
-    from moviepy.editor import AudioFileClip, VideoFileClip, concatenate_videoclips
+    from moviepy.editor import AudioFileClip
     audio_clip = AudioFileClip(audio_path)
     audio_duration = audio_clip.duration + 2.0
     audio_clip.close()
@@ -287,35 +259,14 @@ def generate_youtube_video(theme: str = "estoicismo", voice: str = "carmelo") ->
     
     print(f"\n✓ {len(motion_videos)} videos Motion disponibles")
     
-    # Concatenar videos
-    print("\n[5/6] Concatenando videos...")
-    clips = [VideoFileClip(v) for v in motion_videos]
-    
-    # Loop videos hasta cubrir duración del audio
-    total_motion_duration = sum(c.duration for c in clips)
-    if total_motion_duration < audio_duration:
-        loops_needed = int(audio_duration / total_motion_duration) + 1
-        clips = clips * loops_needed
-    
-    concat_clip = concatenate_videoclips(clips, method="compose")
-    concat_clip = concat_clip.subclip(0, min(audio_duration, concat_clip.duration))
-    
-    # Resize a 1080x1920 (vertical)
-    concat_clip = concat_clip.resize((1080, 1920))
-    
-    temp_video_path = os.path.join(OUTPUT_DIR, f"temp_youtube_{timestamp}.mp4")
-    concat_clip.write_videofile(temp_video_path, fps=composer.fps, codec="libx264")
-    
-    for c in clips:
-        c.close()
-    concat_clip.close()
-    
     # Componer video final con audio
-    print("\n[6/6] Añadiendo audio...")
+    # El fondo (concatenado, en loop y a 1080x1920) se arma dentro del mismo render
+    print(f"\n[5/6] Fondo: timeline de {len(motion_videos)} clips (sin archivo temporal)")
+    print("\n[6/6] Componiendo video final con audio...")
     output_name = f"youtube_{theme}_{timestamp}"
     
     output_path = composer.create_reel(
-        background_video=temp_video_path,
+        background_video=motion_videos,
         audio_path=audio_path,
         subtitles_text=None,
         author=None,
@@ -323,13 +274,11 @@ def generate_youtube_video(theme: str = "estoicismo", voice: str = "carmelo") ->
         hook_text=None,
         cta_text=None,
         username=None,
-        target_resolution=(1080, 1920)
+        target_resolution=(1080, 1920),
+        # Versión horizontal del mismo render (un solo decode, solo otra codificación)
+        targets=YOUTUBE_OUTPUT_TARGETS
     )
     
-    # Limpiar temporal
-    if os.path.exists(temp_video_path):
-        os.remove(temp_video_path)
-    
     elapsed = time.time() - start_time
     print("\n" + "=" * 60)
     print("✅ VIDEO YOUTUBE GENERADO EXITOSAMENTE")
@@ -5,5 +5,6 @@ from .content_generator import ContentGenerator
 from .tts_engine import TTSEngine
 from .video_composer import VideoComposer
 from .image_generator import ImageGenerator
+from .media_index import MediaIndex
 
-__all__ = ['ContentGenerator', 'TTSEngine', 'VideoComposer', 'ImageGenerator']
+__all__ = ['ContentGenerator', 'TTSEngine', 'VideoComposer', 'ImageGenerator', 'MediaIndex']
@@ -0,0 +1,189 @@
+"""
+Codificación por fragmentos en paralelo para videos largos
+La línea de tiempo se corta en intervalos fijos alineados al segundo (keyframe
+de las mezzanines), cada fragmento se codifica en su propio proceso ffmpeg
+(sin audio) y se unen con el demuxer concat + -c copy añadiendo el audio
+Un render de ~7 minutos escala casi linealmente con el número de núcleos
+"""
+import os
+import json
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from config import CHUNKED_RENDER_CONFIG, TEMP_DIR
+from modules.ffmpeg_render import run_ffmpeg, write_concat_list, fan_out_concat
+from modules.media_index import get_media_index
+from modules.mezzanine import is_fresh, mezzanine_path
+
+
+def chunk_workers() -> int:
+    """Procesos ffmpeg simultáneos (por defecto uno por núcleo)"""
+    return CHUNKED_RENDER_CONFIG["max_workers"] or os.cpu_count() or 1
+
+
+def should_chunk(duration: float) -> bool:
+    """True si el video es lo bastante largo para repartirlo entre núcleos"""
+    cfg = CHUNKED_RENDER_CONFIG
+    return cfg["enabled"] and duration >= cfg["min_duration"] and chunk_workers() > 1
+
+
+def plan_chunks(timeline: list, duration: float, workers: int = None) -> list:
+    """
+    Corta la línea de tiempo en fragmentos de igual duración
+
+    Args:
+        timeline: Clips en orden (ya repetidos hasta cubrir la duración)
+        duration: Duración total
+        workers: Procesos disponibles (un fragmento por proceso como mínimo)
+
+    Returns:
+        Lista de dicts {start, end, clips: [{path, inpoint, length}]}; los
+        cortes caen en segundos enteros (frame exacto y keyframe mezzanine)
+    """
+    workers = workers or chunk_workers()
+    step = max(CHUNKED_RENDER_CONFIG["min_chunk_seconds"], duration / workers)
+    step = max(round(step), 1)
+
+    index = get_media_index()
+    spans = []
+    t = 0.0
+    for clip in timeline:
+        d = index.get_duration(clip) or 0.0
+        spans.append((clip, t, t + d))
+        t += d
+
+    chunks = []
+    start = 0.0
+    while start < duration - 1e-6:
+        end = min(start + step, duration)
+        # Un resto muy corto se suma al fragmento anterior
+        if duration - end < step / 2:
+            end = duration
+        chunks.append({
+            "start": start, "end": end,
+            "clips": [{"path": clip, "inpoint": max(start - s, 0.0),
+                       "length": min(end, e) - max(start, s)}
+                      for clip, s, e in spans if s < end and e > start],
+        })
+        start = end
+    return chunks
+
+
+def chunk_inputs(chunk: dict, sizes: list, fps: int) -> tuple:
+    """
+    Entradas y filtergraph del fondo de un fragmento
+    Los timestamps se desplazan al tiempo global del video, así que los
+    filtros que dependen del tiempo (fade, enable, ass) no cambian
+
+    Args:
+        sizes: (width, height) de cada lienzo; con varios, cada clip se
+            reparte con split antes del ajuste (las mezzanines, ya
+            recortadas a vertical, solo se usan con un lienzo)
+
+    Returns:
+        (argumentos de entrada, filtergraph que termina en [bg0], [bg1]..., nº de entradas)
+    """
+    args = []
+    for clip in chunk["clips"]:
+        use_mezzanine = len(sizes) == 1 and is_fresh(clip["path"])
+        path = mezzanine_path(clip["path"]) if use_mezzanine else clip["path"]
+        args += ["-ss", f"{clip['inpoint']:.3f}", "-t", f"{clip['length']:.3f}", "-i", path]
+
+    n = len(chunk["clips"])
+    length = chunk["end"] - chunk["start"]
+    tail = f"trim=duration={length:.3f},setpts=PTS-STARTPTS+{chunk['start']:.3f}/TB"
+    return args, fan_out_concat(n, sizes, fps, tail), n
+
+
+def probe_streams(path: str) -> dict:
+    """Inicio y duración de cada tipo de stream ({"video": (start, dur), ...})"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json",
+         "-show_entries", "stream=codec_type,start_time,duration", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {}
+    streams = {}
+    for s in json.loads(result.stdout).get("streams", []):
+        streams.setdefault(s.get("codec_type"),
+                           (float(s.get("start_time") or 0), float(s.get("duration") or 0)))
+    return streams
+
+
+def check_continuity(output_path: str, duration: float, fps: int, num_chunks: int,
+                     has_audio: bool = True) -> bool:
+    """
+    Verifica la unión: video y audio empiezan en 0 y el video dura lo
+    previsto (como mucho un frame de desvío por fragmento)
+    """
+    streams = probe_streams(output_path)
+    video = streams.get("video")
+    if not video:
+        print("⚠️ Unión de fragmentos sin stream de video")
+        return False
+
+    tolerance = num_chunks / fps + 1e-3
+    problems = []
+    if abs(video[0]) > 1.0 / fps:
+        problems.append(f"video empieza en {video[0]:.3f}s")
+    if abs(video[1] - duration) > tolerance:
+        problems.append(f"video dura {video[1]:.3f}s (esperado {duration:.3f}s)")
+    if has_audio:
+        audio = streams.get("audio")
+        if not audio:
+            problems.append("falta el audio")
+        elif abs(audio[0]) > 1.0 / fps:
+            problems.append(f"audio empieza en {audio[0]:.3f}s")
+
+    if problems:
+        print(f"⚠️ Unión de fragmentos discontinua: {', '.join(problems)}")
+        return False
+    return True
+
+
+def render_chunks(commands: list, workers: int = None) -> bool:
+    """
+    Lanza los comandos ffmpeg de los fragmentos en paralelo
+
+    Args:
+        commands: Un comando completo por fragmento (cada uno es su propio proceso)
+
+    Returns:
+        True si todos terminaron bien
+    """
+    workers = min(workers or chunk_workers(), len(commands))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            lambda item: run_ffmpeg(item[1], f"fragmento {item[0] + 1}/{len(commands)}"),
+            enumerate(commands)
+        ))
+    return all(results)
+
+
+def chunk_dir(name: str) -> str:
+    """Directorio temporal de los fragmentos de un render"""
+    path = os.path.join(TEMP_DIR, f"chunks_{name}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def join_chunks(paths: list, audio_path: str, output_path: str, duration: float,
+                audio_codec: str = "aac", audio_bitrate: str = None) -> bool:
+    """Une los fragmentos con -c copy y añade el audio (la única codificación de audio)"""
+    name = os.path.splitext(os.path.basename(output_path))[0]
+    list_file = write_concat_list(paths, f"{name}_chunks")
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a", "-c:a", audio_codec]
+        if audio_bitrate:
+            cmd += ["-b:a", audio_bitrate]
+    cmd += ["-c:v", "copy", "-t", f"{duration:.3f}", "-movflags", "+faststart", output_path]
+    ok = run_ffmpeg(cmd, "unión de fragmentos")
+    os.remove(list_file)
+    return ok
+
+
+def cleanup(name: str):
+    """Borra los fragmentos de un render"""
+    shutil.rmtree(os.path.join(TEMP_DIR, f"chunks_{name}"), ignore_errors=True)
@@ -0,0 +1,264 @@
+"""
+Render directo con FFmpeg
+Construye un único filtergraph (concat + escala/recorte + legendas + audio)
+para producir el video final con una sola codificación
+"""
+import os
+import subprocess
+from config import TEMP_DIR, MEZZANINE_CONFIG
+
+
+def run_ffmpeg(cmd: list, description: str = "FFmpeg") -> bool:
+    """
+    Ejecuta un comando ffmpeg y muestra el final del stderr si falla
+
+    Returns:
+        True si ffmpeg terminó bien
+    """
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"⚠️ Error en {description}: {result.stderr[-1500:]}")
+        return False
+    return True
+
+
+def media_duration(path: str) -> float:
+    """
+    Duración (s) de un archivo con ffprobe, sin pasar por el índice de medios
+    Para archivos fuera de la biblioteca (narraciones, renders temporales)
+
+    Returns:
+        Duración, o None si ffprobe falla
+    """
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        capture_output=True, text=True
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def keyframe_times(path: str) -> list:
+    """
+    Instantes (s) de los keyframes del primer stream de video
+    Lee solo los paquetes (sin decodificar)
+
+    Returns:
+        Lista ordenada de tiempos, vacía si ffprobe falla
+    """
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return []
+    times = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            times.append(float(pts))
+    return sorted(times)
+
+
+def plan_cuts(total_duration: float, segment_duration: float, keyframes: list = None,
+              min_duration: float = 0.0, max_duration: float = None) -> list:
+    """
+    Puntos de corte de un video en segmentos de ~segment_duration
+
+    Sin keyframes, múltiplos exactos de segment_duration (el resto final se
+    descarta). Con keyframes, cada corte interior se mueve al keyframe más
+    cercano solo si queda a menos de (max_duration - segment_duration) / 2
+    de su sitio, a min_duration del corte anterior y del final: ningún
+    segmento baja de min_duration ni pasa de max_duration, y los cortes
+    nunca llegan al final ni se repiten
+
+    Returns:
+        Lista creciente de cortes [0, ..., final]; vacía si no cabe ni un segmento
+    """
+    num_segments = int(total_duration / segment_duration)
+    if num_segments < 1:
+        return []
+    end = num_segments * segment_duration
+    targets = [i * segment_duration for i in range(1, num_segments)]
+    if not keyframes:
+        return [0.0] + targets + [end]
+
+    max_duration = max_duration or 2 * segment_duration
+    tolerance = max(min(segment_duration / 2, (max_duration - segment_duration) / 2), 0)
+    cuts = [0.0]
+    for target in targets:
+        low = max(target - tolerance, cuts[-1] + min_duration)
+        high = min(target + tolerance, end - min_duration)
+        candidates = [k for k in keyframes if low <= k <= high and k > cuts[-1]]
+        cuts.append(min(candidates, key=lambda k: abs(k - target)) if candidates else target)
+    return cuts + [end]
+
+
+def escape_filter_value(value: str) -> str:
+    """
+    Escapa un valor (p.ej. una ruta) para usarlo como opción de un filtro
+    dentro de un filtergraph: primero el nivel de opción (\\ ' :) y luego
+    las comillas del nivel de filtergraph
+    """
+    escaped = value.replace("\\", "\\\\").replace("'", "\\'").replace(":", "\\:")
+    return "'" + escaped.replace("'", "'\\''") + "'"
+
+
+def write_concat_list(videos: list, name: str) -> str:
+    """Escribe la lista para el demuxer concat de ffmpeg"""
+    list_file = os.path.join(TEMP_DIR, f"concat_{name}.txt")
+    with open(list_file, "w") as f:
+        for v in videos:
+            escaped = os.path.abspath(v).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_file
+
+
+def fit_filter(width: int, height: int, fps: int) -> str:
+    """Escala cubriendo el frame, recorta al centro y normaliza SAR/fps/pix_fmt"""
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+        f"crop={width}:{height},setsar=1,fps={fps},format=yuv420p"
+    )
+
+
+def target_filter(width: int, height: int) -> str:
+    """Recorta al centro a la proporción de width x height y escala a ese tamaño"""
+    return (
+        f"crop=w='min(iw,ih*{width}/{height})':h='min(ih,iw*{height}/{width})',"
+        f"scale={width}:{height},setsar=1"
+    )
+
+
+def background_graph(num_inputs: int, width: int, height: int, fps: int,
+                     duration: float, output_label: str = "bg") -> str:
+    """
+    Filtergraph que ajusta cada entrada de video y las concatena
+
+    Args:
+        num_inputs: Número de entradas de video (índices 0..n-1)
+        width, height, fps: Formato de salida
+        duration: Duración máxima del fondo
+        output_label: Etiqueta del stream resultante
+
+    Returns:
+        Cadena de filter_complex que termina en [output_label]
+    """
+    chains = [f"[{i}:v]{fit_filter(width, height, fps)}[v{i}]" for i in range(num_inputs)]
+    inputs = "".join(f"[v{i}]" for i in range(num_inputs))
+    chains.append(
+        f"{inputs}concat=n={num_inputs}:v=1:a=0,"
+        f"trim=duration={duration:.3f},setpts=PTS-STARTPTS[{output_label}]"
+    )
+    return ";".join(chains)
+
+
+def fan_out(source: str, sizes: list, fps: int, tail: str = "", prefix: str = "bg") -> str:
+    """
+    Reparte un stream decodificado con split y ajusta cada rama a su tamaño
+    (cada salida se recorta del cuadro original, no de otra salida ya recortada)
+
+    Args:
+        source: Etiqueta de entrada sin corchetes (p.ej. "0:v")
+        sizes: Lista de (width, height), una rama por tamaño
+        tail: Filtros aplicados a cada rama después del ajuste (p.ej. trim)
+        prefix: Las ramas terminan en [<prefix>0], [<prefix>1]...
+
+    Returns:
+        Cadena de filter_complex
+    """
+    tail = f",{tail}" if tail else ""
+    if len(sizes) == 1:
+        width, height = sizes[0]
+        return f"[{source}]{fit_filter(width, height, fps)}{tail}[{prefix}0]"
+    chains = [f"[{source}]split={len(sizes)}" + "".join(f"[{prefix}s{c}]" for c in range(len(sizes)))]
+    chains += [f"[{prefix}s{c}]{fit_filter(width, height, fps)}{tail}[{prefix}{c}]"
+               for c, (width, height) in enumerate(sizes)]
+    return ";".join(chains)
+
+
+def fan_out_concat(num_inputs: int, sizes: list, fps: int, tail: str = "",
+                   prefix: str = "bg") -> str:
+    """
+    Como background_graph, pero con una salida por tamaño: cada entrada se
+    decodifica una vez, split la reparte y cada tamaño concatena sus ramas
+
+    Returns:
+        Cadena de filter_complex que termina en [<prefix>0], [<prefix>1]...
+    """
+    chains = [fan_out(f"{i}:v", sizes, fps, prefix=f"{prefix}{i}_") for i in range(num_inputs)]
+    tail = f",{tail}" if tail else ""
+    for c in range(len(sizes)):
+        inputs = "".join(f"[{prefix}{i}_{c}]" for i in range(num_inputs))
+        chains.append(f"{inputs}concat=n={num_inputs}:v=1:a=0{tail}[{prefix}{c}]")
+    return ";".join(chains)
+
+
+def render_short(videos: list, audio_path: str, duration: float, output_path: str,
+                 subtitle_filter: str = None, width: int = 1080, height: int = 1920,
+                 fps: int = 30, preset: str = "fast", normalized: bool = False,
+                 crf: int = None, audio_bitrate: str = None) -> bool:
+    """
+    Renderiza un short en una sola pasada: concatena los clips, los ajusta a
+    width x height, quema las legendas y añade el audio TTS
+
+    Args:
+        videos: Rutas de los clips de fondo, en orden
+        audio_path: Audio de narración
+        duration: Duración del fondo (la salida se corta al audio con -shortest)
+        output_path: Archivo final
+        subtitle_filter: Cadena de filtros de legendas (opcional)
+        preset: Preset de libx264
+        normalized: Los clips ya son mezzanines (se leen con el demuxer
+            concat; solo se escalan si la salida es de otro tamaño)
+        crf: Calidad constante de libx264 (None = por defecto)
+        audio_bitrate: Bitrate AAC (None = por defecto)
+
+    Returns:
+        True si el render terminó bien
+    """
+    cmd = ["ffmpeg", "-y"]
+    list_file = None
+
+    if normalized:
+        list_file = write_concat_list(videos, os.path.splitext(os.path.basename(output_path))[0])
+        cmd += ["-f", "concat", "-safe", "0", "-i", list_file]
+        graph = f"[0:v]trim=duration={duration:.3f},setpts=PTS-STARTPTS"
+        if (width, height, fps) != (MEZZANINE_CONFIG["width"], MEZZANINE_CONFIG["height"],
+                                    MEZZANINE_CONFIG["fps"]):
+            graph += f",scale={width}:{height},fps={fps}"
+        graph += "[bg]"
+        audio_index = 1
+    else:
+        for v in videos:
+            cmd += ["-i", v]
+        graph = background_graph(len(videos), width, height, fps, duration)
+        audio_index = len(videos)
+
+    if subtitle_filter:
+        graph += f";[bg]{subtitle_filter}[vout]"
+        video_label = "[vout]"
+    else:
+        video_label = "[bg]"
+
+    cmd += [
+        "-i", audio_path,
+        "-filter_complex", graph,
+        "-map", video_label, "-map", f"{audio_index}:a",
+        "-r", str(fps),
+        "-c:v", "libx264", "-preset", preset,
+    ]
+    if crf is not None:
+        cmd += ["-crf", str(crf)]
+    cmd += ["-c:a", "aac"]
+    if audio_bitrate:
+        cmd += ["-b:a", audio_bitrate]
+    cmd += ["-shortest", output_path]
+    ok = run_ffmpeg(cmd, "render del short")
+    if list_file:
+        os.remove(list_file)
+    return ok
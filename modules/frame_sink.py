@@ -0,0 +1,219 @@
+"""
+Salida de frames generados en Python directamente a ffmpeg
+Los frames (RGB o YUV crudos) se copian a un conjunto fijo de buffers
+preasignados y un hilo los escribe en el stdin de ffmpeg a través de una cola
+acotada: la memoria no depende de la duración y la generación del frame
+siguiente se solapa con la codificación del anterior
+"""
+import os
+import time
+import queue
+import tempfile
+import threading
+import subprocess
+import numpy as np
+
+
+def frame_shape(pix_fmt: str, width: int, height: int) -> tuple:
+    """Forma del array de un frame crudo en pix_fmt"""
+    if pix_fmt == "rgb24":
+        return (height, width, 3)
+    if pix_fmt == "rgba":
+        return (height, width, 4)
+    if pix_fmt == "gray":
+        return (height, width)
+    if pix_fmt == "yuv420p":
+        # Planos Y, U y V seguidos (U y V a la mitad de resolución)
+        return (height * 3 // 2, width)
+    raise ValueError(f"pix_fmt no soportado: {pix_fmt}")
+
+
+class FFmpegFrameSink:
+    """Codifica frames de NumPy con ffmpeg por un pipe, sin archivos intermedios"""
+
+    def __init__(self, output_path: str, width: int, height: int, fps: int,
+                 pix_fmt: str = "rgb24", audio_path: str = None, codec: str = "libx264",
+                 preset: str = "medium", crf: int = None, bitrate: str = None,
+                 audio_codec: str = "aac", queue_size: int = 8, shortest: bool = True):
+        """
+        Args:
+            output_path: Archivo de salida
+            width, height, fps: Formato de los frames
+            pix_fmt: Formato de los frames que se escriben ("rgb24", "rgba",
+                "gray" o "yuv420p")
+            audio_path: Audio que se añade en la misma pasada (opcional)
+            crf, bitrate: Control de tasa de libx264 (crf tiene prioridad)
+            queue_size: Frames en vuelo entre el productor y ffmpeg
+            shortest: Cortar la salida al stream más corto (False: el video
+                manda y un audio más corto simplemente termina antes)
+        """
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.pix_fmt = pix_fmt
+        self.audio_path = audio_path
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.bitrate = bitrate
+        self.audio_codec = audio_codec
+        self.shortest = shortest
+
+        self._shape = frame_shape(pix_fmt, width, height)
+        # Buffers libres (+2: uno escribiéndose en el pipe y otro llenándose)
+        self._free = queue.Queue()
+        for _ in range(queue_size + 2):
+            self._free.put(np.empty(self._shape, dtype=np.uint8))
+        self._pending = queue.Queue(maxsize=queue_size)
+        self._proc = None
+        self._writer = None
+        self._stderr = None
+        self._error = None
+        self._frames = 0
+        self._producer_wait = 0.0
+        self._encoder_wait = 0.0
+        self._started = None
+
+    def _command(self) -> list:
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", self.pix_fmt,
+            "-s", f"{self.width}x{self.height}", "-r", str(self.fps), "-i", "-",
+        ]
+        if self.audio_path:
+            cmd += ["-i", self.audio_path, "-map", "0:v", "-map", "1:a", "-c:a", self.audio_codec]
+            if self.shortest:
+                cmd += ["-shortest"]
+        cmd += ["-c:v", self.codec, "-preset", self.preset, "-pix_fmt", "yuv420p"]
+        if self.crf is not None:
+            cmd += ["-crf", str(self.crf)]
+        elif self.bitrate:
+            cmd += ["-b:v", self.bitrate]
+        cmd += ["-movflags", "+faststart", self.output_path]
+        return cmd
+
+    def start(self):
+        """Lanza ffmpeg y el hilo que le escribe los frames"""
+        # stderr a un archivo: un pipe sin leer podría bloquear a ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(self._command(), stdin=subprocess.PIPE,
+                                      stderr=self._stderr, bufsize=0)
+        self._started = time.time()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        return self
+
+    def _write_loop(self):
+        while True:
+            waited = time.time()
+            buffer = self._pending.get()
+            self._encoder_wait += time.time() - waited
+            if buffer is None:
+                break
+            try:
+                if self._error is None:
+                    self._proc.stdin.write(memoryview(buffer).cast("B"))
+            except (BrokenPipeError, OSError) as e:
+                # ffmpeg terminó antes de tiempo: se siguen consumiendo frames
+                # para que el productor no se quede bloqueado
+                self._error = e
+            finally:
+                self._free.put(buffer)
+
+    def write(self, frame: np.ndarray):
+        """
+        Encola un frame (se copia a un buffer preasignado; el array del
+        productor se puede reutilizar en cuanto vuelve la llamada)
+        """
+        if self._error is not None:
+            raise RuntimeError(f"ffmpeg dejó de aceptar frames: {self._error}")
+        waited = time.time()
+        buffer = self._free.get()
+        self._producer_wait += time.time() - waited
+        np.copyto(buffer, frame.reshape(self._shape), casting="unsafe")
+        self._pending.put(buffer)
+        self._frames += 1
+
+    def close(self) -> dict:
+        """
+        Espera a que ffmpeg termine
+
+        Returns:
+            Estadísticas: frames, duration (s de video), elapsed (s reales),
+            encode_fps, speed (x tiempo real), size_bytes, bitrate_kbps,
+            producer_wait / encoder_wait (s bloqueados esperando al otro lado),
+            returncode y error (últimas líneas de ffmpeg si falló)
+        """
+        self._pending.put(None)
+        self._writer.join()
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        returncode = self._proc.wait()
+        elapsed = time.time() - self._started
+
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode(errors="replace")
+        self._stderr.close()
+
+        duration = self._frames / self.fps
+        size = os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0
+        return {
+            "frames": self._frames,
+            "duration": duration,
+            "elapsed": elapsed,
+            "encode_fps": self._frames / elapsed if elapsed else 0.0,
+            "speed": duration / elapsed if elapsed else 0.0,
+            "size_bytes": size,
+            "bitrate_kbps": size * 8 / 1000 / duration if duration else 0.0,
+            "producer_wait": self._producer_wait,
+            "encoder_wait": self._encoder_wait,
+            "returncode": returncode,
+            "error": stderr[-1500:] if returncode != 0 else None,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats = self.close()
+        return False
+
+
+def encode_frames(frames, output_path: str, width: int, height: int, fps: int, **options) -> dict:
+    """
+    Codifica todos los frames de un iterable (generador) con FFmpegFrameSink
+
+    Args:
+        frames: Iterable de arrays (height, width, 3) en rgb24 u otro pix_fmt de options
+        **options: Argumentos de FFmpegFrameSink (audio_path, crf, preset...)
+
+    Returns:
+        Estadísticas de FFmpegFrameSink.close() (si ffmpeg deja de aceptar
+        frames a mitad, las de lo escrito hasta ahí, con error)
+    """
+    failure = None
+    with FFmpegFrameSink(output_path, width, height, fps, **options) as sink:
+        try:
+            for frame in frames:
+                sink.write(frame)
+        except RuntimeError as e:
+            # Solo el pipe roto de write(); un error del generador se propaga
+            if sink._error is None:
+                raise
+            failure = str(e)
+    stats = sink.stats
+    if failure and not stats["error"]:
+        stats["error"] = failure
+    if stats["error"]:
+        print(f"⚠️ Error en la codificación por pipe: {stats['error']}")
+    return stats
+
+
+def clip_frames(clip, fps: int):
+    """Frames de un clip de MoviePy uno a uno (sin pasar por write_videofile)"""
+    n = int(round(clip.duration * fps))
+    for i in range(n):
+        yield clip.get_frame(i / fps)
@@ -0,0 +1,136 @@
+"""
+Fondo en loop sin decodificar cada repetición
+Un ciclo del fondo (uno o varios clips) se decodifica y escala UNA vez con
+ffmpeg al tamaño de salida en YUV 4:2:0 crudo (la mitad que RGB): en memoria
+si cabe, en un archivo mapeado (np.memmap) si es grande. Las repeticiones se
+sirven desde ese cache y cada frame se pasa a RGB al pedirlo, en lugar de
+concatenate_videoclips([clip] * N), que vuelve a buscar, decodificar y
+redimensionar el mismo archivo en cada vuelta
+"""
+import os
+import uuid
+import subprocess
+import numpy as np
+from config import LOOP_CACHE_CONFIG
+from modules.frame_sink import frame_shape
+
+try:
+    import cv2
+except ImportError:
+    # OpenCV es opcional: sin él la conversión YUV → RGB se hace con NumPy
+    cv2 = None
+from modules.ffmpeg_render import background_graph
+from modules.media_index import get_media_index
+
+
+class LoopingSource:
+    """Frames de un ciclo del fondo, repetidos hasta la duración pedida"""
+
+    def __init__(self, frames: np.ndarray, fps: int, path: str = None):
+        """
+        Args:
+            frames: Array (n, height * 3 / 2, width) uint8 con los planos
+                Y, U, V de cada frame (en memoria o memmap)
+            path: Archivo del memmap (se borra en close)
+        """
+        self.frames = frames
+        self.fps = fps
+        self.path = path
+        self.height = frames.shape[1] * 2 // 3
+        self.width = frames.shape[2]
+        self._rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    @classmethod
+    def decode(cls, sources: list, width: int, height: int, fps: int, duration: float):
+        """
+        Decodifica y escala un ciclo de los clips (o solo duration si no hace falta repetir)
+
+        Returns:
+            LoopingSource, o None si el ciclo supera LOOP_CACHE_CONFIG["max_disk_mb"]
+            o ffmpeg falla
+        """
+        index = get_media_index()
+        cycle = sum(index.get_duration(s) or 0 for s in sources)
+        if cycle <= 0:
+            return None
+        length = min(cycle, duration)
+        num_frames = int(length * fps)
+        shape = (num_frames,) + frame_shape("yuv420p", width, height)
+        frame_bytes = shape[1] * shape[2]
+        total_mb = num_frames * frame_bytes / (1024 * 1024)
+        if num_frames < 1 or total_mb > LOOP_CACHE_CONFIG["max_disk_mb"]:
+            return None
+
+        cmd = ["ffmpeg", "-v", "error"]
+        for s in sources:
+            cmd += ["-i", s]
+        # Matriz BT.601 de rango limitado: la que asume la conversión a RGB de frame()
+        graph = background_graph(len(sources), width, height, fps, length)
+        graph += ";[bg]scale=out_color_matrix=bt601:out_range=tv,format=yuv420p[yuv]"
+        cmd += ["-filter_complex", graph,
+                "-map", "[yuv]", "-frames:v", str(num_frames),
+                "-f", "rawvideo", "-pix_fmt", "yuv420p"]
+
+        if total_mb <= LOOP_CACHE_CONFIG["max_memory_mb"]:
+            result = subprocess.run(cmd + ["-"], capture_output=True)
+            if result.returncode != 0:
+                print(f"⚠️ Error decodificando el fondo: {result.stderr.decode(errors='replace')[-500:]}")
+                return None
+            decoded = len(result.stdout) // frame_bytes
+            frames = np.frombuffer(result.stdout, dtype=np.uint8, count=decoded * frame_bytes)
+            return cls(frames.reshape((decoded,) + shape[1:]), fps) if decoded else None
+
+        # Ciclo grande: ffmpeg escribe al disco y se lee mapeado (memoria acotada)
+        os.makedirs(LOOP_CACHE_CONFIG["dir"], exist_ok=True)
+        path = os.path.join(LOOP_CACHE_CONFIG["dir"], f"loop_{uuid.uuid4().hex}.yuv")
+        result = subprocess.run(cmd + ["-y", path], capture_output=True)
+        decoded = os.path.getsize(path) // frame_bytes if os.path.exists(path) else 0
+        if result.returncode != 0 or not decoded:
+            print(f"⚠️ Error decodificando el fondo: {result.stderr.decode(errors='replace')[-500:]}")
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        frames = np.memmap(path, dtype=np.uint8, mode="r", shape=(decoded,) + shape[1:])
+        if os.name == "posix":
+            # El mapeo mantiene los datos: el archivo desaparece aunque nadie llame a close
+            os.remove(path)
+            path = None
+        return cls(frames, fps, path)
+
+    def frame(self, t: float) -> np.ndarray:
+        """
+        Frame RGB del instante t (el ciclo se repite)
+        Buffer compartido: se sobrescribe en la siguiente llamada
+        """
+        yuv = self.frames[int(t * self.fps) % len(self.frames)]
+        if cv2 is not None:
+            return cv2.cvtColor(yuv, cv2.COLOR_YUV2RGB_I420, dst=self._rgb)
+
+        h, w = self.height, self.width
+        # Planos por tamaño en bytes (por filas solo cuadra si h es múltiplo de 4)
+        planes = yuv.reshape(-1)
+        luma, chroma_size = h * w, (h // 2) * (w // 2)
+        # BT.601 rango limitado en punto fijo (coeficientes x256)
+        y = (planes[:luma].reshape(h, w).astype(np.int32) - 16) * 298
+        u = planes[luma:luma + chroma_size].reshape(h // 2, w // 2).astype(np.int32) - 128
+        v = planes[luma + chroma_size:].reshape(h // 2, w // 2).astype(np.int32) - 128
+        u = u.repeat(2, axis=0).repeat(2, axis=1)
+        v = v.repeat(2, axis=0).repeat(2, axis=1)
+        for c, chroma in enumerate((409 * v, -100 * u - 208 * v, 516 * u)):
+            np.clip((y + chroma + 128) >> 8, 0, 255, out=chroma)
+            self._rgb[..., c] = chroma
+        return self._rgb
+
+    def to_clip(self, duration: float):
+        """VideoClip de MoviePy de la duración pedida (cerrar el clip libera el cache)"""
+        from moviepy.editor import VideoClip
+        clip = VideoClip(self.frame, duration=duration)
+        clip.close = self.close
+        return clip
+
+    def close(self):
+        """Libera el cache (y borra el archivo del memmap)"""
+        self.frames = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+            self.path = None
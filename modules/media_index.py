@@ -0,0 +1,255 @@
+"""
+Índice persistente de metadatos de medios
+Guarda en SQLite lo que ffprobe dice de cada clip (duración, resolución, fps,
+codec, bitrate, rotación y audio) para no lanzar un ffprobe ni abrir un
+VideoFileClip por archivo en cada render
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+import subprocess
+from config import MEDIA_INDEX_PATH
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    probe_ok INTEGER NOT NULL,
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    codec TEXT,
+    bitrate INTEGER,
+    rotation INTEGER,
+    has_audio INTEGER,
+    probed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_media_directory ON media(directory);
+"""
+
+COLUMNS = ("duration", "width", "height", "fps", "codec", "bitrate", "rotation", "has_audio")
+
+
+def _parse_rate(rate: str) -> float:
+    """Convierte un frame rate de ffprobe ('30000/1001') a float"""
+    try:
+        num, _, den = rate.partition("/")
+        return float(num) / float(den or 1) if float(den or 1) else 0.0
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def _parse_rotation(stream: dict) -> int:
+    """Lee la rotación del stream (tag 'rotate' o displaymatrix)"""
+    rotate = stream.get("tags", {}).get("rotate")
+    if rotate is not None:
+        try:
+            return int(float(rotate)) % 360
+        except ValueError:
+            pass
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data:
+            return int(float(side_data["rotation"])) % 360
+    return 0
+
+
+def probe_media(path: str) -> dict:
+    """
+    Ejecuta ffprobe una vez y extrae los metadatos del archivo
+
+    Returns:
+        Dict con duration, width, height, fps, codec, bitrate, rotation y
+        has_audio, o None si ffprobe no puede leer el archivo
+    """
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json",
+         "-show_format", "-show_streams", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+
+    try:
+        info = json.loads(result.stdout)
+        duration = float(info["format"]["duration"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    has_audio = any(s.get("codec_type") == "audio" for s in streams)
+
+    bitrate = video.get("bit_rate") or info["format"].get("bit_rate")
+
+    return {
+        "duration": duration,
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "fps": _parse_rate(video.get("avg_frame_rate") or video.get("r_frame_rate", "0/1")),
+        "codec": video.get("codec_name"),
+        "bitrate": int(bitrate) if bitrate else None,
+        "rotation": _parse_rotation(video),
+        "has_audio": int(has_audio),
+    }
+
+
+class MediaIndex:
+    """Índice SQLite de metadatos, invalidado por (ruta, tamaño, mtime)"""
+
+    def __init__(self, db_path: str = MEDIA_INDEX_PATH):
+        """
+        Abre (o crea) el índice
+
+        Args:
+            db_path: Ruta al archivo SQLite
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _row_to_dict(row) -> dict:
+        data = {"path": row["path"], "size": row["size"], "mtime": row["mtime"]}
+        for col in COLUMNS:
+            data[col] = row[col]
+        data["has_audio"] = bool(data["has_audio"])
+        return data
+
+    def _store(self, path: str, st: os.stat_result, meta: dict):
+        """Inserta o actualiza la fila de un archivo"""
+        values = [meta.get(col) if meta else None for col in COLUMNS]
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO media (path, directory, size, mtime, probe_ok, "
+            f"{', '.join(COLUMNS)}, probed_at) VALUES (?, ?, ?, ?, ?, "
+            f"{', '.join('?' * len(COLUMNS))}, ?)",
+            [path, os.path.dirname(path), st.st_size, st.st_mtime, int(meta is not None)]
+            + values + [time.time()]
+        )
+
+    def get(self, path: str) -> dict:
+        """
+        Devuelve los metadatos de un archivo, lanzando ffprobe solo si
+        cambió desde la última vez (tamaño o mtime distintos)
+
+        Returns:
+            Dict de metadatos o None si el archivo no existe o no es legible
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM media WHERE path = ?", (path,)).fetchone()
+        if row and row["size"] == st.st_size and row["mtime"] == st.st_mtime:
+            return self._row_to_dict(row) if row["probe_ok"] else None
+
+        meta = probe_media(path)
+        with self._lock, self._conn:
+            self._store(path, st, meta)
+        if meta is None:
+            return None
+        return dict(meta, path=path, size=st.st_size, mtime=st.st_mtime, has_audio=bool(meta["has_audio"]))
+
+    def get_duration(self, path: str) -> float:
+        """Duración en segundos (o None si no se puede leer)"""
+        meta = self.get(path)
+        return meta["duration"] if meta else None
+
+    def sync_directory(self, directory: str, extension: str = ".mp4") -> int:
+        """
+        Sincroniza el índice con el contenido de un directorio
+        Solo se lanza ffprobe para archivos nuevos o modificados
+
+        Returns:
+            Número de archivos que hubo que analizar
+        """
+        directory = os.path.abspath(directory)
+        on_disk = {}
+        if os.path.isdir(directory):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(extension):
+                        on_disk[entry.path] = entry.stat()
+
+        with self._lock:
+            known = {
+                row["path"]: (row["size"], row["mtime"])
+                for row in self._conn.execute(
+                    "SELECT path, size, mtime FROM media WHERE directory = ?", (directory,)
+                )
+            }
+
+        stale = [p for p, st in on_disk.items() if known.get(p) != (st.st_size, st.st_mtime)]
+        removed = [p for p in known if p not in on_disk]
+
+        probed = {path: probe_media(path) for path in stale}
+
+        with self._lock, self._conn:
+            for path, meta in probed.items():
+                self._store(path, on_disk[path], meta)
+            self._conn.executemany("DELETE FROM media WHERE path = ?", [(p,) for p in removed])
+
+        if stale:
+            print(f"   🗂️ Índice de medios: {len(stale)} archivo(s) analizados")
+        return len(stale)
+
+    def list_directory(self, directory: str, sync: bool = True) -> list:
+        """
+        Devuelve los clips legibles de un directorio en una sola consulta
+
+        Args:
+            directory: Directorio a listar
+            sync: Sincronizar antes con el disco (stat, sin ffprobe si nada cambió)
+
+        Returns:
+            Lista de dicts de metadatos ordenada por ruta
+        """
+        directory = os.path.abspath(directory)
+        if sync:
+            self.sync_directory(directory)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM media WHERE directory = ? AND probe_ok = 1 ORDER BY path",
+                (directory,)
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_media_index() -> MediaIndex:
+    """Instancia compartida del índice para todo el proceso"""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = MediaIndex()
+        return _INDEX
+
+
+# Test del módulo
+if __name__ == "__main__":
+    import sys
+    from config import ASSETS_DIR
+
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ASSETS_DIR, "video_library")
+    index = get_media_index()
+    for clip in index.list_directory(target):
+        print(f"{os.path.basename(clip['path'])}: {clip['duration']:.1f}s "
+              f"{clip['width']}x{clip['height']} @ {clip['fps']:.2f}fps {clip['codec']}")
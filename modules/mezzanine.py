@@ -0,0 +1,243 @@
+"""
+Copias mezzanine de la biblioteca de videos
+Cada clip se transcodifica UNA vez a un formato canónico (misma resolución,
+fps, pix_fmt, GOP y parámetros de codec) guardado junto al original, de modo
+que el fondo de un short se puede concatenar con -c copy sin decodificar
+"""
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import MEZZANINE_CONFIG
+from modules.ffmpeg_render import (run_ffmpeg, fit_filter, write_concat_list, background_graph,
+                                   fan_out_concat)
+
+
+def _fingerprint() -> str:
+    """Hash corto de los parámetros: si cambian, las copias viejas dejan de valer"""
+    params = json.dumps(MEZZANINE_CONFIG, sort_keys=True)
+    return hashlib.sha1(params.encode()).hexdigest()[:8]
+
+
+def mezzanine_dir(source_path: str) -> str:
+    """Directorio de mezzanines junto al original"""
+    return os.path.join(os.path.dirname(os.path.abspath(source_path)), MEZZANINE_CONFIG["dir_name"])
+
+
+def mezzanine_path(source_path: str) -> str:
+    """Ruta de la copia mezzanine de un clip"""
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(mezzanine_dir(source_path), f"{stem}.{_fingerprint()}.mp4")
+
+
+def is_fresh(source_path: str) -> bool:
+    """True si la mezzanine existe y es más nueva que el original"""
+    mezz = mezzanine_path(source_path)
+    try:
+        return os.path.getmtime(mezz) >= os.path.getmtime(source_path)
+    except OSError:
+        return False
+
+
+# Evita transcodificar el mismo clip dos veces en paralelo (upload + render)
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(path, threading.Lock())
+
+
+def encode_args() -> list:
+    """Parámetros de codificación del formato mezzanine (GOP cerrado y fijo)"""
+    cfg = MEZZANINE_CONFIG
+    gop = str(cfg["gop"])
+    return [
+        "-r", str(cfg["fps"]),
+        "-c:v", cfg["codec"], "-profile:v", cfg["profile"], "-level", cfg["level"],
+        "-pix_fmt", cfg["pix_fmt"], "-preset", cfg["preset"], "-crf", str(cfg["crf"]),
+        # GOP cerrado y fijo: cada segmento empieza en keyframe
+        "-g", gop, "-keyint_min", gop, "-sc_threshold", "0",
+        "-x264-params", "open-gop=0",
+        "-video_track_timescale", str(cfg["fps"] * 512),
+    ]
+
+
+def ensure_mezzanine(source_path: str) -> str:
+    """
+    Devuelve la copia mezzanine de un clip, creándola si no existe
+
+    Args:
+        source_path: Clip original de la biblioteca
+
+    Returns:
+        Ruta a la mezzanine o None si la transcodificación falla
+    """
+    source_path = os.path.abspath(source_path)
+    mezz = mezzanine_path(source_path)
+
+    with _lock_for(mezz):
+        if is_fresh(source_path):
+            return mezz
+
+        os.makedirs(os.path.dirname(mezz), exist_ok=True)
+        cfg = MEZZANINE_CONFIG
+        tmp_path = mezz + ".part.mp4"
+
+        print(f"   🧱 Mezzanine: {os.path.basename(source_path)}")
+        ok = run_ffmpeg(
+            ["ffmpeg", "-y", "-i", source_path,
+             "-vf", fit_filter(cfg["width"], cfg["height"], cfg["fps"])]
+            + encode_args()
+            + ["-an", "-movflags", "+faststart", tmp_path],
+            f"mezzanine de {os.path.basename(source_path)}"
+        )
+
+        if not ok:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        os.replace(tmp_path, mezz)
+        return mezz
+
+
+def mezzanines_for(videos: list) -> list:
+    """
+    Mezzanines ya creadas de una lista de clips, en el mismo orden
+
+    No transcodifica: en el momento del render solo se usan las que están
+    al día (las crean ingest_library y la subida de clips en segundo plano)
+
+    Returns:
+        Lista de rutas, o None si alguno no tiene mezzanine al día
+        (en ese caso hay que decodificar y escalar los originales)
+    """
+    if not all(is_fresh(v) for v in videos):
+        return None
+    return [mezzanine_path(v) for v in videos]
+
+
+def remove_mezzanine(source_path: str):
+    """Borra la mezzanine de un clip eliminado de la biblioteca"""
+    mezz = mezzanine_path(source_path)
+    if os.path.exists(mezz):
+        os.remove(mezz)
+
+
+def concat_copy(mezzanines: list, output_path: str, duration: float = None,
+                audio_path: str = None) -> bool:
+    """
+    Concatena mezzanines sin recodificar el video (-c copy)
+
+    Args:
+        mezzanines: Clips normalizados, en orden
+        output_path: Archivo de salida
+        duration: Duración máxima (opcional)
+        audio_path: Audio a añadir (se corta al más corto)
+
+    Returns:
+        True si terminó bien
+    """
+    list_file = write_concat_list(mezzanines, os.path.splitext(os.path.basename(output_path))[0])
+
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a"]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-c:v", "copy"]
+    if audio_path:
+        cmd += ["-c:a", "aac", "-shortest"]
+    cmd += ["-movflags", "+faststart", output_path]
+
+    ok = run_ffmpeg(cmd, "concat -c copy")
+    os.remove(list_file)
+    return ok
+
+
+def render_background(videos: list, output_path: str, duration: float) -> bool:
+    """
+    Renderiza una sola vez el fondo de un short (sin audio ni legendas) en
+    formato mezzanine, para reutilizarlo en varias salidas (p.ej. ES y EN)
+
+    Con mezzanines es solo un concat -c copy; si no, una codificación con
+    los parámetros mezzanine, de modo que las salidas se pueden cortar con
+    -c copy o leer con el demuxer concat sin escalar
+
+    Args:
+        videos: Clips de fondo, en orden
+        output_path: Archivo de salida
+        duration: Duración del fondo (la más larga de las salidas)
+
+    Returns:
+        True si terminó bien
+    """
+    mezzanines = mezzanines_for(videos)
+    if mezzanines:
+        return concat_copy(mezzanines, output_path, duration=duration)
+
+    cfg = MEZZANINE_CONFIG
+    cmd = ["ffmpeg", "-y"]
+    for v in videos:
+        cmd += ["-i", v]
+    cmd += ["-filter_complex", background_graph(len(videos), cfg["width"], cfg["height"],
+                                                cfg["fps"], duration),
+            "-map", "[bg]"] + encode_args() + ["-an", "-movflags", "+faststart", output_path]
+    return run_ffmpeg(cmd, "render del fondo compartido")
+
+
+def render_cycles(videos: list, outputs: list, duration: float) -> bool:
+    """
+    Codifica un ciclo del fondo en varios tamaños con una sola decodificación
+    (split antes del ajuste: cada tamaño se recorta de los clips originales)
+
+    Args:
+        videos: Clips de fondo, en orden
+        outputs: Lista de (ruta, width, height)
+        duration: Duración del ciclo
+
+    Returns:
+        True si terminó bien
+    """
+    cfg = MEZZANINE_CONFIG
+    cmd = ["ffmpeg", "-y"]
+    for v in videos:
+        cmd += ["-i", v]
+    sizes = [(width, height) for _, width, height in outputs]
+    cmd += ["-filter_complex", fan_out_concat(len(videos), sizes, cfg["fps"],
+                                              f"trim=duration={duration:.3f},setpts=PTS-STARTPTS")]
+    for c, (path, _, _) in enumerate(outputs):
+        cmd += ["-map", f"[bg{c}]"] + encode_args() + ["-an", "-movflags", "+faststart", path]
+    return run_ffmpeg(cmd, "ciclo del fondo")
+
+
+def ingest_library(directory: str, workers: int = 2) -> int:
+    """
+    Crea las mezzanines que falten en un directorio y borra las huérfanas
+
+    Returns:
+        Número de clips normalizados correctamente
+    """
+    sources = sorted(
+        os.path.join(directory, f) for f in os.listdir(directory)
+        if f.lower().endswith(".mp4")
+    )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(ensure_mezzanine, sources))
+
+    valid = {mezzanine_path(s) for s in sources}
+    mezz_dir = os.path.join(os.path.abspath(directory), MEZZANINE_CONFIG["dir_name"])
+    if os.path.isdir(mezz_dir):
+        for f in os.listdir(mezz_dir):
+            path = os.path.join(mezz_dir, f)
+            # Los .part.mp4 son transcodificaciones en curso
+            if path not in valid and not f.endswith(".part.mp4"):
+                os.remove(path)
+
+    done = sum(1 for r in results if r)
+    print(f"✅ Mezzanines listas: {done}/{len(sources)}")
+    return done
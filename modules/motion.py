@@ -0,0 +1,189 @@
+"""
+Motor de movimiento Ken Burns para imágenes fijas
+La trayectoria del recorte (zoom + pan) se calcula entera al principio con
+NumPy y cada frame es un único remuestreo del rectángulo al tamaño de salida,
+sin pasar por PIL ida y vuelta ni copiar el frame completo varias veces
+Las curvas son las de la versión anterior de create_ken_burns_clip
+"""
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:
+    # OpenCV es opcional: sin él se usa Image.resize con box (también en C)
+    cv2 = None
+
+
+class KenBurnsEngine:
+    """Zoom lento + pan sobre una imagen, precalculado por frame"""
+
+    def __init__(self, width: int, height: int, fps: int,
+                 scale_factor: float = 1.15, pan_amount: int = 25):
+        """
+        Args:
+            width, height, fps: Formato de salida
+            scale_factor: Cuánto más grande que el frame se carga la imagen
+                (zoom máximo); 1.15 = movimiento suave
+            pan_amount: Desplazamiento máximo del pan en píxeles
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.scale_factor = scale_factor
+        self.pan_amount = pan_amount
+
+    def load(self, image_path: str) -> Image.Image:
+        """Carga la imagen escalada para cubrir el frame con margen de zoom"""
+        image = Image.open(image_path).convert("RGB")
+        img_w, img_h = image.size
+        target_ratio = self.width / self.height
+        img_ratio = img_w / img_h
+
+        if img_ratio > target_ratio:
+            # Imagen más ancha - ajustar por altura
+            new_h = int(self.height * self.scale_factor)
+            new_w = int(new_h * img_ratio)
+        else:
+            # Imagen más alta - ajustar por ancho
+            new_w = int(self.width * self.scale_factor)
+            new_h = int(new_w / img_ratio)
+        return image.resize((new_w, new_h), Image.Resampling.LANCZOS)
+
+    def trajectory(self, img_w: int, img_h: int, duration: float,
+                   zoom_direction: str = "in", pan_direction: str = None) -> np.ndarray:
+        """
+        Rectángulo de recorte de cada frame
+
+        Returns:
+            Array (frames, 4) de enteros x, y, ancho, alto
+        """
+        n = max(int(round(duration * self.fps)), 1)
+        progress = np.arange(n) / self.fps / duration
+
+        if zoom_direction == "in":
+            zoom = 1 + (self.scale_factor - 1) * progress
+        else:
+            zoom = self.scale_factor - (self.scale_factor - 1) * progress
+
+        crop_w = (img_w / zoom).astype(np.int64)
+        crop_h = (img_h / zoom).astype(np.int64)
+
+        # Offset base (centro) + pan
+        x = (img_w - crop_w) // 2
+        y = (img_h - crop_h) // 2
+        pan = (self.pan_amount * progress).astype(np.int64)
+        if pan_direction == "left":
+            x = x - pan
+        elif pan_direction == "right":
+            x = x + pan
+        elif pan_direction == "up":
+            y = y - pan
+        elif pan_direction == "down":
+            y = y + pan
+
+        # Asegurar que no nos salimos de la imagen
+        x = np.clip(x, 0, img_w - crop_w)
+        y = np.clip(y, 0, img_h - crop_h)
+        return np.stack([x, y, crop_w, crop_h], axis=1)
+
+    def render_frame(self, image: Image.Image, pixels: np.ndarray, rect, out: np.ndarray = None):
+        """
+        Remuestrea el rectángulo al tamaño de salida
+
+        Args:
+            image: Imagen cargada (para el camino PIL)
+            pixels: La misma imagen como array (para el camino OpenCV)
+            rect: (x, y, ancho, alto)
+            out: Buffer (height, width, 3) reutilizado entre frames (solo OpenCV)
+        """
+        x, y, w, h = (int(v) for v in rect)
+        if cv2 is not None:
+            # La vista del recorte no copia; el resultado se escribe en out
+            return cv2.resize(pixels[y:y + h, x:x + w], (self.width, self.height),
+                              dst=out, interpolation=cv2.INTER_LINEAR)
+        return np.asarray(image.resize((self.width, self.height), Image.Resampling.BILINEAR,
+                                       box=(x, y, x + w, y + h)))
+
+    def frames(self, image_path: str, duration: float, zoom_direction: str = "in",
+               pan_direction: str = None):
+        """
+        Generador de frames (height, width, 3) del movimiento
+        Con OpenCV todos los frames comparten el mismo buffer: consumir
+        (p.ej. FFmpegFrameSink.write copia) antes de pedir el siguiente
+        """
+        image = self.load(image_path)
+        pixels = np.asarray(image) if cv2 is not None else None
+        out = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        for rect in self.trajectory(image.width, image.height, duration,
+                                    zoom_direction, pan_direction):
+            yield self.render_frame(image, pixels, rect, out)
+
+    def render_to_file(self, image_path: str, output_path: str, duration: float,
+                       zoom_direction: str = "in", pan_direction: str = None, **options) -> dict:
+        """
+        Codifica el movimiento directamente con ffmpeg (sin MoviePy)
+
+        Args:
+            **options: Argumentos de FFmpegFrameSink (audio_path, crf, preset...)
+
+        Returns:
+            Estadísticas de la codificación
+        """
+        from modules.frame_sink import encode_frames
+        return encode_frames(self.frames(image_path, duration, zoom_direction, pan_direction),
+                             output_path, self.width, self.height, self.fps, **options)
+
+    def make_clip(self, image_path: str, duration: float, zoom_direction: str = "in",
+                  pan_direction: str = None):
+        """
+        Clip de MoviePy con el movimiento aplicado
+
+        Returns:
+            VideoClip de width x height y la duración pedida
+        """
+        from moviepy.editor import VideoClip
+
+        image = self.load(image_path)
+        pixels = np.asarray(image) if cv2 is not None else None
+        rects = self.trajectory(image.width, image.height, duration, zoom_direction, pan_direction)
+        out = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        last = len(rects) - 1
+
+        def make_frame(t):
+            index = min(max(int(t * self.fps), 0), last)
+            return self.render_frame(image, pixels, rects[index], out)
+
+        return VideoClip(make_frame, duration=duration)
+
+    def ffmpeg_filter(self, img_w: int, img_h: int, duration: float,
+                      zoom_direction: str = "in", pan_direction: str = None) -> str:
+        """
+        El mismo movimiento como filtro zoompan de ffmpeg (entrada: la imagen
+        ya escalada a img_w x img_h, p.ej. con scale delante)
+        """
+        frames = max(int(round(duration * self.fps)), 1)
+        progress = f"(on/{self.fps}/{duration:.3f})"
+        s = self.scale_factor
+        if zoom_direction == "in":
+            zoom = f"1+{s - 1:.6f}*{progress}"
+        else:
+            zoom = f"{s:.6f}-{s - 1:.6f}*{progress}"
+
+        pan = f"floor({self.pan_amount}*{progress})"
+        x = "floor((iw-floor(iw/zoom))/2)"
+        y = "floor((ih-floor(ih/zoom))/2)"
+        if pan_direction == "left":
+            x += f"-{pan}"
+        elif pan_direction == "right":
+            x += f"+{pan}"
+        elif pan_direction == "up":
+            y += f"-{pan}"
+        elif pan_direction == "down":
+            y += f"+{pan}"
+
+        x = f"max(0,min({x},iw-floor(iw/zoom)))"
+        y = f"max(0,min({y},ih-floor(ih/zoom)))"
+        return (f"scale={img_w}:{img_h},"
+                f"zoompan=z='{zoom}':x='{x}':y='{y}':d={frames}:"
+                f"s={self.width}x{self.height}:fps={self.fps}")
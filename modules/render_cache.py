@@ -0,0 +1,150 @@
+"""
+Cache de renders finales direccionado por contenido
+La clave es un hash de la especificación completa del trabajo (guion, voz,
+secuencia de videos, perfil de render, versión del código) más los digests
+de los archivos de entrada, así que reintentar o re-aprobar un trabajo
+idéntico (también tras reiniciar el servidor) no vuelve a lanzar ffmpeg:
+el video existente se copia con el nombre nuevo en OUTPUT_DIR (copia y no
+hard link: sobrescribir la salida después no debe tocar el cache)
+Las copias viven en TEMP_DIR, con un límite en bytes como el smart render
+"""
+import os
+import json
+import hashlib
+import threading
+from config import RENDER_CACHE_CONFIG, BASE_DIR
+from modules.tts_cache import place_file
+
+# Código que determina cómo se ve un short: si cambia, los renders viejos dejan de valer
+CODE_FILES = [
+    "generar_5_cosas.py",
+    "modules/ffmpeg_render.py",
+    "modules/mezzanine.py",
+    "modules/smart_render.py",
+    "modules/subtitles.py",
+]
+
+_CODE_VERSION = None
+
+
+def code_version() -> str:
+    """Hash del código de render (calculado una vez por proceso)"""
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        digest = hashlib.sha1()
+        for name in CODE_FILES:
+            path = os.path.join(BASE_DIR, name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        _CODE_VERSION = digest.hexdigest()[:12]
+    return _CODE_VERSION
+
+
+def file_digest(path: str, full: bool = False) -> list:
+    """
+    Digest de un archivo de entrada
+
+    Args:
+        full: SHA-256 del contenido (audios); si no, tamaño + mtime como en
+            el índice de medios (clips de video, caros de leer enteros)
+    """
+    st = os.stat(path)
+    if not full:
+        return [os.path.basename(path), st.st_size, st.st_mtime]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return [os.path.basename(path), digest.hexdigest()]
+
+
+def make_job_key(spec: dict, audio_files: list = (), video_files: list = ()) -> str:
+    """Clave SHA-256 de un trabajo de render"""
+    payload = {
+        "spec": spec,
+        "code": code_version(),
+        "audio": [file_digest(p, full=True) for p in audio_files],
+        "video": [file_digest(p) for p in video_files],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+class RenderCache:
+    """Cache LRU en disco de videos finales"""
+
+    def __init__(self, cache_dir: str = None, max_mb: int = None):
+        """
+        Args:
+            cache_dir: Directorio del cache (por defecto RENDER_CACHE_CONFIG["dir"])
+            max_mb: Tamaño máximo antes de expulsar los menos usados
+        """
+        self.cache_dir = cache_dir or RENDER_CACHE_CONFIG["dir"]
+        self.max_bytes = (max_mb or RENDER_CACHE_CONFIG["max_mb"]) * 1024 * 1024
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def get(self, key: str, output_path: str) -> str:
+        """
+        Deja en output_path el video de un trabajo idéntico, si existe
+
+        Returns:
+            output_path si hubo acierto, None si no
+        """
+        cached = self._path(key)
+        with self._lock:
+            if not os.path.exists(cached):
+                return None
+            place_file(cached, output_path)
+            # Marca de uso para el LRU
+            os.utime(cached)
+        return output_path
+
+    def put(self, key: str, output_path: str):
+        """Registra un render terminado (copia atómica) y aplica el límite"""
+        cached = self._path(key)
+        with self._lock:
+            tmp_path = cached + ".tmp"
+            place_file(output_path, tmp_path)
+            os.replace(tmp_path, cached)
+            # copy2 conserva el mtime de la salida: marcarla como recién usada
+            os.utime(cached)
+            self._evict()
+
+    def _evict(self):
+        """Expulsa los videos usados hace más tiempo hasta caber en max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp4"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        # El recién guardado (el más reciente) se queda aunque solo él supere el límite
+        while total > self.max_bytes and len(entries) > 1:
+            _, size, path = entries.pop(0)
+            os.remove(path)
+            total -= size
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """Cache compartido del proceso (None si está desactivado)"""
+    global _CACHE
+    if not RENDER_CACHE_CONFIG.get("enabled", True):
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = RenderCache()
+        return _CACHE
@@ -0,0 +1,307 @@
+"""
+Smart render: re-codifica só os segmentos que mudaram
+O vídeo é dividido em segmentos (um por clip_N da sequência, cortados no
+início exato do grupo arredondado ao frame, mais cabeça/cauda opcionais para
+hook/CTA). Cada segmento é codificado à parte
+(sem áudio, GOP fechado) e guardado num cache endereçado pelo hash das suas
+entradas; a saída final é a junção dos segmentos com -c copy + o áudio.
+Trocar um vídeo do clip_2 ou o CTA só re-codifica os segmentos afetados.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import Counter
+from config import SMART_RENDER_CONFIG, MEZZANINE_CONFIG, ASS_SUBTITLE_CONFIG, RENDER_PROFILES
+from modules.ffmpeg_render import run_ffmpeg, write_concat_list, escape_filter_value
+from modules.media_index import get_media_index
+from modules.subtitles import generate_ass
+
+# Mudar quando o formato dos segmentos mudar (invalida o cache)
+SEGMENT_VERSION = 2
+
+_LOCK = threading.Lock()
+# Um lock por chave de segmento (verificação + codificação + replace) e quantos
+# renders em andamento usam cada chave (_evict não apaga esses)
+_KEY_LOCKS = {}
+_IN_USE = Counter()
+
+
+def _acquire(key):
+    """Marca a chave como em uso e devolve o seu lock"""
+    with _LOCK:
+        _IN_USE[key] += 1
+        return _KEY_LOCKS.setdefault(key, threading.Lock())
+
+
+def _release(keys):
+    """Libera as chaves de um render (o lock some quando ninguém mais usa)"""
+    with _LOCK:
+        for key in keys:
+            _IN_USE[key] -= 1
+            if _IN_USE[key] <= 0:
+                del _IN_USE[key]
+                _KEY_LOCKS.pop(key, None)
+
+
+def _fingerprint(path):
+    """Identidade barata de um arquivo de entrada: caminho, tamanho e mtime"""
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime]
+
+
+def gop_seconds():
+    """Duração de um GOP das mezzanines (mesmo GOP nos segmentos)"""
+    return MEZZANINE_CONFIG["gop"] / MEZZANINE_CONFIG["fps"]
+
+
+def plan_segments(groups, duration, head=0.0, tail=0.0, fps=None):
+    """
+    Divide a linha do tempo em segmentos, um por grupo
+
+    Cada grupo ocupa a sua duração arredondada ao frame e o seguinte começa
+    exatamente ali: um segmento só contém os clipes do seu grupo, desde o
+    início de cada um, então trocar um clipe não muda os segmentos vizinhos
+    (cada segmento é codificado com GOP fechado próprio, não precisa coincidir
+    com o GOP das mezzanines; a diferença de menos de meio frame entre a soma
+    dos clipes e o segmento é cortada ou preenchida na codificação)
+
+    Args:
+        groups: lista [(nome, [clipes])] na ordem da sequência (clip_1, clip_2...)
+        duration: duração total da saída
+        head, tail: segundos iniciais/finais separados em segmentos próprios
+            ("head"/"tail") para variantes de hook/CTA
+        fps: frames por segundo da saída (padrão MEZZANINE_CONFIG["fps"])
+
+    Retorna lista de dicts {name, start, end, clips: [{path, inpoint, length}]}
+    """
+    index = get_media_index()
+    fps = fps or MEZZANINE_CONFIG["fps"]
+
+    def _frame(t):
+        return round(t * fps) / fps
+
+    timeline = []  # (clipe, início, fim)
+    segments = []
+    frame = 0  # Início do grupo atual, em frames
+    for name, clips in groups:
+        start = frame / fps
+        t = start
+        entries = []
+        for clip in clips:
+            d = index.get_duration(clip) or 0.0
+            entries.append((clip, t, t + d))
+            t += d
+        # O próximo grupo começa no frame mais próximo do fim deste
+        frame += round((t - start) * fps)
+        end = frame / fps
+        timeline += [(clip, s, min(e, end)) for clip, s, e in entries if s < end]
+        if end > start:
+            segments.append({"name": name, "start": start, "end": end})
+    t = frame / fps
+
+    duration = min(duration, t)
+    segments = [dict(seg, end=min(seg["end"], duration)) for seg in segments
+                if seg["start"] < duration - 1e-6]
+
+    if head and segments:
+        cut = _frame(head)
+        first = segments[0]
+        if first["start"] < cut < first["end"]:
+            segments[0:1] = [{"name": "head", "start": first["start"], "end": cut},
+                             dict(first, start=cut)]
+    if tail and segments:
+        cut = max(_frame(duration - tail), 0.0)
+        last = segments[-1]
+        if last["start"] < cut < last["end"]:
+            segments[-1:] = [dict(last, end=cut),
+                             {"name": "tail", "start": cut, "end": last["end"]}]
+
+    for seg in segments:
+        seg["clips"] = [
+            {"path": clip, "inpoint": max(seg["start"] - s, 0.0),
+             "length": min(seg["end"], e) - max(seg["start"], s)}
+            for clip, s, e in timeline
+            if s < seg["end"] and e > seg["start"]
+        ]
+    return segments
+
+
+def _segment_words(word_timings, start, end):
+    """Palavras que aparecem no segmento, com tempos relativos ao seu início"""
+    words = []
+    for w in word_timings or []:
+        if w["end"] > start and w["start"] < end:
+            words.append({
+                "word": w["word"],
+                "start": round(max(w["start"], start) - start, 3),
+                "end": round(min(w["end"], end) - start, 3),
+            })
+    return words
+
+
+def segment_key(seg, words, profile, extra_filter=None):
+    """Hash das entradas de um segmento: mesmo hash = mesmo vídeo"""
+    spec = {
+        "version": SEGMENT_VERSION,
+        "profile": profile,
+        "length": round(seg["end"] - seg["start"], 3),
+        "inputs": [_fingerprint(c["path"]) + [round(c["inpoint"], 3), round(c["length"], 3)]
+                   for c in seg["clips"]],
+        "words": words,
+        "style": ASS_SUBTITLE_CONFIG,
+        "extra_filter": extra_filter,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _encode_segment(seg, words, profile, extra_filter, output_path):
+    """Codifica um segmento (vídeo apenas) com GOP fechado e parâmetros fixos"""
+    width, height, fps = profile["width"], profile["height"], profile["fps"]
+    length = seg["end"] - seg["start"]
+
+    cmd = ["ffmpeg", "-y"]
+    for clip in seg["clips"]:
+        cmd += ["-ss", f"{clip['inpoint']:.3f}", "-t", f"{clip['length']:.3f}", "-i", clip["path"]]
+
+    n = len(seg["clips"])
+    chain = "".join(f"[{i}:v]" for i in range(n)) + f"concat=n={n}:v=1:a=0,"
+    chain += (f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},"
+              f"setsar=1,fps={fps},format=yuv420p,"
+              # Os clipes podem somar até meio frame a menos que o segmento: repete o último
+              f"tpad=stop_mode=clone:stop_duration={2 / fps:.4f},"
+              f"trim=duration={length:.3f},setpts=PTS-STARTPTS")
+
+    ass_path = None
+    if words:
+        ass_path = output_path + ".ass"
+        # PlayRes fixo em 1080x1920: o libass escala para o tamanho do perfil
+        generate_ass(words, ass_path)
+        chain += f",ass={escape_filter_value(ass_path)}"
+    if extra_filter:
+        chain += f",{extra_filter}"
+
+    gop = str(int(round(gop_seconds() * fps)))
+    cmd += [
+        "-filter_complex", chain + "[v]", "-map", "[v]",
+        "-r", str(fps), "-c:v", "libx264", "-preset", profile["preset"],
+        "-crf", str(profile["crf"] if profile["crf"] is not None else 23),
+        "-pix_fmt", "yuv420p",
+        "-g", gop, "-keyint_min", gop, "-sc_threshold", "0", "-x264-params", "open-gop=0",
+        "-video_track_timescale", str(fps * 512),
+        "-an", output_path
+    ]
+    ok = run_ffmpeg(cmd, f"segmento {seg['name']}")
+    if ass_path and os.path.exists(ass_path):
+        os.remove(ass_path)
+    return ok
+
+
+def _evict(cache_dir, max_bytes, in_use=()):
+    """
+    Remove os segmentos usados há mais tempo até caber em max_bytes
+    (nunca os de in_use, que renders em andamento ainda vão juntar)
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if (name.endswith(".mp4") and not name.endswith(".part.mp4")
+                and name[:-len(".mp4")] not in in_use):
+            path = os.path.join(cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+def render_segmented(groups, audio_path, duration, output_path, word_timings=None, profile=None,
+                     head=None, tail=None, head_filter=None, tail_filter=None,
+                     audio_bitrate=None):
+    """
+    Renderiza um short por segmentos, reaproveitando os que não mudaram
+
+    Args:
+        groups: lista [(nome, [clipes])] na ordem (clipes normalizados/mezzanine)
+        audio_path: áudio da narração (adicionado na junção, sem re-codificar vídeo)
+        duration: duração do vídeo
+        output_path: arquivo final
+        word_timings: legendas {word, start, end} (tempo absoluto)
+        profile: dict de RENDER_PROFILES (padrão "final")
+        head, tail: segundos separados no início/fim (padrão SMART_RENDER_CONFIG)
+        head_filter, tail_filter: filtros extra só nesses segmentos (hook/CTA)
+
+    Retorna o manifesto de segmentos (também salvo no cache, em
+    <dir>/<nome da saída>.segments.json) ou None se algum passo falhar
+    """
+    cfg = SMART_RENDER_CONFIG
+    profile = profile or RENDER_PROFILES["final"]
+    head = cfg["head_seconds"] if head is None else head
+    tail = cfg["tail_seconds"] if tail is None else tail
+    cache_dir = cfg["dir"]
+    os.makedirs(cache_dir, exist_ok=True)
+
+    segments = plan_segments(groups, duration, head=head, tail=tail, fps=profile["fps"])
+    if not segments:
+        return None
+
+    manifest = {"output": os.path.abspath(output_path), "audio": _fingerprint(audio_path),
+                "profile": profile, "segments": []}
+    paths = []
+    keys = []
+    reused = 0
+    try:
+        for seg in segments:
+            extra = head_filter if seg["name"] == "head" else tail_filter if seg["name"] == "tail" else None
+            words = _segment_words(word_timings, seg["start"], seg["end"])
+            key = segment_key(seg, words, profile, extra)
+            path = os.path.join(cache_dir, f"{key}.mp4")
+            key_lock = _acquire(key)
+            keys.append(key)
+
+            # Outro worker com a mesma chave espera aqui e reaproveita o segmento
+            with key_lock:
+                hit = os.path.exists(path)
+                if hit:
+                    os.utime(path)
+                    reused += 1
+                else:
+                    tmp_path = os.path.join(cache_dir, f"{key}.part.mp4")
+                    if not _encode_segment(seg, words, profile, extra, tmp_path):
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        return None
+                    os.replace(tmp_path, path)
+
+            paths.append(path)
+            manifest["segments"].append({
+                "name": seg["name"], "start": seg["start"], "end": seg["end"], "key": key,
+                "reused": hit, "inputs": [dict(c, path=os.path.abspath(c["path"])) for c in seg["clips"]],
+            })
+
+        print(f"   🧩 Segmentos: {reused} reaproveitados, {len(segments) - reused} codificados")
+
+        # Junção sem re-codificar o vídeo + áudio da narração
+        list_file = write_concat_list(paths, os.path.splitext(os.path.basename(output_path))[0] + "_seg")
+        cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file, "-i", audio_path,
+               "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac"]
+        if audio_bitrate:
+            cmd += ["-b:a", audio_bitrate]
+        cmd += ["-shortest", "-movflags", "+faststart", output_path]
+        ok = run_ffmpeg(cmd, "junção dos segmentos")
+        os.remove(list_file)
+        if not ok:
+            return None
+
+        # Fora de OUTPUT_DIR: lá só fica o .mp4
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        with open(os.path.join(cache_dir, stem + ".segments.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        with _LOCK:
+            _evict(cache_dir, cfg["max_mb"] * 1024 * 1024, in_use=set(_IN_USE))
+        return manifest
+    finally:
+        _release(keys)
@@ -7,12 +7,20 @@ Usa Whisper para sincronização precisa com a voz
 
 import subprocess
 import os
+import re
+import gc
+import difflib
 import json
+import time
+import threading
+from collections import OrderedDict
+
+from config import SUBTITLE_BACKEND, ASS_SUBTITLE_CONFIG, WHISPER_CONFIG
+from modules.ffmpeg_render import escape_filter_value
 
 
 def split_into_words(text):
     """Divide texto em palavras mantendo pontuação"""
-    import re
     # Remove múltiplos espaços e quebras de linha
     text = re.sub(r'\s+', ' ', text.strip())
     # Divide em palavras
@@ -20,18 +28,129 @@ def split_into_words(text):
     return words
 
 
+# Memória aproximada (MB) de cada tamanho de modelo Whisper carregado
+WHISPER_MODEL_MB = {
+    "tiny": 150, "tiny.en": 150,
+    "base": 300, "base.en": 300,
+    "small": 1000, "small.en": 1000,
+    "medium": 3000, "medium.en": 3000,
+    "turbo": 3200,
+    "large": 6000, "large-v1": 6000, "large-v2": 6000, "large-v3": 6000,
+}
+
+
+class WhisperModelRegistry:
+    """
+    Cache de modelos Whisper para o processo inteiro
+    Carrega cada tamanho uma única vez, respeita um orçamento de memória
+    (descarta o menos usado recentemente) e pode descarregar modelos ociosos
+    """
+    
+    def __init__(self, memory_budget_mb=None, idle_unload_seconds=None):
+        self.memory_budget_mb = memory_budget_mb if memory_budget_mb is not None else WHISPER_CONFIG["memory_budget_mb"]
+        self.idle_unload_seconds = idle_unload_seconds if idle_unload_seconds is not None else WHISPER_CONFIG["idle_unload_seconds"]
+        self._models = OrderedDict()  # tamanho -> modelo, em ordem de uso
+        self._last_used = {}
+        self._lock = threading.RLock()
+        self._timer = None
+    
+    def _used_mb(self):
+        return sum(WHISPER_MODEL_MB.get(size, 1000) for size in self._models)
+    
+    def get(self, size=None):
+        """Retorna o modelo (carregando só na primeira vez)"""
+        size = size or WHISPER_CONFIG["model"]
+        with self._lock:
+            model = self._models.get(size)
+            if model is None:
+                needed = WHISPER_MODEL_MB.get(size, 1000)
+                # Liberar os menos usados até caber no orçamento
+                while self._models and self._used_mb() + needed > self.memory_budget_mb:
+                    oldest = next(iter(self._models))
+                    print(f"   🧹 Whisper: descarregando '{oldest}' (orçamento de memória)")
+                    self._unload(oldest)
+                
+                import whisper
+                print(f"   📦 Carregando modelo Whisper '{size}'...")
+                model = whisper.load_model(size)
+                self._models[size] = model
+            
+            self._models.move_to_end(size)
+            self._last_used[size] = time.monotonic()
+            self._schedule_idle_check()
+            return model
+    
+    def warm(self, sizes=None):
+        """Pré-carrega os modelos (ex.: ao iniciar o servidor)"""
+        for size in sizes or WHISPER_CONFIG["preload"]:
+            try:
+                self.get(size)
+            except Exception as e:
+                print(f"   ⚠️ Não foi possível pré-carregar Whisper '{size}': {e}")
+    
+    def _unload(self, size):
+        self._models.pop(size, None)
+        self._last_used.pop(size, None)
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+    
+    def unload(self, size=None):
+        """Descarrega um modelo (ou todos se size=None)"""
+        with self._lock:
+            for name in [size] if size else list(self._models):
+                self._unload(name)
+    
+    def _schedule_idle_check(self):
+        if not self.idle_unload_seconds or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.idle_unload_seconds, self._unload_idle)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _unload_idle(self):
+        with self._lock:
+            self._timer = None
+            now = time.monotonic()
+            for size, last in list(self._last_used.items()):
+                if now - last >= self.idle_unload_seconds:
+                    print(f"   💤 Whisper: descarregando '{size}' (ocioso)")
+                    self._unload(size)
+            if self._models:
+                self._schedule_idle_check()
+
+
+_WHISPER_REGISTRY = WhisperModelRegistry()
+
+# Uma inferência por vez: o alinhamento instala hooks no modelo compartilhado
+# (os idiomas do fan-out rodam em threads)
+_WHISPER_INFERENCE_LOCK = threading.Lock()
+
+
+def get_whisper_model(size=None):
+    """Modelo Whisper compartilhado do processo"""
+    return _WHISPER_REGISTRY.get(size)
+
+
+def warm_whisper_models(sizes=None):
+    """Pré-carrega os modelos configurados em WHISPER_CONFIG['preload']"""
+    _WHISPER_REGISTRY.warm(sizes)
+
+
 def get_word_timestamps_from_audio(audio_path):
     """
     Usa Whisper para extrair timestamps precisos de cada palavra do áudio
     Retorna lista de dicts com {word, start, end}
     """
     try:
-        import whisper
+        # Modelo do cache do processo (tiny é rápido e suficiente para timing)
+        model = get_whisper_model()
         print("   🎤 Transcrevendo áudio com Whisper para timing preciso...")
         
-        # Carregar modelo Whisper (tiny é rápido e suficiente para timing)
-        model = whisper.load_model("tiny")
-        
         # Transcrever com word timestamps
         result = model.transcribe(
             audio_path,
@@ -60,6 +179,145 @@ def get_word_timestamps_from_audio(audio_path):
         return None
 
 
+def whisper_language(idioma):
+    """Converte o código do projeto (ES, EN, pt-BR...) para o código do Whisper"""
+    if not idioma:
+        return None
+    return idioma.lower().replace("_", "-").split("-")[0]
+
+
+def _normalize_word(word):
+    """Minúsculas e sem pontuação, para comparar palavras do roteiro e do áudio"""
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def _spread_timings(slots, words, i1, i2, start, end):
+    """Distribui [start, end] entre words[i1:i2] proporcionalmente ao tamanho"""
+    weights = [max(len(w), 1) for w in words[i1:i2]]
+    total = sum(weights)
+    current = start
+    for k, weight in enumerate(weights):
+        duration = (end - start) * weight / total
+        slots[i1 + k] = (current, current + duration)
+        current += duration
+
+
+def map_timings_to_script(script_words, recognized, total_duration=None):
+    """
+    Projeta timings reconhecidos (Whisper/TTS) sobre as palavras do roteiro
+    Retorna exatamente um timing por palavra do roteiro, com o texto do roteiro
+
+    Palavras iguais recebem o timing direto; trechos diferentes dividem o
+    intervalo reconhecido; palavras não encontradas são interpoladas
+    """
+    recognized = [r for r in recognized if _normalize_word(r['word'])]
+    script_norm = [_normalize_word(w) for w in script_words]
+    recog_norm = [_normalize_word(r['word']) for r in recognized]
+    
+    slots = [None] * len(script_words)
+    matcher = difflib.SequenceMatcher(None, script_norm, recog_norm, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for k in range(i2 - i1):
+                r = recognized[j1 + k]
+                slots[i1 + k] = (r['start'], r['end'])
+        elif tag == 'replace':
+            _spread_timings(slots, script_words, i1, i2,
+                            recognized[j1]['start'], recognized[j2 - 1]['end'])
+    
+    # Interpolar palavras que ficaram sem timing
+    n = len(slots)
+    i = 0
+    while i < n:
+        if slots[i] is not None:
+            i += 1
+            continue
+        j = i
+        while j < n and slots[j] is None:
+            j += 1
+        start = slots[i - 1][1] if i > 0 else 0.0
+        if j < n:
+            end = slots[j][0]
+        elif total_duration:
+            end = total_duration
+        else:
+            end = start + 0.3 * (j - i)
+        _spread_timings(slots, script_words, i, j, start, max(end, start))
+        i = j
+    
+    return [
+        {'word': word, 'start': start, 'end': end}
+        for word, (start, end) in zip(script_words, slots)
+    ]
+
+
+def align_script_to_audio(audio_path, text, language=None):
+    """
+    Alinhamento forçado: usa o roteiro conhecido em vez de transcrever
+    Até 30s (shorts) o texto é alinhado direto ao áudio com a atenção
+    cruzada do Whisper, sem decodificação nem detecção de idioma.
+    Áudios mais longos são transcritos com o idioma fixo e projetados
+    sobre o roteiro.
+
+    Retorna um dict {word, start, end} por palavra do roteiro, ou None
+    """
+    words = split_into_words(text)
+    if not words:
+        return None
+    
+    lang = whisper_language(language)
+    
+    try:
+        from whisper.audio import (
+            SAMPLE_RATE, N_FRAMES, N_SAMPLES, load_audio, log_mel_spectrogram, pad_or_trim
+        )
+        from whisper.timing import find_alignment
+        from whisper.tokenizer import get_tokenizer
+        
+        model = get_whisper_model()
+        audio = load_audio(audio_path)
+        duration = len(audio) / SAMPLE_RATE
+        
+        if duration <= 30.0 and lang:
+            print(f"   🎯 Alinhando roteiro ao áudio ({lang}, {len(words)} palavras)...")
+            tokenizer = get_tokenizer(
+                model.is_multilingual, num_languages=model.num_languages,
+                language=lang, task="transcribe"
+            )
+            mel = log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES)
+            num_frames = min(mel.shape[-1] - N_FRAMES, N_FRAMES)
+            mel_segment = pad_or_trim(mel[:, :N_FRAMES], N_FRAMES).to(model.device)
+            text_tokens = tokenizer.encode(" " + " ".join(words))
+            
+            alignment = find_alignment(model, tokenizer, text_tokens, mel_segment, num_frames)
+            recognized = [
+                {'word': w.word.strip(), 'start': float(w.start), 'end': float(w.end)}
+                for w in alignment
+            ]
+        else:
+            print(f"   🎤 Transcrevendo com idioma fixo ({lang or 'auto'}) para alinhar ao roteiro...")
+            result = model.transcribe(audio_path, word_timestamps=True, language=lang)
+            recognized = [
+                {'word': w['word'].strip(), 'start': w['start'], 'end': w['end']}
+                for segment in result.get("segments", [])
+                for w in segment.get("words", [])
+            ]
+        
+        if not recognized:
+            return None
+        
+        timings = map_timings_to_script(words, recognized, duration)
+        print(f"   ✅ {len(timings)} palavras do roteiro alinhadas")
+        return timings
+    
+    except ImportError:
+        print("   ⚠️ Whisper não instalado, usando distribuição uniforme")
+        return None
+    except Exception as e:
+        print(f"   ⚠️ Erro no alinhamento: {e}")
+        return None
+
+
 def calculate_word_timings(words, total_duration):
     """
     Calcula timestamps para cada palavra
@@ -85,17 +343,25 @@ def calculate_word_timings(words, total_duration):
     return timings
 
 
-def add_subtitles_with_ffmpeg(video_path, text, audio_duration, output_path, audio_path=None):
+def resolve_word_timings(text, audio_duration, audio_path=None, language=None, word_timings=None):
     """
-    Adiciona legendas word-by-word usando FFmpeg drawtext
-    Se audio_path fornecido, usa Whisper para timing preciso
+    Obtém o timing de cada palavra
+    Se o TTS já forneceu word_timings, eles são usados direto (sem Whisper)
+    Se audio_path fornecido, usa Whisper; senão (ou se falhar) distribui uniformemente
+    No modo "align" (WHISPER_CONFIG) o roteiro é alinhado ao áudio com o
+    idioma conhecido e o texto na tela é exatamente o roteiro
     """
-    print("📝 Gerando legendas word-by-word com FFmpeg...")
+    if word_timings:
+        print(f"   ⏱️ Usando timings do TTS ({len(word_timings)} palavras), sem Whisper")
+        return map_timings_to_script(split_into_words(text), word_timings, audio_duration)
     
     # Tentar usar Whisper para timing preciso
-    word_timings = None
     if audio_path:
-        word_timings = get_word_timestamps_from_audio(audio_path)
+        with _WHISPER_INFERENCE_LOCK:
+            if WHISPER_CONFIG.get("mode") == "align":
+                word_timings = align_script_to_audio(audio_path, text, language)
+            if not word_timings:
+                word_timings = get_word_timestamps_from_audio(audio_path)
     
     # Se Whisper falhar, usar distribuição uniforme
     if not word_timings:
@@ -103,12 +369,13 @@ def add_subtitles_with_ffmpeg(video_path, text, audio_duration, output_path, aud
         print(f"   Total de palavras: {len(words)}")
         word_timings = calculate_word_timings(words, audio_duration)
     
-    if not word_timings:
-        print("   ⚠️ Nenhuma palavra para legendar")
-        subprocess.run(["cp", video_path, output_path])
-        return False
-    
-    # Criar filtro drawtext do FFmpeg
+    return word_timings
+
+
+def build_drawtext_filter(word_timings):
+    """
+    Monta a cadeia de filtros drawtext (um filtro por palavra)
+    """
     drawtext_filters = []
     
     for timing in word_timings:
@@ -131,28 +398,204 @@ def add_subtitles_with_ffmpeg(video_path, text, audio_duration, output_path, aud
         drawtext_filters.append(filter_str)
     
     # Concatenar todos os filtros com vírgula
-    full_filter = ",".join(drawtext_filters)
-    
-    # Comando FFmpeg
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", video_path,
-        "-vf", full_filter,
-        "-codec:a", "copy",
-        output_path
+    return ",".join(drawtext_filters)
+
+
+def build_cta_filter(text, start=None):
+    """
+    Filtro drawtext do CTA (texto fixo no terço inferior)
+    start: a partir de quando aparece (None = o trecho inteiro, p.ex. o
+    segmento final do smart render, que começa em t=0)
+    """
+    text = text.replace("\\", "\\\\").replace("'", "\\'").replace(":", "\\:")
+    filter_str = (
+        f"drawtext=text='{text}':"
+        f"fontfile=/System/Library/Fonts/Supplemental/Impact.ttf:"
+        f"fontsize=50:"
+        f"fontcolor=white:"
+        f"borderw=3:"
+        f"bordercolor=black:"
+        f"x=(w-text_w)/2:"
+        f"y=h*0.80"
+    )
+    if start is not None:
+        filter_str += f":enable='gte(t,{start:.3f})'"
+    return filter_str
+
+
+def format_ass_time(seconds):
+    """Formata segundos para formato ASS: H:MM:SS.cc"""
+    centis = int(round(max(seconds, 0) * 100))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def escape_ass_text(text):
+    """Evita que chaves e barras do texto virem tags ASS"""
+    return text.replace("\\", "\\\\").replace("{", "(").replace("}", ")")
+
+
+def group_into_phrases(word_timings, max_words=4, max_gap=0.6):
+    """
+    Agrupa palavras em frases curtas para exibição
+    Quebra ao atingir max_words, numa pausa maior que max_gap
+    ou depois de pontuação final
+    """
+    phrases = []
+    current = []
+    
+    for timing in word_timings:
+        if current:
+            gap = timing['start'] - current[-1]['end']
+            ends_sentence = current[-1]['word'].rstrip('"\'»”').endswith(('.', '!', '?', '…', ';', ':'))
+            if len(current) >= max_words or gap > max_gap or ends_sentence:
+                phrases.append(current)
+                current = []
+        current.append(timing)
+    
+    if current:
+        phrases.append(current)
+    return phrases
+
+
+def _ass_color(rgb_hex, alpha=0):
+    """Converte '#RRGGBB' para o formato ASS &HAABBGGRR"""
+    rgb_hex = rgb_hex.lstrip('#')
+    r, g, b = rgb_hex[0:2], rgb_hex[2:4], rgb_hex[4:6]
+    return f"&H{alpha:02X}{b}{g}{r}".upper()
+
+
+def generate_ass(word_timings, output_path, width=1080, height=1920, karaoke=True, style=None):
+    """
+    Gera arquivo .ass com as legendas agrupadas em frases
+    Com karaoke=True cada palavra acende (tag karaoke do ASS) no seu próprio tempo
+
+    Args:
+        word_timings: lista de dicts {word, start, end}
+        output_path: caminho do .ass
+        width, height: resolução do vídeo (PlayResX/PlayResY)
+        karaoke: destacar a palavra falada dentro da frase
+        style: dict que sobrescreve ASS_SUBTITLE_CONFIG
+
+    Retorna output_path
+    """
+    cfg = dict(ASS_SUBTITLE_CONFIG, **(style or {}))
+    
+    # Primary = palavra já falada/destacada, Secondary = palavra ainda por vir
+    primary = _ass_color(cfg["highlight_color"] if karaoke else cfg["color"])
+    secondary = _ass_color(cfg["color"])
+    outline = _ass_color(cfg["outline_color"])
+    
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{cfg['font']},{cfg['fontsize']},{primary},{secondary},{outline},"
+        f"&H80000000,{-1 if cfg['bold'] else 0},0,0,0,100,100,0,0,1,{cfg['outline']},"
+        f"{cfg['shadow']},{cfg['alignment']},{cfg['margin_h']},{cfg['margin_h']},{cfg['margin_v']},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
     ]
     
-    print(f"   Aplicando {len(word_timings)} legendas...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    fade = cfg.get("fade_ms", 0)
+    fade_tag = f"{{\\fad({fade},{fade})}}" if fade else ""
     
-    if result.returncode != 0:
-        print(f"⚠️ Erro ao adicionar legendas: {result.stderr}")
-        # Se falhar, copiar vídeo sem legendas
+    def word_text(timing):
+        word = timing['word'].upper() if cfg.get("uppercase") else timing['word']
+        return escape_ass_text(word)
+    
+    for phrase in group_into_phrases(word_timings, cfg["words_per_phrase"], cfg["max_gap"]):
+        start = phrase[0]['start']
+        end = phrase[-1]['end']
+        
+        if karaoke:
+            parts = []
+            for i, timing in enumerate(phrase):
+                next_start = phrase[i + 1]['start'] if i + 1 < len(phrase) else timing['end']
+                # Duração em centésimos até a próxima palavra acender
+                k = max(int(round((next_start - timing['start']) * 100)), 1)
+                parts.append(f"{{\\k{k}}}{word_text(timing)}")
+            text = " ".join(parts)
+        else:
+            text = " ".join(word_text(t) for t in phrase)
+        
+        lines.append(
+            f"Dialogue: 0,{format_ass_time(start)},{format_ass_time(end)},Default,,0,0,0,,{fade_tag}{text}"
+        )
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    
+    return output_path
+
+
+def build_ass_filter(word_timings, ass_path, width=1080, height=1920, karaoke=True, style=None):
+    """
+    Gera o .ass e retorna o filtro 'ass' que o queima com libass
+    O custo por frame não depende do número de palavras
+    """
+    generate_ass(word_timings, ass_path, width=width, height=height, karaoke=karaoke, style=style)
+    return f"ass={escape_filter_value(ass_path)}"
+
+
+def add_subtitles_with_ffmpeg(video_path, text, audio_duration, output_path, audio_path=None,
+                              backend=None, language=None, word_timings=None):
+    """
+    Adiciona legendas word-by-word usando FFmpeg (libass ou drawtext)
+    Se word_timings vier do TTS, o Whisper não é usado
+    Se audio_path fornecido, usa Whisper para timing preciso
+    O .ass fica salvo ao lado do vídeo de saída
+    """
+    print("📝 Gerando legendas word-by-word com FFmpeg...")
+    
+    backend = backend or SUBTITLE_BACKEND
+    word_timings = resolve_word_timings(text, audio_duration, audio_path, language, word_timings)
+    
+    if not word_timings:
+        print("   ⚠️ Nenhuma palavra para legendar")
         subprocess.run(["cp", video_path, output_path])
         return False
     
-    print("   ✅ Legendas adicionadas com sucesso!")
-    return True
+    print(f"   Aplicando {len(word_timings)} legendas ({backend})...")
+    filters = []
+    if backend == "ass":
+        ass_path = os.path.splitext(output_path)[0] + ".ass"
+        filters.append(build_ass_filter(word_timings, ass_path))
+    # drawtext sempre como alternativa (ex.: FFmpeg sem libass)
+    filters.append(build_drawtext_filter(word_timings))
+    
+    for full_filter in filters:
+        # Comando FFmpeg
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", video_path,
+            "-vf", full_filter,
+            "-codec:a", "copy",
+            output_path
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        
+        if result.returncode == 0:
+            print("   ✅ Legendas adicionadas com sucesso!")
+            return True
+        
+        print(f"⚠️ Erro ao adicionar legendas: {result.stderr}")
+    
+    # Se falhar, copiar vídeo sem legendas
+    subprocess.run(["cp", video_path, output_path])
+    return False
 
 
 def generate_srt(word_timings, output_path):
@@ -0,0 +1,176 @@
+"""
+Rasterizado de texto con PIL
+Dibuja un texto (con contorno y ajuste de línea, como TextClip method="caption")
+en un PNG transparente para superponerlo con el filtro overlay de ffmpeg
+o como ImageClip de MoviePy. cached_text guarda cada PNG por contenido, así
+que un texto repetido (el CTA fijo) cuesta leer un archivo
+"""
+import os
+import json
+import math
+import hashlib
+import threading
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+from config import TEXT_CACHE_CONFIG
+
+# Cambiar si cambia el dibujo (invalida los PNG en cache)
+RASTER_VERSION = 1
+
+_CACHE_LOCK = threading.Lock()
+
+
+# Nombres de ImageMagick/MoviePy → archivos TrueType habituales
+FONT_FILES = {
+    "Arial": ["arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+    "Arial-Bold": ["arialbd.ttf", "Arial Bold.ttf", "Arial_Bold.ttf",
+                   "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+    "Impact": ["impact.ttf", "Impact.ttf", "DejaVuSans-Bold.ttf"],
+}
+
+FONT_DIRS = [
+    "/usr/share/fonts/truetype/msttcorefonts",
+    "/usr/share/fonts/truetype/liberation",
+    "/usr/share/fonts/truetype/dejavu",
+    "/Library/Fonts",
+    "/System/Library/Fonts/Supplemental",
+    "C:\\Windows\\Fonts",
+]
+
+
+@lru_cache(maxsize=32)
+def load_font(name: str, size: int):
+    """
+    Carga una fuente por nombre (p.ej. "Arial-Bold") y tamaño
+
+    Returns:
+        ImageFont (la fuente por defecto de PIL si no se encuentra ninguna)
+    """
+    candidates = FONT_FILES.get(name, []) + [name, f"{name}.ttf"]
+    for candidate in candidates:
+        paths = [candidate] + [os.path.join(d, candidate) for d in FONT_DIRS]
+        for path in paths:
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1: fuente bitmap sin tamaño
+        return ImageFont.load_default()
+
+
+def wrap_text(text: str, font, max_width: int, stroke_width: int = 0) -> str:
+    """Parte el texto en líneas que quepan en max_width píxeles"""
+    lines = []
+    for paragraph in text.split("\n"):
+        current = ""
+        for word in paragraph.split():
+            candidate = f"{current} {word}" if current else word
+            if current and font.getlength(candidate) + 2 * stroke_width > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        lines.append(current)
+    return "\n".join(lines)
+
+
+def render_text(text: str, output_path: str, fontsize: int, color: str = "white",
+                font: str = "Arial-Bold", stroke_color: str = None, stroke_width: int = 0,
+                max_width: int = None, align: str = "center") -> tuple:
+    """
+    Dibuja un texto en un PNG RGBA recortado a su contenido
+
+    Args:
+        text: Texto a dibujar
+        output_path: Ruta del PNG
+        fontsize: Tamaño en píxeles
+        color: Color del relleno
+        font: Nombre de la fuente (como en SUBTITLE_CONFIG)
+        stroke_color, stroke_width: Contorno
+        max_width: Ancho máximo; si se da, el texto se parte en líneas
+        align: Alineación de las líneas
+
+    Returns:
+        (ancho, alto) del PNG generado
+    """
+    pil_font = load_font(font, fontsize)
+    if max_width:
+        text = wrap_text(text, pil_font, max_width, stroke_width)
+
+    stroke_width = stroke_width if stroke_color else 0
+    probe = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    left, top, right, bottom = probe.multiline_textbbox(
+        (0, 0), text, font=pil_font, align=align, stroke_width=stroke_width
+    )
+    # Pillow >= 10 devuelve floats con align="center": redondear hacia afuera
+    left, top = math.floor(left), math.floor(top)
+    width, height = max(math.ceil(right) - left, 1), max(math.ceil(bottom) - top, 1)
+
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text(
+        (-left, -top), text, font=pil_font, fill=color, align=align,
+        stroke_width=stroke_width, stroke_fill=stroke_color
+    )
+    image.save(output_path)
+    return width, height
+
+
+def text_key(text: str, fontsize: int, color: str = "white", font: str = "Arial-Bold",
+             stroke_color: str = None, stroke_width: int = 0, max_width: int = None,
+             align: str = "center") -> str:
+    """Clave SHA-256 del PNG que dibujaría render_text con estos parámetros"""
+    spec = {
+        "version": RASTER_VERSION,
+        "text": text,
+        "fontsize": fontsize,
+        "color": color,
+        "font": font,
+        "stroke_color": stroke_color,
+        "stroke_width": stroke_width if stroke_color else 0,
+        "max_width": max_width,
+        "align": align,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def cached_text(text: str, fontsize: int, color: str = "white", font: str = "Arial-Bold",
+                stroke_color: str = None, stroke_width: int = 0, max_width: int = None,
+                align: str = "center") -> str:
+    """
+    PNG RGBA del texto desde el cache (se dibuja solo la primera vez)
+
+    Mismos argumentos que render_text. El archivo es compartido: no borrarlo
+
+    Returns:
+        Ruta al PNG
+    """
+    cache_dir = TEXT_CACHE_CONFIG["dir"]
+    key = text_key(text, fontsize, color, font, stroke_color, stroke_width, max_width, align)
+    path = os.path.join(cache_dir, f"{key}.png")
+
+    with _CACHE_LOCK:
+        if os.path.exists(path):
+            # Marca de uso para el LRU
+            os.utime(path)
+            return path
+
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = os.path.join(cache_dir, f"{key}.tmp.png")
+        render_text(text, tmp_path, fontsize, color=color, font=font, stroke_color=stroke_color,
+                    stroke_width=stroke_width, max_width=max_width, align=align)
+        os.replace(tmp_path, path)
+        _evict(cache_dir, TEXT_CACHE_CONFIG["max_entries"])
+    return path
+
+
+def _evict(cache_dir: str, max_entries: int):
+    """Borra los PNG usados hace más tiempo por encima de max_entries"""
+    entries = sorted(
+        (os.path.getmtime(os.path.join(cache_dir, name)), os.path.join(cache_dir, name))
+        for name in os.listdir(cache_dir) if name.endswith(".png") and ".tmp." not in name
+    )
+    for _, path in entries[:max(len(entries) - max_entries, 0)]:
+        os.remove(path)
@@ -0,0 +1,145 @@
+"""
+Transiciones entre imágenes sin asignar memoria por frame
+Las imágenes se decodifican y escalan una sola vez (KenBurnsEngine.load) y
+cada frame se escribe en buffers uint8/uint16 preasignados: las mezclas se
+hacen en el sitio con aritmética entera ((a*(256-α) + b*α) >> 8) en lugar de
+las máscaras float de crossfadein + CompositeVideoClip
+"""
+import numpy as np
+from modules.motion import KenBurnsEngine
+
+TRANSITIONS = ("crossfade", "dip", "slide")
+
+
+class TransitionEngine:
+    """Buffers de trabajo y mezclas en el sitio para frames (height, width, 3)"""
+
+    def __init__(self, width: int, height: int):
+        shape = (height, width, 3)
+        self.width = width
+        self.height = height
+        self._acc = np.empty(shape, dtype=np.uint16)
+        self._tmp = np.empty(shape, dtype=np.uint16)
+
+    @staticmethod
+    def _alpha(progress: float) -> int:
+        """Progreso 0..1 → peso entero 0..256"""
+        return int(round(min(max(progress, 0.0), 1.0) * 256))
+
+    def scale(self, frame: np.ndarray, weight: int, out: np.ndarray) -> np.ndarray:
+        """out = frame * weight / 256"""
+        np.multiply(frame, weight, out=self._acc, dtype=np.uint16)
+        np.right_shift(self._acc, 8, out=self._acc)
+        np.copyto(out, self._acc, casting="unsafe")
+        return out
+
+    def crossfade(self, a: np.ndarray, b: np.ndarray, progress: float,
+                  out: np.ndarray) -> np.ndarray:
+        """Fundido cruzado de a hacia b"""
+        alpha = self._alpha(progress)
+        np.multiply(a, 256 - alpha, out=self._acc, dtype=np.uint16)
+        np.multiply(b, alpha, out=self._tmp, dtype=np.uint16)
+        np.add(self._acc, self._tmp, out=self._acc)
+        np.right_shift(self._acc, 8, out=self._acc)
+        np.copyto(out, self._acc, casting="unsafe")
+        return out
+
+    def dip(self, a: np.ndarray, b: np.ndarray, progress: float,
+            out: np.ndarray) -> np.ndarray:
+        """Fundido a negro: a se apaga en la primera mitad y b aparece en la segunda"""
+        if progress < 0.5:
+            return self.scale(a, self._alpha(1 - 2 * progress), out)
+        return self.scale(b, self._alpha(2 * progress - 1), out)
+
+    def slide(self, a: np.ndarray, b: np.ndarray, progress: float,
+              out: np.ndarray) -> np.ndarray:
+        """b entra desde la derecha empujando a (solo copias de vistas)"""
+        offset = int(round(min(max(progress, 0.0), 1.0) * self.width))
+        if offset < self.width:
+            out[:, :self.width - offset] = a[:, offset:]
+        if offset:
+            out[:, self.width - offset:] = b[:, :offset]
+        return out
+
+    def blend(self, kind: str, a: np.ndarray, b: np.ndarray, progress: float,
+              out: np.ndarray) -> np.ndarray:
+        """Aplica la transición kind ("crossfade", "dip" o "slide")"""
+        if kind not in TRANSITIONS:
+            raise ValueError(f"Transición desconocida: {kind}")
+        return getattr(self, kind)(a, b, progress, out)
+
+
+class Slideshow:
+    """
+    Secuencia de imágenes con Ken Burns y transiciones, frame a frame
+    Misma línea de tiempo que create_multi_image_video: la imagen i empieza
+    en i * segment y dura segment + transition (la transición solapa con la
+    siguiente)
+    """
+
+    def __init__(self, images: list, duration: float, width: int, height: int, fps: int,
+                 transition: str = "crossfade", transition_duration: float = 0.8,
+                 motions: list = None):
+        """
+        Args:
+            images: Rutas de las imágenes
+            duration: Duración total
+            transition: Tipo de transición (TRANSITIONS)
+            motions: (zoom_direction, pan_direction) por imagen
+        """
+        self.duration = duration
+        self.fps = fps
+        self.transition = transition
+        self.transition_duration = transition_duration
+        self.segment = duration / len(images)
+
+        self._motion = KenBurnsEngine(width, height, fps)
+        self._engine = TransitionEngine(width, height)
+        self._layers = []
+        for i, path in enumerate(images):
+            zoom_direction, pan_direction = motions[i] if motions else ("in", None)
+            # Decodificada y escalada una sola vez
+            image = self._motion.load(path)
+            self._layers.append({
+                "image": image,
+                "pixels": np.asarray(image),
+                "rects": self._motion.trajectory(image.width, image.height,
+                                                 self.segment + transition_duration,
+                                                 zoom_direction, pan_direction),
+            })
+
+        shape = (height, width, 3)
+        self._a = np.empty(shape, dtype=np.uint8)
+        self._b = np.empty(shape, dtype=np.uint8)
+        self._out = np.empty(shape, dtype=np.uint8)
+
+    def _render_layer(self, index: int, local_t: float, out: np.ndarray) -> np.ndarray:
+        layer = self._layers[index]
+        rects = layer["rects"]
+        rect = rects[min(max(int(local_t * self.fps), 0), len(rects) - 1)]
+        frame = self._motion.render_frame(layer["image"], layer["pixels"], rect, out)
+        if frame is not out:
+            # Sin OpenCV el remuestreo devuelve un array nuevo
+            np.copyto(out, frame)
+        return out
+
+    def frame(self, t: float) -> np.ndarray:
+        """
+        Frame del instante t (buffer compartido: se sobrescribe en la
+        siguiente llamada)
+        """
+        index = min(int(t / self.segment), len(self._layers) - 1)
+        local_t = t - index * self.segment
+
+        if index > 0 and local_t < self.transition_duration:
+            # La imagen anterior sigue visible durante la transición
+            self._render_layer(index - 1, local_t + self.segment, self._a)
+            self._render_layer(index, local_t, self._b)
+            return self._engine.blend(self.transition, self._a, self._b,
+                                      local_t / self.transition_duration, self._out)
+        return self._render_layer(index, local_t, self._out)
+
+    def frames(self):
+        """Generador de todos los frames (para FFmpegFrameSink)"""
+        for i in range(int(round(self.duration * self.fps))):
+            yield self.frame(i / self.fps)
@@ -0,0 +1,140 @@
+"""
+Cache de audio TTS direccionado por contenido
+La clave es un hash de (backend, voz, modelo, ajustes de voz, texto normalizado),
+así que regenerar el mismo guion, reintentar un render o repetir el CTA fijo
+no vuelve a llamar a la API ni gasta caracteres de ElevenLabs
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import unicodedata
+from config import TTS_CACHE_CONFIG
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza Unicode y espacios para que textos equivalentes compartan clave"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_key(backend: str, voice: str, text: str, model_id: str = None,
+             voice_settings: dict = None) -> str:
+    """Clave SHA-256 del audio que produciría esta petición"""
+    spec = {
+        "backend": backend,
+        "voice": voice,
+        "model_id": model_id,
+        "voice_settings": voice_settings,
+        "text": normalize_text(text),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def place_file(src: str, dest: str):
+    """
+    Deja una copia de src en dest
+    Copia y no hard link: quien escribe luego en dest en el sitio (ffmpeg -y,
+    open(..., "wb")) corrompería la entrada del cache que comparte el inodo
+    """
+    if os.path.abspath(src) == os.path.abspath(dest):
+        return
+    if os.path.exists(dest):
+        os.remove(dest)
+    shutil.copy2(src, dest)
+
+
+class TTSCache:
+    """Cache LRU en disco de audios TTS (con sus timings por palabra)"""
+
+    def __init__(self, cache_dir: str = None, max_mb: int = None):
+        """
+        Args:
+            cache_dir: Directorio del cache (por defecto TTS_CACHE_CONFIG["dir"])
+            max_mb: Tamaño máximo antes de expulsar los menos usados
+        """
+        self.cache_dir = cache_dir or TTS_CACHE_CONFIG["dir"]
+        self.max_bytes = (max_mb or TTS_CACHE_CONFIG["max_mb"]) * 1024 * 1024
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple:
+        return (os.path.join(self.cache_dir, f"{key}.mp3"),
+                os.path.join(self.cache_dir, f"{key}.json"))
+
+    def get(self, key: str, output_path: str, need_timings: bool = False):
+        """
+        Busca un audio en el cache y lo deja en output_path
+
+        Returns:
+            (output_path, timings) si hay acierto, None si no
+        """
+        audio, meta = self._paths(key)
+        with self._lock:
+            if not os.path.exists(audio):
+                return None
+
+            timings = None
+            if os.path.exists(meta):
+                with open(meta, encoding="utf-8") as f:
+                    timings = json.load(f).get("timings")
+            if need_timings and not timings:
+                return None
+
+            place_file(audio, output_path)
+            # Marca de uso para el LRU
+            os.utime(audio)
+        return output_path, timings
+
+    def put(self, key: str, audio_path: str, timings: list = None, text: str = ""):
+        """Guarda un audio recién generado (escritura atómica) y aplica el límite"""
+        audio, meta = self._paths(key)
+        with self._lock:
+            tmp_audio = audio + ".tmp"
+            shutil.copyfile(audio_path, tmp_audio)
+            os.replace(tmp_audio, audio)
+
+            tmp_meta = meta + ".tmp"
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump({"text": text[:200], "timings": timings}, f, ensure_ascii=False)
+            os.replace(tmp_meta, meta)
+
+            self._evict()
+
+    def _evict(self):
+        """Expulsa los audios usados hace más tiempo hasta caber en max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, path = entries.pop(0)
+            os.remove(path)
+            meta = path[:-4] + ".json"
+            if os.path.exists(meta):
+                os.remove(meta)
+            total -= size
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    """Cache compartido del proceso (None si está desactivado)"""
+    global _CACHE
+    if not TTS_CACHE_CONFIG.get("enabled", True):
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = TTSCache()
+        return _CACHE
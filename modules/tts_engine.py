@@ -3,9 +3,18 @@ Motor de Text-to-Speech
 Soporta ElevenLabs (con API key) y Edge TTS (gratuito, sin API key)
 """
 import os
+import re
+import time
+import base64
 import asyncio
+import threading
+import subprocess
 import requests
-from config import ELEVENLABS_API_KEY, TTS_CONFIG, TEMP_DIR, AVAILABLE_VOICES
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from config import (ELEVENLABS_API_KEY, TTS_CONFIG, TTS_CHUNK_CONFIG, TTS_HTTP_CONFIG,
+                    TEMP_DIR, AVAILABLE_VOICES)
+from modules.tts_cache import get_tts_cache, make_key as make_tts_key
 
 # Voces de Edge TTS (Microsoft) en español
 EDGE_VOICES = {
@@ -25,6 +34,134 @@ EDGE_VOICES = {
 }
 
 
+# Sesión HTTP compartida (keep-alive: sin handshake TLS por petición)
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+# Estado de ElevenLabs por API key: {api_key: (disponible, momento del chequeo)}
+_HEALTH = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Sesión requests del proceso, con pool de conexiones para los workers TTS"""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            pool = TTS_HTTP_CONFIG["pool_size"]
+            session.mount("https://", HTTPAdapter(pool_connections=pool, pool_maxsize=pool))
+            _SESSION = session
+        return _SESSION
+
+
+def elevenlabs_available(api_key: str, force: bool = False) -> bool:
+    """
+    Comprueba si ElevenLabs responde, reutilizando el resultado durante
+    TTS_HTTP_CONFIG["health_ttl"] segundos
+    
+    Args:
+        api_key: API key a comprobar
+        force: Ignorar el resultado guardado
+    """
+    if not api_key or api_key == "tu_api_key_de_elevenlabs":
+        return False
+    
+    with _HEALTH_LOCK:
+        cached = _HEALTH.get(api_key)
+        if cached and not force and time.time() - cached[1] < TTS_HTTP_CONFIG["health_ttl"]:
+            return cached[0]
+        
+        try:
+            response = get_http_session().get(
+                f"{TTSEngine.BASE_URL}/voices",
+                headers={"xi-api-key": api_key},
+                timeout=TTS_HTTP_CONFIG["health_timeout"]
+            )
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        
+        _HEALTH[api_key] = (ok, time.time())
+        return ok
+
+
+def mark_elevenlabs_down(api_key: str):
+    """Registra un fallo de ElevenLabs para que los motores nuevos usen Edge TTS"""
+    with _HEALTH_LOCK:
+        _HEALTH[api_key] = (False, time.time())
+
+
+def is_elevenlabs_outage(error: Exception) -> bool:
+    """
+    True si el error indica que ElevenLabs no está disponible (sin conexión,
+    timeout, 5xx o API key rechazada), no un fallo de esta petición concreta
+    (texto inválido, límite de peticiones...), que no debe apagar el proveedor
+    """
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    if isinstance(error, requests.exceptions.HTTPError) and response is not None:
+        return response.status_code >= 500 or response.status_code == 401
+    return False
+
+
+def split_into_chunks(text: str, max_chars: int = 600) -> list:
+    """
+    Divide un texto en fragmentos por frases, agrupando frases hasta max_chars
+    Una frase más larga que max_chars queda sola en su fragmento
+    """
+    sentences = [s for s in re.split(r"(?<=[.!?…])\s+", text.strip()) if s]
+    chunks, current = [], ""
+    for sentence in sentences:
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _audio_duration(path: str) -> float:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def concat_audio(paths: list, output_path: str, padding: float = 0.0) -> list:
+    """
+    Une audios en uno solo (una sola codificación, sin huecos de MP3)
+    añadiendo `padding` segundos de silencio entre ellos
+    
+    Returns:
+        Duración de cada audio de entrada (para calcular offsets)
+    """
+    durations = [_audio_duration(p) for p in paths]
+    
+    cmd = ["ffmpeg", "-y"]
+    for p in paths:
+        cmd += ["-i", p]
+    
+    chains = []
+    for i in range(len(paths)):
+        pad = f",apad=pad_dur={padding:.3f}" if padding and i < len(paths) - 1 else ""
+        chains.append(f"[{i}:a]aresample=44100,aformat=channel_layouts=mono{pad}[a{i}]")
+    labels = "".join(f"[a{i}]" for i in range(len(paths)))
+    chains.append(f"{labels}concat=n={len(paths)}:v=0:a=1[out]")
+    
+    cmd += ["-filter_complex", ";".join(chains), "-map", "[out]",
+            "-c:a", "libmp3lame", "-q:a", "2", output_path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Error uniendo audios: {result.stderr[-500:]}")
+    return durations
+
+
 class TTSEngine:
     """Motor de Text-to-Speech con ElevenLabs y Edge TTS"""
     
@@ -61,29 +198,171 @@ class TTSEngine:
             print(f"🔊 Usando ElevenLabs (voz: {voice})")
     
     def _test_elevenlabs(self) -> bool:
-        """Verifica si ElevenLabs está disponible"""
-        if not self.api_key or self.api_key == "tu_api_key_de_elevenlabs":
-            return False
-        
-        try:
-            url = f"{self.BASE_URL}/voices"
-            headers = {"xi-api-key": self.api_key}
-            response = requests.get(url, headers=headers, timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        """Verifica si ElevenLabs está disponible (resultado cacheado por TTL)"""
+        return elevenlabs_available(self.api_key)
     
-    def generate_speech(self, text: str, output_filename: str = None) -> str:
+    def generate_speech(self, text: str, output_filename: str = None,
+                        with_timings: bool = False):
         """
         Genera audio a partir de texto
+        
+        Args:
+            text: Texto a narrar
+            output_filename: Nombre del archivo (sin extensión)
+            with_timings: Devolver también el timing de cada palabra
+            
+        Returns:
+            Ruta al audio, o (ruta, timings) si with_timings=True.
+            timings es una lista de {word, start, end} o None si el
+            backend no los proporcionó
+        """
+        audio_path, timings = self._synthesize(text, output_filename, with_timings)
+        
+        if with_timings:
+            return audio_path, timings
+        return audio_path
+    
+    def _synthesize(self, text: str, output_filename: str = None, with_timings: bool = False,
+                    allow_fallback: bool = True) -> tuple:
+        """
+        Genera (o recupera del cache) un audio
+        
+        Args:
+            allow_fallback: Si ElevenLabs falla, pasar a Edge TTS. Con False
+                se lanza la excepción (para reintentar solo ese fragmento)
+            
+        Returns:
+            (ruta, timings)
         """
+        if not output_filename:
+            output_filename = f"speech_{hash(text) % 10000}"
+        
+        # Cache por contenido: mismo texto + voz + ajustes = mismo audio
+        cache = get_tts_cache()
+        if cache:
+            hit = cache.get(self._cache_key(text), os.path.join(TEMP_DIR, f"{output_filename}.mp3"),
+                            need_timings=with_timings)
+            if hit:
+                print(f"♻️ Audio desde cache TTS: '{text[:50]}...'")
+                return hit
+        
         if self.use_edge:
-            return self._generate_with_edge(text, output_filename)
+            audio_path, timings = self._generate_with_edge(text, output_filename)
         else:
-            return self._generate_with_elevenlabs(text, output_filename)
+            audio_path, timings = self._generate_with_elevenlabs(text, output_filename, with_timings,
+                                                                 allow_fallback=allow_fallback)
+        
+        if cache:
+            # La clave se recalcula: ElevenLabs pudo caer a Edge TTS
+            cache.put(self._cache_key(text), audio_path, timings, text)
+        
+        return audio_path, timings
     
-    def _generate_with_edge(self, text: str, output_filename: str = None) -> str:
-        """Genera audio con Edge TTS (gratuito)"""
+    def generate_speech_chunked(self, text: str, output_filename: str = None,
+                                with_timings: bool = False, max_chars: int = None,
+                                max_workers: int = None, padding: float = None,
+                                retries: int = None) -> tuple:
+        """
+        Genera narraciones largas por fragmentos en paralelo y las une
+        
+        El texto se divide en frases (agrupadas hasta max_chars), cada
+        fragmento se sintetiza en un pool acotado (y pasa por el cache TTS),
+        un fragmento que falla se reintenta solo, y al final se concatenan
+        sin huecos con un silencio controlado entre fragmentos.
+        
+        Args:
+            text: Narración completa
+            output_filename: Nombre del archivo final (sin extensión)
+            with_timings: Pedir timings por palabra a cada fragmento
+            max_chars, max_workers, padding, retries: ver TTS_CHUNK_CONFIG
+            
+        Returns:
+            (ruta, chunks) donde chunks es una lista de dicts
+            {text, start, duration, timings} con el offset de cada
+            fragmento en el audio final (timings ya desplazados)
+        """
+        cfg = TTS_CHUNK_CONFIG
+        max_chars = max_chars or cfg["max_chars"]
+        max_workers = max_workers or cfg["max_workers"]
+        padding = cfg["padding"] if padding is None else padding
+        retries = cfg["retries"] if retries is None else retries
+        
+        if not output_filename:
+            output_filename = f"speech_{hash(text) % 10000}"
+        
+        pieces = split_into_chunks(text, max_chars)
+        print(f"🎙️ Narración en {len(pieces)} fragmentos ({max_workers} en paralelo)...")
+        
+        def synth(index):
+            name = f"{output_filename}_part{index:03d}"
+            for attempt in range(retries + 1):
+                try:
+                    return self._synthesize(pieces[index], name, with_timings, allow_fallback=False)
+                except Exception as e:
+                    if attempt == retries:
+                        raise
+                    wait = 2 ** attempt
+                    print(f"   ⚠️ Fragmento {index + 1} falló ({e}), reintentando en {wait}s...")
+                    time.sleep(wait)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(synth, range(len(pieces))))
+        except Exception as e:
+            if self.use_edge:
+                raise
+            # Misma voz en toda la narración: si un fragmento falla, todo con Edge TTS
+            print(f"⚠️ ElevenLabs falló en un fragmento ({e}), usando Edge TTS para toda la narración...")
+            if is_elevenlabs_outage(e):
+                mark_elevenlabs_down(self.api_key)
+            self.use_edge = True
+            self.edge_voice = EDGE_VOICES.get(self.voice_name, EDGE_VOICES.get("adam"))
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(synth, range(len(pieces))))
+        
+        output_path = os.path.join(TEMP_DIR, f"{output_filename}.mp3")
+        paths = [path for path, _ in results]
+        durations = concat_audio(paths, output_path, padding)
+        
+        chunks = []
+        offset = 0.0
+        for piece, (_, timings), duration in zip(pieces, results, durations):
+            chunks.append({
+                "text": piece,
+                "start": offset,
+                "duration": duration,
+                "timings": [
+                    {"word": t["word"], "start": t["start"] + offset, "end": t["end"] + offset}
+                    for t in timings
+                ] if timings else None,
+            })
+            offset += duration + padding
+        
+        for path in paths:
+            os.remove(path)
+        
+        print(f"✓ Audio guardado: {output_path} ({len(chunks)} fragmentos)")
+        return output_path, chunks
+    
+    def _voice_settings(self) -> dict:
+        """Ajustes de voz de ElevenLabs desde TTS_CONFIG"""
+        return {
+            "stability": TTS_CONFIG["stability"],
+            "similarity_boost": TTS_CONFIG["similarity_boost"],
+            "style": TTS_CONFIG.get("style", 0),
+            "use_speaker_boost": TTS_CONFIG.get("use_speaker_boost", True)
+        }
+    
+    def _cache_key(self, text: str) -> str:
+        """Clave del cache TTS para el backend y la voz actuales"""
+        if self.use_edge:
+            return make_tts_key("edge", self.edge_voice, text)
+        return make_tts_key("elevenlabs", self.voice_id, text,
+                            model_id=TTS_CONFIG["model_id"],
+                            voice_settings=self._voice_settings())
+    
+    def _generate_with_edge(self, text: str, output_filename: str = None) -> tuple:
+        """Genera audio con Edge TTS (gratuito) guardando los eventos WordBoundary"""
         import edge_tts
         
         if not output_filename:
@@ -93,34 +372,78 @@ class TTSEngine:
         
         print(f"🎙️ Generando audio con Edge TTS: '{text[:50]}...'")
         
+        timings = []
+        
         async def generate():
-            communicate = edge_tts.Communicate(text, self.edge_voice)
-            await communicate.save(output_path)
+            try:
+                communicate = edge_tts.Communicate(text, self.edge_voice, boundary="WordBoundary")
+            except TypeError:
+                # Versiones antiguas: WordBoundary es el comportamiento por defecto
+                communicate = edge_tts.Communicate(text, self.edge_voice)
+            
+            with open(output_path, "wb") as f:
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        f.write(chunk["data"])
+                    elif chunk["type"] == "WordBoundary":
+                        # offset y duration vienen en unidades de 100ns
+                        start = chunk["offset"] / 1e7
+                        timings.append({
+                            "word": chunk["text"],
+                            "start": start,
+                            "end": start + chunk["duration"] / 1e7,
+                        })
         
         asyncio.run(generate())
         
         print(f"✓ Audio guardado: {output_path}")
-        return output_path
+        return output_path, timings or None
+    
+    @staticmethod
+    def _alignment_to_words(alignment: dict) -> list:
+        """Convierte el alineamiento por caracteres de ElevenLabs en timings por palabra"""
+        if not alignment:
+            return None
+        
+        words = []
+        current, start, end = "", None, None
+        for char, c_start, c_end in zip(alignment["characters"],
+                                        alignment["character_start_times_seconds"],
+                                        alignment["character_end_times_seconds"]):
+            if char.isspace():
+                if current:
+                    words.append({"word": current, "start": start, "end": end})
+                current, start = "", None
+                continue
+            if start is None:
+                start = c_start
+            current += char
+            end = c_end
+        
+        if current:
+            words.append({"word": current, "start": start, "end": end})
+        return words or None
     
-    def _generate_with_elevenlabs(self, text: str, output_filename: str = None) -> str:
-        """Genera audio con ElevenLabs"""
+    def _generate_with_elevenlabs(self, text: str, output_filename: str = None,
+                                  with_timings: bool = False, allow_fallback: bool = True) -> tuple:
+        """Genera audio con ElevenLabs (endpoint with-timestamps si se piden timings)"""
         url = f"{self.BASE_URL}/text-to-speech/{self.voice_id}"
+        headers = self.headers
+        if with_timings:
+            url += "/with-timestamps"
+            headers = dict(self.headers, Accept="application/json")
         
         payload = {
             "text": text,
             "model_id": TTS_CONFIG["model_id"],
-            "voice_settings": {
-                "stability": TTS_CONFIG["stability"],
-                "similarity_boost": TTS_CONFIG["similarity_boost"],
-                "style": TTS_CONFIG.get("style", 0),
-                "use_speaker_boost": TTS_CONFIG.get("use_speaker_boost", True)
-            }
+            "voice_settings": self._voice_settings()
         }
         
         print(f"🎙️ Generando audio con ElevenLabs: '{text[:50]}...'")
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = get_http_session().post(url, json=payload, headers=headers,
+                                               timeout=TTS_CHUNK_CONFIG["request_timeout"])
             response.raise_for_status()
             
             if not output_filename:
@@ -128,14 +451,28 @@ class TTSEngine:
             
             output_path = os.path.join(TEMP_DIR, f"{output_filename}.mp3")
             
+            timings = None
+            if with_timings:
+                data = response.json()
+                audio_bytes = base64.b64decode(data["audio_base64"])
+                timings = self._alignment_to_words(data.get("alignment"))
+            else:
+                audio_bytes = response.content
+            
             with open(output_path, 'wb') as f:
-                f.write(response.content)
+                f.write(audio_bytes)
             
             print(f"✓ Audio guardado: {output_path}")
-            return output_path
+            return output_path, timings
             
-        except requests.exceptions.HTTPError as e:
-            print(f"⚠️ ElevenLabs falló, usando Edge TTS...")
+        except requests.exceptions.RequestException as e:
+            if not allow_fallback:
+                raise
+            print(f"⚠️ ElevenLabs falló ({e}), usando Edge TTS...")
+            # Este motor sigue con Edge (misma voz y clave de cache coherente); los
+            # demás solo dejan ElevenLabs si el proveedor está caído, no por un 4xx
+            if is_elevenlabs_outage(e):
+                mark_elevenlabs_down(self.api_key)
             self.use_edge = True
             self.edge_voice = EDGE_VOICES.get(self.voice_name, EDGE_VOICES.get("adam"))
             return self._generate_with_edge(text, output_filename)
@@ -149,7 +486,10 @@ class TTSEngine:
         try:
             url = f"{self.BASE_URL}/voices"
             headers = {"xi-api-key": self.api_key}
-            response = requests.get(url, headers=headers, timeout=5)
+            response = get_http_session().get(url, headers=headers,
+                                              timeout=TTS_HTTP_CONFIG["health_timeout"])
+            with _HEALTH_LOCK:
+                _HEALTH[self.api_key] = (response.status_code == 200, time.time())
             if response.status_code == 200:
                 voices = response.json().get("voices", [])
                 print(f"✓ ElevenLabs conectado. {len(voices)} voces disponibles")
@@ -1,13 +1,28 @@
 """
 Compositor de Video con MoviePy
 Combina video de fondo, audio y subtítulos para crear el Reel final
+El backend ffmpeg compila las mismas capas en un único filtergraph nativo
 """
 import os
+from concurrent.futures import ThreadPoolExecutor
 from moviepy import (
     VideoFileClip, AudioFileClip, TextClip, CompositeVideoClip,
     concatenate_videoclips, ColorClip, ImageClip
 )
-from config import VIDEO_CONFIG, SUBTITLE_CONFIG, OUTPUT_DIR, TEMP_DIR
+from config import (VIDEO_CONFIG, SUBTITLE_CONFIG, OUTPUT_DIR, TEMP_DIR, COMPOSER_BACKEND,
+                    MEZZANINE_CONFIG, RENDER_PROFILES, OUTPUT_TARGETS, SPLIT_SHORTS_CONFIG)
+from modules.ffmpeg_render import (run_ffmpeg, fit_filter, escape_filter_value, fan_out,
+                                   fan_out_concat, write_concat_list, target_filter,
+                                   keyframe_times, plan_cuts, media_duration)
+from modules.media_index import get_media_index
+from modules.mezzanine import mezzanines_for, render_cycles
+from modules.subtitles import generate_ass
+from modules.text_raster import cached_text
+from modules.motion import KenBurnsEngine
+from modules.transitions import Slideshow
+from modules.loop_source import LoopingSource
+from modules.frame_sink import encode_frames, clip_frames
+from modules import chunked_render
 
 
 class VideoComposer:
@@ -34,16 +49,11 @@ class VideoComposer:
         
         try:
             # Texto grande y dramático
-            hook_clip = TextClip(
+            hook_clip = self._text_clip(
                 hook_text.upper(),
                 fontsize=85,
-                color="white",
-                font="Arial-Bold",
-                stroke_color="black",
                 stroke_width=4,
-                method="caption",
-                size=(self.width - 100, None),
-                align="center"
+                max_width=self.width - 100
             )
             
             # Posición centrada
@@ -83,16 +93,11 @@ class VideoComposer:
         
         try:
             # Texto principal del CTA
-            cta_clip = TextClip(
+            cta_clip = self._text_clip(
                 cta_text,
                 fontsize=55,
-                color="white",
-                font="Arial-Bold",
-                stroke_color="black",
                 stroke_width=2,
-                method="caption",
-                size=(self.width - 150, None),
-                align="center"
+                max_width=self.width - 150
             )
             
             cta_clip = cta_clip.set_position(("center", self.height * 0.80))
@@ -104,12 +109,10 @@ class VideoComposer:
             
             # Username si se proporciona
             if username:
-                username_clip = TextClip(
+                username_clip = self._text_clip(
                     f"@{username}",
                     fontsize=45,
                     color="#00D4FF",  # Cyan llamativo
-                    font="Arial-Bold",
-                    stroke_color="black",
                     stroke_width=2,
                 )
                 
@@ -143,98 +146,31 @@ class VideoComposer:
         """
         print(f"🎞️ Aplicando efecto Ken Burns ({zoom_direction}, pan: {pan_direction or 'center'})...")
         
-        # Cargar imagen
-        img_clip = ImageClip(image_path)
-        
-        # Calcular dimensiones iniciales más grandes para permitir zoom y pan
-        # REDUCIDO: de 1.4 a 1.15 para zoom más sutil y menos agresivo
-        scale_factor = 1.15  # 15% más grande - movimiento suave y profesional
-        
-        # Redimensionar imagen para que cubra el frame
-        img_w, img_h = img_clip.size
-        target_ratio = self.width / self.height
-        img_ratio = img_w / img_h
-        
-        if img_ratio > target_ratio:
-            # Imagen más ancha - ajustar por altura
-            new_h = int(self.height * scale_factor)
-            new_w = int(new_h * img_ratio)
-        else:
-            # Imagen más alta - ajustar por ancho
-            new_w = int(self.width * scale_factor)
-            new_h = int(new_w / img_ratio)
-        
-        img_clip = img_clip.resize((new_w, new_h))
-        
-        # Función para aplicar zoom gradual con pan
-        def zoom_pan_effect(get_frame, t):
-            progress = t / duration
-            
-            if zoom_direction == "in":
-                zoom = 1 + (scale_factor - 1) * progress
-            else:
-                zoom = scale_factor - (scale_factor - 1) * progress
-            
-            # Aplicar zoom y centrar
-            frame = get_frame(t)
-            h, w = frame.shape[:2]
-            
-            # Calcular nuevo tamaño
-            new_w = int(w / zoom)
-            new_h = int(h / zoom)
-            
-            # Calcular offset base (centro)
-            x_offset = (w - new_w) // 2
-            y_offset = (h - new_h) // 2
-            
-            # Aplicar pan si se especifica
-            # REDUCIDO: de 50px a 25px para movimiento más suave
-            pan_amount = int(25 * progress)  # Movimiento máximo de 25px
-            if pan_direction == "left":
-                x_offset -= pan_amount
-            elif pan_direction == "right":
-                x_offset += pan_amount
-            elif pan_direction == "up":
-                y_offset -= pan_amount
-            elif pan_direction == "down":
-                y_offset += pan_amount
-            
-            # Asegurar que no nos salimos del frame
-            x_offset = max(0, min(x_offset, w - new_w))
-            y_offset = max(0, min(y_offset, h - new_h))
-            
-            # Recortar y redimensionar
-            cropped = frame[y_offset:y_offset+new_h, x_offset:x_offset+new_w]
-            
-            from PIL import Image
-            import numpy as np
-            pil_img = Image.fromarray(cropped)
-            pil_img = pil_img.resize((self.width, self.height), Image.Resampling.LANCZOS)
-            return np.array(pil_img)
-        
-        # Aplicar efecto
-        final_clip = img_clip.fl(zoom_pan_effect, apply_to=['mask'])
-        final_clip = final_clip.set_duration(duration)
-        final_clip = final_clip.resize((self.width, self.height))
-        
-        return final_clip
+        # Trayectoria precalculada + un remuestreo por frame (antes: PIL + LANCZOS por frame)
+        # Zoom 15% y pan máximo de 25px: movimiento suave y profesional
+        engine = KenBurnsEngine(self.width, self.height, self.fps, scale_factor=1.15, pan_amount=25)
+        return engine.make_clip(image_path, duration, zoom_direction, pan_direction)
     
     def create_multi_image_video(self, image_paths: list, duration: float, 
                                   crossfade_duration: float = 0.8,
-                                  resolution: tuple = None) -> VideoFileClip:
+                                  resolution: tuple = None,
+                                  transition: str = "crossfade") -> VideoFileClip:
         """
-        Crea un video a partir de múltiples imágenes con transiciones crossfade
+        Crea un video a partir de múltiples imágenes con transiciones
+        Cada imagen se decodifica y escala una vez; los frames y las mezclas
+        se escriben en buffers preasignados (sin arrays nuevos por frame)
         
         Args:
             image_paths: Lista de rutas a las imágenes
             duration: Duración total del video
-            crossfade_duration: Duración del crossfade entre imágenes
+            crossfade_duration: Duración de la transición entre imágenes
             resolution: Tupla (width, height), usa self.width/height si es None
+            transition: "crossfade", "dip" (fundido a negro) o "slide"
             
         Returns:
-            VideoFileClip con múltiples imágenes y transiciones
+            VideoClip con múltiples imágenes y transiciones
         """
-        import random
+        from moviepy.editor import VideoClip
         
         if not image_paths:
             return None
@@ -247,47 +183,50 @@ class VideoComposer:
         segment_duration = duration / num_images
         
         print(f"🎬 Creando video multi-imagen ({num_images} imágenes, {segment_duration:.1f}s cada una)...")
-        print(f"   📐 Resolución: {width}x{height}")
+        print(f"   📐 Resolución: {width}x{height} (transición: {transition})")
         
         # Opciones de pan y zoom para variedad
         pan_options = ["left", "right", "up", "down", None]
         zoom_options = ["in", "out"]
+        motions = [(zoom_options[i % len(zoom_options)], pan_options[i % len(pan_options)])
+                   for i in range(num_images)]
+        for i, (zoom_dir, pan_dir) in enumerate(motions):
+            print(f"  [{i+1}/{num_images}] Imagen (zoom: {zoom_dir}, pan: {pan_dir})")
         
-        clips = []
-        for i, img_path in enumerate(image_paths):
-            # Variar el efecto para cada imagen
-            pan_dir = pan_options[i % len(pan_options)]
-            zoom_dir = zoom_options[i % len(zoom_options)]
-            
-            print(f"  [{i+1}/{num_images}] Procesando imagen (zoom: {zoom_dir}, pan: {pan_dir})...")
-            
-            # Crear clip Ken Burns para esta imagen
-            clip = self.create_ken_burns_clip(
-                img_path,
-                segment_duration + crossfade_duration,  # Extra para crossfade
-                zoom_direction=zoom_dir,
-                pan_direction=pan_dir
-            )
-            
-            # Redimensionar si la resolución es diferente
-            if resolution:
-                clip = clip.resize((width, height))
-            
-            # Aplicar crossfade excepto en el primero
-            if i > 0:
-                clip = clip.crossfadein(crossfade_duration)
-            
-            clip = clip.set_start(i * segment_duration)
-            clips.append(clip)
-        
-        # Combinar todas las imágenes
-        from moviepy.editor import CompositeVideoClip
-        final = CompositeVideoClip(clips, size=(width, height))
-        final = final.set_duration(duration)
+        slideshow = Slideshow(image_paths, duration, width, height, self.fps,
+                              transition=transition, transition_duration=crossfade_duration,
+                              motions=motions)
+        final = VideoClip(slideshow.frame, duration=duration)
         
         print(f"✓ Video multi-imagen creado ({duration:.1f}s)")
         return final
     
+    def export_clip(self, clip, output_path: str, audio_path: str = None, fps: int = None,
+                    preset: str = "medium", shortest: bool = True) -> dict:
+        """
+        Codifica un clip generado en Python (Ken Burns, multi-imagen) enviando
+        sus frames por un pipe a ffmpeg, en lugar de write_videofile
+        
+        Args:
+            clip: Clip de MoviePy (p.ej. de create_multi_image_video)
+            output_path: Archivo de salida
+            audio_path: Audio que se añade en la misma pasada (opcional)
+            shortest: Cortar al stream más corto (False: dura lo que el clip)
+            
+        Returns:
+            Estadísticas de la codificación (frames, speed, bitrate_kbps...)
+        """
+        fps = fps or self.fps
+        width, height = clip.size
+        stats = encode_frames(clip_frames(clip, fps), output_path, width, height, fps,
+                              audio_path=audio_path, codec=VIDEO_CONFIG["codec"],
+                              preset=preset, bitrate=VIDEO_CONFIG["bitrate"],
+                              audio_codec=VIDEO_CONFIG["audio_codec"], shortest=shortest)
+        if stats["returncode"] == 0 and not stats["error"]:
+            print(f"   ⚡ {stats['frames']} frames a {stats['encode_fps']:.0f} fps "
+                  f"({stats['speed']:.1f}x tiempo real)")
+        return stats
+    
     def prepare_background_video(self, video_path: str, duration: float) -> VideoFileClip:
         """
         Prepara el video de fondo al tamaño y duración correctos
@@ -297,10 +236,16 @@ class VideoComposer:
             duration: Duración deseada en segundos
             
         Returns:
-            VideoFileClip preparado
+            VideoFileClip preparado (llamar a close() al terminar: libera
+            el ciclo decodificado)
         """
         print(f"📹 Preparando video de fondo...")
         
+        # Un ciclo decodificado y escalado una vez, repetido desde el cache
+        looping = LoopingSource.decode([video_path], self.width, self.height, self.fps, duration)
+        if looping:
+            return looping.to_clip(duration)
+        
         clip = VideoFileClip(video_path)
         
         # Ajustar duración (loop si es necesario)
@@ -375,16 +320,14 @@ class VideoComposer:
         
         for segment in segments:
             try:
-                txt_clip = TextClip(
+                txt_clip = self._text_clip(
                     segment,
                     fontsize=SUBTITLE_CONFIG["fontsize"],
                     color=SUBTITLE_CONFIG["color"],
                     font=SUBTITLE_CONFIG.get("font", "Arial-Bold"),
                     stroke_color=SUBTITLE_CONFIG["stroke_color"],
                     stroke_width=SUBTITLE_CONFIG["stroke_width"],
-                    method=SUBTITLE_CONFIG.get("method", "caption"),
-                    size=(SUBTITLE_CONFIG["size"][0], None),
-                    align="center"
+                    max_width=SUBTITLE_CONFIG["size"][0]
                 )
                 
                 # Posicionar y establecer timing
@@ -414,12 +357,10 @@ class VideoComposer:
         Crea un overlay de texto adicional (ej: autor, watermark)
         """
         try:
-            clip = TextClip(
+            clip = self._text_clip(
                 text,
                 fontsize=fontsize,
-                color="white",
                 font="Arial",
-                stroke_color="black",
                 stroke_width=1
             )
             clip = clip.set_position(position)
@@ -430,17 +371,478 @@ class VideoComposer:
             print(f"⚠️ Error creando overlay: {e}")
             return None
     
+    @staticmethod
+    def _text_clip(text: str, fontsize: int, color: str = "white", font: str = "Arial-Bold",
+                   stroke_color: str = "black", stroke_width: int = 2,
+                   max_width: int = None) -> ImageClip:
+        """
+        Texto como ImageClip con transparencia, desde el cache de PNG
+        (sustituye a TextClip, que lanzaba ImageMagick en cada llamada)
+        """
+        png = cached_text(text, fontsize, color=color, font=font, stroke_color=stroke_color,
+                          stroke_width=stroke_width, max_width=max_width)
+        return ImageClip(png, transparent=True)
+    
+    def _text_layer(self, text: str, name: str, fontsize: int, color: str = "white",
+                    font: str = "Arial-Bold", stroke_color: str = "black",
+                    stroke_width: int = 2, max_width: int = None, y: str = "(H-h)/2",
+                    start: float = 0, end: float = None, fade_in: float = 0,
+                    fade_out: float = 0) -> dict:
+        """
+        Describe la capa de un texto para el filtergraph (PNG del cache de textos)
+        
+        Args:
+            name: Nombre de la capa (solo informativo; el PNG es por contenido)
+            y: Expresión de overlay para la posición vertical (H = alto del video)
+            start, end: Intervalo visible
+            fade_in, fade_out: Fundidos de opacidad
+            
+        Returns:
+            Dict de capa (png, y, start, end, fade_in, fade_out)
+        """
+        png = cached_text(text, fontsize, color=color, font=font,
+                          stroke_color=stroke_color, stroke_width=stroke_width, max_width=max_width)
+        return {"png": png, "y": y, "start": start, "end": end,
+                "fade_in": fade_in, "fade_out": fade_out}
+    
+    @staticmethod
+    def _segment_timings(text: str, duration: float, words_per_segment: int = 4) -> list:
+        """
+        Timings por palabra equivalentes a create_subtitle_clips: segmentos de
+        words_per_segment palabras que se reparten la duración por igual
+        """
+        words = text.split()
+        segments = [words[i:i + words_per_segment] for i in range(0, len(words), words_per_segment)]
+        if not segments:
+            return []
+        
+        segment_duration = duration / len(segments)
+        timings = []
+        for index, segment in enumerate(segments):
+            step = segment_duration / len(segment)
+            for j, word in enumerate(segment):
+                start = index * segment_duration + j * step
+                timings.append({"word": word, "start": start, "end": start + step})
+        return timings
+    
+    def _subtitle_style(self, width: int, height: int) -> dict:
+        """Estilo ASS equivalente a SUBTITLE_CONFIG (los TextClip de MoviePy)"""
+        font = SUBTITLE_CONFIG.get("font", "Arial-Bold")
+        named = {"white": "#FFFFFF", "black": "#000000"}
+        return {
+            "font": font.replace("-Bold", ""),
+            "bold": font.endswith("-Bold"),
+            "fontsize": SUBTITLE_CONFIG["fontsize"],
+            "color": named.get(SUBTITLE_CONFIG["color"], SUBTITLE_CONFIG["color"]),
+            "outline_color": named.get(SUBTITLE_CONFIG["stroke_color"], SUBTITLE_CONFIG["stroke_color"]),
+            "outline": SUBTITLE_CONFIG["stroke_width"],
+            "shadow": 0,
+            "alignment": 8,  # Arriba-centro: MarginV marca el borde superior del texto
+            "margin_v": int(height * SUBTITLE_CONFIG["position"][1]),
+            "margin_h": max((width - SUBTITLE_CONFIG["size"][0]) // 2, 0),
+            "words_per_phrase": 4,
+            "fade_ms": 150,
+            "uppercase": False,
+        }
+    
+    @staticmethod
+    def _loop_timeline(videos: list, duration: float) -> list:
+        """
+        Repite la lista de clips (en orden) hasta cubrir la duración
+        Las duraciones salen del índice de medios, sin abrir los videos
+        """
+        index = get_media_index()
+        durations = [index.get_duration(v) or 0 for v in videos]
+        if sum(durations) <= 0:
+            return list(videos)
+        
+        timeline = []
+        total = 0
+        while total < duration:
+            for v, d in zip(videos, durations):
+                timeline.append(v)
+                total += d
+                if total >= duration:
+                    break
+        return timeline
+    
+    def _background_inputs(self, background, duration: float, sizes: list, name: str) -> tuple:
+        """
+        Entradas y cadena de filtros del fondo
+        
+        Args:
+            background: Ruta a un video (se repite en loop) o lista de clips
+                en orden (timeline que se concatena y repite hasta la duración)
+            sizes: (width, height) de cada lienzo, el principal primero
+            name: Nombre base para archivos temporales
+            
+        Returns:
+            (argumentos de entrada, filtergraph que termina en [bg0], [bg1]...
+             (uno por lienzo), número de entradas, archivos temporales)
+        
+        Un ciclo de los clips se arma una sola vez (lista concat o un
+        intermedio normalizado por lienzo) y se repite con -stream_loop -1:
+        sin decodificar cada vuelta por separado. Con varios lienzos, split
+        va antes del ajuste: cada salida se recorta del cuadro original
+        """
+        trim = f"trim=duration={duration:.3f},setpts=PTS-STARTPTS"
+        
+        if isinstance(background, str):
+            return (["-stream_loop", "-1", "-i", background],
+                    fan_out("0:v", sizes, self.fps, trim), 1, [])
+        
+        # Clips del mismo formato: el demuxer concat los lee tal cual
+        loop_concat = ["-stream_loop", "-1", "-f", "concat", "-safe", "0", "-i"]
+        if self._same_format(background):
+            cycle = write_concat_list(background, name)
+            return loop_concat + [cycle], fan_out("0:v", sizes, self.fps, trim), 1, [cycle]
+        
+        # Resoluciones mezcladas (lo normal): mezzanines (cacheadas, todas iguales).
+        # Ya están recortadas a vertical: solo sirven si no hay otros lienzos
+        mezzanines = mezzanines_for(background) if len(sizes) == 1 else None
+        if mezzanines:
+            cycle = write_concat_list(mezzanines, name)
+            same_format = (*sizes[0], self.fps) == (
+                MEZZANINE_CONFIG["width"], MEZZANINE_CONFIG["height"], MEZZANINE_CONFIG["fps"])
+            graph = f"[0:v]{trim}[bg0]" if same_format else fan_out("0:v", sizes, self.fps, trim)
+            return loop_concat + [cycle], graph, 1, [cycle]
+        
+        # Sin mezzanines: un intermedio normalizado por lienzo, todos de una decodificación
+        index = get_media_index()
+        cycle_duration = sum(index.get_duration(v) or 0 for v in background)
+        cycles = [(os.path.join(TEMP_DIR, f"cycle_{name}_{c}.mp4"), w, h)
+                  for c, (w, h) in enumerate(sizes)]
+        if cycle_duration > 0 and render_cycles(background, cycles, min(cycle_duration, duration)):
+            args = []
+            chains = []
+            for c, (path, w, h) in enumerate(cycles):
+                args += ["-stream_loop", "-1", "-i", path]
+                chains.append(f"[{c}:v]{fit_filter(w, h, self.fps)},{trim}[bg{c}]")
+            return args, ";".join(chains), len(cycles), [path for path, _, _ in cycles]
+        for path, _, _ in cycles:
+            if os.path.exists(path):
+                os.remove(path)
+        
+        print("⚠️ No se pudo preparar el ciclo del fondo, decodificando cada repetición...")
+        timeline = self._loop_timeline(background, duration)
+        args = []
+        for v in timeline:
+            args += ["-i", v]
+        return args, fan_out_concat(len(timeline), sizes, self.fps, trim), len(timeline), []
+    
+    @staticmethod
+    def _same_format(videos: list) -> bool:
+        """True si todos los clips comparten resolución, fps y codec (concat sin re-inicializar filtros)"""
+        index = get_media_index()
+        formats = set()
+        for v in videos:
+            meta = index.get(v)
+            if not meta:
+                return False
+            formats.add((meta["width"], meta["height"], meta["fps"], meta["codec"], meta["rotation"]))
+        return len(formats) == 1
+    
+    def _create_reel_ffmpeg(self, background_video: str, audio_path: str,
+                            subtitles_text: str, author: str, output_path: str,
+                            hook_text: str, cta_text: str, width: int, height: int,
+                            profile: dict = None, targets: list = None) -> bool:
+        """
+        Compone el reel con un único filtergraph de ffmpeg:
+        fondo en loop + drawbox oscuro + legendas ASS + textos PNG con fundidos
+        
+        Args:
+            profile: Perfil de RENDER_PROFILES; la composición se hace a
+                width x height y se reduce en proporción al perfil al final
+            targets: Salidas adicionales (dicts de OUTPUT_TARGETS): el fondo
+                decodificado se reparte con split y cada salida se recorta y
+                compone (legendas y textos) a su propio tamaño
+        
+        Returns:
+            True si ffmpeg terminó bien
+        """
+        # La narración es un archivo temporal: ffprobe directo, no el índice de la biblioteca
+        audio_duration = media_duration(audio_path)
+        if not audio_duration:
+            return False
+        duration = audio_duration + 1.5  # Añadir margen
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        
+        # Los PNG de las capas son del cache de textos: no se borran
+        temp_files = []
+        canvases = self._canvases(subtitles_text, author, hook_text, cta_text, duration,
+                                  width, height, targets, stem, temp_files)
+        
+        # Videos largos (YouTube): fragmentos codificados en paralelo, uno por núcleo
+        ok = False
+        if chunked_render.should_chunk(duration):
+            ok = self._render_chunked(background_video, audio_path, canvases, duration,
+                                      width, height, profile, output_path)
+            if not ok:
+                print("⚠️ Render por fragmentos falló, usando una sola pasada...")
+        if not ok:
+            ok = self._render_single(background_video, audio_path, canvases, duration,
+                                     width, height, profile, output_path, temp_files)
+        
+        for path in temp_files:
+            if os.path.exists(path):
+                os.remove(path)
+        return ok
+    
+    def _reel_layers(self, author: str, hook_text: str, cta_text: str, duration: float,
+                     width: int, height: int) -> list:
+        """Capas de texto (hook, autor, CTA) de un lienzo de width x height"""
+        layers = []
+        
+        # 🎬 HOOK VISUAL al inicio (primeros 2.5 segundos)
+        if hook_text:
+            layers.append(self._text_layer(
+                hook_text.upper(), "hook", 85, stroke_width=4,
+                max_width=width - 100, start=0, end=2.5, fade_in=0.3, fade_out=0.5
+            ))
+        
+        if author:
+            layers.append(self._text_layer(
+                f"- {author}", "author", 35, font="Arial", stroke_width=1,
+                y=str(int(height * 0.88)), start=duration * 0.6, end=duration, fade_in=0.5
+            ))
+        
+        # 📱 CTA al final (últimos 4 segundos)
+        layers.append(self._text_layer(
+            cta_text or "Suscríbete y dime qué opinas abajo", "cta", 55,
+            max_width=width - 150, y=str(int(height * 0.80)),
+            start=max(duration - 4.0, 0), end=duration, fade_in=0.5
+        ))
+        return layers
+    
+    def _canvases(self, subtitles_text: str, author: str, hook_text: str, cta_text: str,
+                  duration: float, width: int, height: int, targets: list, stem: str,
+                  temp_files: list) -> list:
+        """
+        Lienzos del render: el principal y uno por target, cada uno con sus
+        capas de texto y sus legendas generadas a su tamaño
+        
+        Returns:
+            Lista de dicts (width, height, target, layers, ass)
+        """
+        sizes = [(width, height, None)] + [(t["width"], t["height"], t) for t in targets or []]
+        canvases = []
+        for i, (w, h, target) in enumerate(sizes):
+            ass_path = None
+            if subtitles_text:
+                ass_path = os.path.join(TEMP_DIR, f"{stem}.ass" if i == 0 else f"{stem}_{i}.ass")
+                generate_ass(self._segment_timings(subtitles_text, duration), ass_path,
+                             width=w, height=h, karaoke=False,
+                             style=self._subtitle_style(w, h))
+                temp_files.append(ass_path)
+            canvases.append({
+                "width": w, "height": h, "target": target, "ass": ass_path,
+                "layers": self._reel_layers(author, hook_text, cta_text, duration, w, h),
+            })
+        return canvases
+    
+    def _compose_graph(self, bg_graph: str, canvases: list, first_layer: int,
+                       duration: float, profile: dict = None, offset: float = None) -> tuple:
+        """
+        Filtergraph completo a partir del fondo ([bg0], [bg1]... ya ajustados
+        a cada lienzo): oscurecimiento, legendas, capas de texto y fundidos,
+        terminando en [vout] (y en [vt0], [vt1]... para cada salida adicional)
+        
+        Args:
+            canvases: Lienzos de _canvases; cada uno recibe su rama del fondo
+                y sus propias legendas y capas a su tamaño
+            first_layer: Índice de entrada del PNG de la primera capa (las capas
+                de todos los lienzos van seguidas, en orden)
+            offset: Inicio del fragmento (los timestamps del fondo ya están en
+                tiempo global; None = render de una sola pasada)
+            
+        Returns:
+            (filtergraph, fps, preset, parámetros de tasa de libx264)
+        """
+        chains = [bg_graph]
+        fps = self.fps
+        preset = "medium"
+        rate = ["-b:v", VIDEO_CONFIG["bitrate"]]
+        factor = 1
+        if profile:
+            # Reducción proporcional al perfil (sirve también para 1920x1080)
+            factor = profile["height"] / RENDER_PROFILES["final"]["height"]
+            fps = profile["fps"]
+            preset = profile["preset"]
+            if profile["crf"] is not None:
+                rate = ["-crf", str(profile["crf"])]
+        
+        shift = f"setpts=PTS-STARTPTS+{offset:.3f}/TB," if offset is not None else ""
+        index = first_layer
+        for c, canvas in enumerate(canvases):
+            width, height = canvas["width"], canvas["height"]
+            # Capa de oscurecimiento (45% negro) sobre el fondo del lienzo
+            chains.append(f"[bg{c}]drawbox=x=0:y=0:w=iw:h=ih:color=black@0.45:t=fill[base{c}]")
+            current = f"base{c}"
+            
+            if canvas["ass"]:
+                chains.append(f"[{current}]ass={escape_filter_value(canvas['ass'])}[subs{c}]")
+                current = f"subs{c}"
+            
+            for i, layer in enumerate(canvas["layers"]):
+                end = layer["end"] if layer["end"] is not None else duration
+                fades = f"fade=t=in:st={layer['start']:.3f}:d={layer['fade_in']}:alpha=1"
+                if layer["fade_out"]:
+                    fades += f",fade=t=out:st={end - layer['fade_out']:.3f}:d={layer['fade_out']}:alpha=1"
+                chains.append(f"[{index}:v]format=rgba,{shift}{fades}[t{c}_{i}]")
+                chains.append(
+                    f"[{current}][t{c}_{i}]overlay=x=(W-w)/2:y={layer['y']}:"
+                    f"enable='between(t,{layer['start']:.3f},{end:.3f})'[l{c}_{i}]"
+                )
+                current = f"l{c}_{i}"
+                index += 1
+            
+            # Fade in/out del video completo
+            final_chain = f"fade=t=in:st=0:d=0.5,fade=t=out:st={duration - 0.5:.3f}:d=0.5"
+            if offset is not None:
+                final_chain += ",setpts=PTS-STARTPTS"
+            if factor != 1 or fps != self.fps:
+                final_chain += (f",scale={int(width * factor) // 2 * 2}:{int(height * factor) // 2 * 2},"
+                                f"fps={fps}")
+            label = "vout" if c == 0 else f"vt{c - 1}"
+            chains.append(f"[{current}]{final_chain}[{label}]")
+        return ";".join(chains), fps, preset, rate
+    
+    @staticmethod
+    def _outputs(output_path: str, rate: list, targets: list = None) -> list:
+        """
+        Salidas del render: la principal y una por target (<nombre>_<target>.mp4)
+        
+        Returns:
+            Lista de (etiqueta del filtergraph, ruta, parámetros de tasa)
+        """
+        outputs = [("[vout]", output_path, rate)]
+        stem, ext = os.path.splitext(output_path)
+        for i, target in enumerate(targets or []):
+            # Los perfiles con CRF (borrador/preview) mandan sobre el bitrate del target
+            target_rate = rate if rate[0] == "-crf" or not target.get("bitrate") \
+                else ["-b:v", target["bitrate"]]
+            outputs.append((f"[vt{i}]", f"{stem}_{target['name']}{ext}", target_rate))
+        return outputs
+    
+    def _render_single(self, background_video, audio_path: str, canvases: list,
+                       duration: float, width: int, height: int, profile: dict,
+                       output_path: str, temp_files: list) -> bool:
+        """Render en un único proceso ffmpeg (fondo, capas, audio y cada salida)"""
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        sizes = [(canvas["width"], canvas["height"]) for canvas in canvases]
+        bg_args, bg_graph, num_bg, bg_files = self._background_inputs(
+            background_video, duration, sizes, stem)
+        temp_files += bg_files
+        audio_index = num_bg
+        
+        cmd = ["ffmpeg", "-y"] + bg_args + ["-i", audio_path]
+        for canvas in canvases:
+            for layer in canvas["layers"]:
+                cmd += ["-loop", "1", "-framerate", str(self.fps), "-t", f"{duration:.3f}",
+                        "-i", layer["png"]]
+        
+        graph, fps, preset, rate = self._compose_graph(bg_graph, canvases, audio_index + 1,
+                                                       duration, profile)
+        cmd += ["-filter_complex", graph]
+        targets = [canvas["target"] for canvas in canvases[1:]]
+        for label, path, out_rate in self._outputs(output_path, rate, targets):
+            cmd += [
+                "-map", label, "-map", f"{audio_index}:a",
+                "-t", f"{duration:.3f}",
+                "-r", str(fps),
+                "-c:v", VIDEO_CONFIG["codec"], *out_rate, "-preset", preset,
+                "-pix_fmt", "yuv420p",
+                "-c:a", VIDEO_CONFIG["audio_codec"],
+            ]
+            if profile and profile["audio_bitrate"]:
+                cmd += ["-b:a", profile["audio_bitrate"]]
+            cmd += ["-movflags", "+faststart", path]
+        return run_ffmpeg(cmd, "composición del reel")
+    
+    def _render_chunked(self, background_video, audio_path: str, canvases: list,
+                        duration: float, width: int, height: int, profile: dict,
+                        output_path: str) -> bool:
+        """
+        Render por fragmentos: cada intervalo de la línea de tiempo se codifica
+        en su propio proceso (sin audio, con todas las salidas), se unen con
+        -c copy y se comprueba que timestamps y audio sean continuos
+        """
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        background = [background_video] if isinstance(background_video, str) else background_video
+        timeline = self._loop_timeline(background, duration)
+        workers = chunked_render.chunk_workers()
+        chunks = chunked_render.plan_chunks(timeline, duration, workers)
+        # Hilos de x264 repartidos entre los procesos simultáneos
+        threads = max(1, (os.cpu_count() or 1) // min(workers, len(chunks)))
+        
+        targets = [canvas["target"] for canvas in canvases[1:]]
+        sizes = [(canvas["width"], canvas["height"]) for canvas in canvases]
+        work_dir = chunked_render.chunk_dir(stem)
+        outputs = []
+        paths = [[] for _ in canvases]
+        commands = []
+        fps = self.fps
+        for n, chunk in enumerate(chunks):
+            start, end = chunk["start"], chunk["end"]
+            bg_args, bg_graph, num_bg = chunked_render.chunk_inputs(chunk, sizes, self.fps)
+            # Solo las capas visibles en este intervalo
+            visible = [
+                dict(canvas, layers=[layer for layer in canvas["layers"]
+                                     if layer["start"] < end and (layer["end"] is None or layer["end"] > start)])
+                for canvas in canvases
+            ]
+            cmd = ["ffmpeg", "-y"] + bg_args
+            for canvas in visible:
+                for layer in canvas["layers"]:
+                    cmd += ["-loop", "1", "-framerate", str(self.fps), "-t", f"{end - start:.3f}",
+                            "-i", layer["png"]]
+            graph, fps, preset, rate = self._compose_graph(bg_graph, visible, num_bg, duration,
+                                                           profile, offset=start)
+            cmd += ["-filter_complex", graph]
+            outputs = self._outputs(output_path, rate, targets)
+            for k, (label, _, out_rate) in enumerate(outputs):
+                path = os.path.join(work_dir, f"chunk_{n:03d}_{k}.mp4")
+                cmd += [
+                    "-map", label, "-an",
+                    "-r", str(fps),
+                    "-c:v", VIDEO_CONFIG["codec"], *out_rate, "-preset", preset,
+                    "-pix_fmt", "yuv420p", "-threads", str(threads),
+                    # Misma base de tiempo en todos para unir con -c copy
+                    "-video_track_timescale", str(fps * 512),
+                    path
+                ]
+                paths[k].append(path)
+            commands.append(cmd)
+        
+        print(f"   🧩 {len(chunks)} fragmentos de ~{chunks[0]['end']:.0f}s en {workers} procesos")
+        try:
+            if not chunked_render.render_chunks(commands, workers):
+                return False
+            audio_bitrate = profile["audio_bitrate"] if profile else None
+            for (_, path, _), chunk_paths in zip(outputs, paths):
+                if not chunked_render.join_chunks(chunk_paths, audio_path, path, duration,
+                                                  VIDEO_CONFIG["audio_codec"], audio_bitrate):
+                    return False
+                if not chunked_render.check_continuity(path, duration, fps, len(chunks)):
+                    return False
+            return True
+        finally:
+            chunked_render.cleanup(stem)
+    
     def create_reel(self, background_video: str, audio_path: str,
                     subtitles_text: str, author: str = None,
                     output_name: str = None, hook_text: str = None,
                     cta_text: str = "Suscríbete y dime qué opinas abajo",
                     username: str = None,
-                    target_resolution: tuple = None) -> str:
+                    target_resolution: tuple = None,
+                    backend: str = None, profile: str = None,
+                    targets: list = None) -> str:
         """
         Crea el video final tipo Reel/Short o YouTube
         
         Args:
-            background_video: Ruta al video de fondo
+            background_video: Ruta al video de fondo, o lista de clips en orden
+                (se concatenan y repiten dentro del mismo render, sin temporal)
             audio_path: Ruta al audio de narración
             subtitles_text: Texto para los subtítulos
             author: Autor de la cita (opcional)
@@ -449,6 +851,12 @@ class VideoComposer:
             cta_text: Texto de llamada a la acción al final
             username: Username para mostrar en el CTA
             target_resolution: Tupla (width, height) para la resolución de salida
+            backend: "ffmpeg" o "moviepy" (por defecto COMPOSER_BACKEND)
+            profile: Perfil de RENDER_PROFILES ("draft", "preview", "final");
+                None mantiene la codificación de VIDEO_CONFIG (solo backend ffmpeg)
+            targets: Salidas adicionales del mismo render (nombres de OUTPUT_TARGETS
+                o dicts name/width/height/bitrate), guardadas como
+                <output_name>_<name>.mp4 (solo backend ffmpeg)
             
         Returns:
             Ruta al video generado
@@ -457,6 +865,37 @@ class VideoComposer:
         width = target_resolution[0] if target_resolution else self.width
         height = target_resolution[1] if target_resolution else self.height
         
+        # Generar nombre de salida
+        if not output_name:
+            import time
+            output_name = f"reel_{int(time.time())}"
+        
+        output_path = os.path.join(OUTPUT_DIR, f"{output_name}.mp4")
+        
+        if (backend or COMPOSER_BACKEND) == "ffmpeg":
+            print("🎬 Componiendo video final (ffmpeg)...")
+            print(f"   📐 Resolución: {width}x{height}")
+            try:
+                targets = [OUTPUT_TARGETS[t] if isinstance(t, str) else t for t in targets or []]
+                if self._create_reel_ffmpeg(background_video, audio_path, subtitles_text, author,
+                                            output_path, hook_text, cta_text, width, height,
+                                            profile=RENDER_PROFILES[profile] if profile else None,
+                                            targets=targets):
+                    print(f"✅ Video creado exitosamente: {output_path}")
+                    for target in targets:
+                        print(f"   📐 {target['name']}: {output_path[:-4]}_{target['name']}.mp4")
+                    return output_path
+            except Exception as e:
+                print(f"⚠️ Error en el backend ffmpeg: {e}")
+            print("⚠️ Usando MoviePy como respaldo...")
+        
+        return self._create_reel_moviepy(background_video, audio_path, subtitles_text, author,
+                                         output_path, hook_text, cta_text, width, height)
+    
+    def _create_reel_moviepy(self, background_video: str, audio_path: str,
+                             subtitles_text: str, author: str, output_path: str,
+                             hook_text: str, cta_text: str, width: int, height: int) -> str:
+        """Composición por frame con MoviePy (respaldo del backend ffmpeg)"""
         print("🎬 Componiendo video final...")
         print(f"   📐 Resolución: {width}x{height}")
         
@@ -464,17 +903,27 @@ class VideoComposer:
         audio = AudioFileClip(audio_path)
         duration = audio.duration + 1.5  # Añadir margen
         
-        # Preparar video de fondo
-        background = VideoFileClip(background_video)
-        
-        # Ajustar duración si es necesario
-        if background.duration < duration:
-            loops_needed = int(duration / background.duration) + 1
-            background = concatenate_videoclips([background] * loops_needed)
-        background = background.subclip(0, duration)
-        
-        # Redimensionar al tamaño objetivo
-        background = background.resize((width, height))
+        # Preparar video de fondo: un ciclo decodificado y escalado una vez (no una vez por loop)
+        sources = [background_video] if isinstance(background_video, str) else background_video
+        looping = LoopingSource.decode(sources, width, height, self.fps, duration)
+        if looping:
+            background = looping.to_clip(duration)
+        else:
+            if isinstance(background_video, str):
+                background = VideoFileClip(background_video)
+            else:
+                background = concatenate_videoclips(
+                    [VideoFileClip(v).resize((width, height)) for v in background_video],
+                    method="compose")
+            
+            # Ajustar duración si es necesario
+            if background.duration < duration:
+                loops_needed = int(duration / background.duration) + 1
+                background = concatenate_videoclips([background] * loops_needed)
+            background = background.subclip(0, duration)
+            
+            # Redimensionar al tamaño objetivo
+            background = background.resize((width, height))
         
         # Crear capa de oscurecimiento para mejor legibilidad (más opacidad = más profesional)
         overlay = ColorClip(
@@ -532,30 +981,21 @@ class VideoComposer:
         final = fadein(final, 0.5)
         final = fadeout(final, 0.5)
         
-        # Generar nombre de salida
-        if not output_name:
-            import time
-            output_name = f"reel_{int(time.time())}"
-        
-        output_path = os.path.join(OUTPUT_DIR, f"{output_name}.mp4")
-        
-        # Exportar
+        # Exportar: frames por un pipe a ffmpeg; el audio original en la misma pasada
+        # (el video dura 1.5s más que la narración, como con write_videofile)
         print(f"💾 Exportando video a: {output_path}")
-        final.write_videofile(
-            output_path,
-            fps=self.fps,
-            codec=VIDEO_CONFIG["codec"],
-            audio_codec=VIDEO_CONFIG["audio_codec"],
-            bitrate=VIDEO_CONFIG["bitrate"],
-            preset="medium",
-            threads=4
-        )
+        stats = self.export_clip(final, output_path, audio_path=audio_path, shortest=False)
         
-        # Limpiar
+        # Limpiar (el cache del fondo en loop puede ocupar varios GB)
         final.close()
         background.close()
+        if looping:
+            looping.close()
         audio.close()
         
+        if stats["returncode"] != 0 or stats["error"]:
+            print(f"❌ Error exportando el video: {output_path}")
+            return None
         print(f"✅ Video creado exitosamente: {output_path}")
         return output_path
     
@@ -573,14 +1013,22 @@ class VideoComposer:
     
     def split_youtube_to_shorts(self, youtube_video_path: str, 
                                  num_segments: int = 7,
-                                 output_dir: str = None) -> list:
+                                 output_dir: str = None,
+                                 snap_to_keyframes: bool = None,
+                                 max_workers: int = None) -> list:
         """
         Divide un video de YouTube horizontal en shorts verticales
+        Los shorts se codifican en paralelo y el CTA se dibuja una sola vez (PNG)
         
         Args:
             youtube_video_path: Ruta al video de YouTube (1920x1080)
             num_segments: Número de segmentos a crear
             output_dir: Directorio de salida (usa OUTPUT_DIR por defecto)
+            snap_to_keyframes: Mover los cortes al keyframe más cercano (por defecto
+                SPLIT_SHORTS_CONFIG), dentro de min_duration/max_duration. Solo mueve
+                los puntos de corte: cada short se recodifica igual (recorte + CTA),
+                así que no ahorra tiempo de decodificación
+            max_workers: Shorts simultáneos (por defecto SPLIT_SHORTS_CONFIG)
             
         Returns:
             Lista de rutas a los shorts generados
@@ -590,53 +1038,62 @@ class VideoComposer:
             return []
         
         output_dir = output_dir or OUTPUT_DIR
-        
-        # Obtener duración con ffprobe
-        import subprocess
-        result = subprocess.run(
-            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', 
-             '-of', 'default=noprint_wrappers=1:nokey=1', youtube_video_path],
-            capture_output=True, text=True
-        )
-        total_duration = float(result.stdout.strip())
+        cfg = SPLIT_SHORTS_CONFIG
+        if snap_to_keyframes is None:
+            snap_to_keyframes = cfg["snap_to_keyframes"]
+        max_workers = max_workers or cfg["max_workers"] or os.cpu_count() or 1
+        
+        total_duration = media_duration(youtube_video_path)
+        if not total_duration:
+            print(f"❌ No se pudo leer la duración de: {youtube_video_path}")
+            return []
         
         # Duración fija de 30 segundos por short
-        segment_duration = 30.0
+        segment_duration = cfg["segment_duration"]
         num_segments = int(total_duration / segment_duration)
         
-        print(f"\n🔪 Dividiendo video en shorts de 30 segundos...")
+        print(f"\n🔪 Dividiendo video en shorts de {segment_duration:.0f} segundos...")
         print(f"   ⏱️ Duración total: {total_duration:.1f}s")
-        print(f"   📹 Shorts a generar: {num_segments} (30s cada uno)")
+        print(f"   📹 Shorts a generar: {num_segments} ({max_workers} en paralelo)")
+        if num_segments < 1:
+            return []
+        
+        # Cortes: múltiplos de segment_duration, o el keyframe más cercano a cada uno
+        keyframes = keyframe_times(youtube_video_path) if snap_to_keyframes else None
+        cuts = plan_cuts(total_duration, segment_duration, keyframes,
+                         cfg["min_duration"], cfg["max_duration"])
+        if keyframes:
+            print(f"   🔑 Cortes ajustados a keyframes ({len(keyframes)} disponibles)")
         
-        shorts_paths = []
         base_name = os.path.splitext(os.path.basename(youtube_video_path))[0]
         
-        for i in range(num_segments):
-            start_time = i * segment_duration
-            duration = segment_duration
-            
-            print(f"\n  [Short {i+1}/{num_segments}] {start_time:.1f}s - {start_time + duration:.1f}s")
-            
+        # CTA pre-renderizado una vez y en cache (antes: un drawtext evaluado en cada short)
+        cta_text = "Suscríbete y dime qué opinas abajo"
+        cta_png = cached_text(cta_text, 45, color="white", font="Arial",
+                              stroke_color="black", stroke_width=3)
+        
+        def cut_short(i):
+            start_time = cuts[i]
+            duration = cuts[i + 1] - start_time
             output_path = os.path.join(output_dir, f"{base_name}_short_{i+1:02d}.mp4")
             
-            # Usar ffmpeg directamente para cortar, hacer crop y añadir CTA
-            # El crop: 1920x1080 -> 607x1080 (centro) -> resize a 1080x1920
-            # crop=607:1080:656:0 (ancho:alto:x:y)  x = (1920-607)/2 = 656
-            # drawtext añade el CTA en los últimos 4 segundos
-            cta_text = "Suscríbete y dime qué opinas abajo"
-            
-            # Calcular cuando mostrar el CTA (últimos 4 segundos)
+            # Recorte al centro a 9:16 (de un 1920x1080: 607x1080 escalado a 1080x1920);
+            # la salida vertical de create_reel ya está en 9:16 y pasa sin recortar
+            # El CTA aparece en los últimos 4 segundos
             cta_start = duration - 4
-            
-            # Filtro complejo: crop + scale + CTA text
-            vf_filter = f"crop=607:1080:656:0,scale=1080:1920,drawtext=text='{cta_text}':fontsize=45:fontcolor=white:borderw=3:bordercolor=black:x=(w-text_w)/2:y=h*0.82:enable='gte(t,{cta_start})'"
+            graph = (
+                f"[0:v]{target_filter(1080, 1920)}[v];"
+                f"[v][1:v]overlay=x=(W-w)/2:y=H*0.82:enable='gte(t,{cta_start:.3f})'[vout]"
+            )
             
             cmd = [
                 'ffmpeg', '-y',
-                '-ss', str(start_time),
+                '-ss', f"{start_time:.3f}",
+                '-t', f"{duration:.3f}",
                 '-i', youtube_video_path,
-                '-t', str(duration),
-                '-vf', vf_filter,
+                '-i', cta_png,
+                '-filter_complex', graph,
+                '-map', '[vout]', '-map', '0:a?',
                 '-c:v', 'libx264',
                 '-preset', 'fast',
                 '-c:a', 'aac',
@@ -644,14 +1101,18 @@ class VideoComposer:
                 output_path
             ]
             
-            subprocess.run(cmd, capture_output=True)
-            
-            if os.path.exists(output_path):
-                shorts_paths.append(output_path)
-                print(f"   ✓ Guardado: {output_path}")
-            else:
-                print(f"   ❌ Error al crear short {i+1}")
+            ok = run_ffmpeg(cmd, f"short {i+1}")
+            if ok and os.path.exists(output_path):
+                print(f"   ✓ [Short {i+1}/{num_segments}] {start_time:.1f}s - "
+                      f"{start_time + duration:.1f}s: {output_path}")
+                return output_path
+            print(f"   ❌ Error al crear short {i+1}")
+            return None
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(cut_short, range(num_segments)))
         
+        shorts_paths = [p for p in results if p]
         print(f"\n✅ {len(shorts_paths)} shorts generados!")
         return shorts_paths
 
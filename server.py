@@ -6,7 +6,11 @@ from flask import Flask, request, redirect, send_from_directory, render_template
 # ========================
 # IMPORT DO GERADOR
 # ========================
-from generar_5_cosas import main as gerar_shorts, generar_solo_guion, crear_video_desde_guion
+from generar_5_cosas import (main as gerar_shorts, generar_solo_guion, crear_video_desde_guion,
+                             crear_videos_multilocale, FalhaLocales, falhas_do_manifesto,
+                             limpar_previews)
+from config import FANOUT_CONFIG, RENDER_PROFILES, PREVIEW_DIR
+from modules.mezzanine import ensure_mezzanine, remove_mezzanine
 
 # ========================
 # CONFIG
@@ -30,7 +34,9 @@ STATUS = {
     "message": "Idle",
     "progress": 0,
     "script_preview": None,  # Armazena roteiro para preview
-    "video_sequence": None  # Armazena sequência de vídeos selecionados
+    "video_sequence": None,  # Armazena sequência de vídeos selecionados
+    "preview_files": [],  # Último preview rápido (baixa resolução) do roteiro atual
+    "failed_locales": {}  # Idiomas que falharam no último render: {código: erro}
 }
 
 # ========================
@@ -42,7 +48,9 @@ def run_generator():
         STATUS["message"] = "Generating videos..."
         STATUS["progress"] = 10
 
-        gerar_shorts()
+        if not gerar_shorts():
+            STATUS["message"] = "❌ Generation failed (see the log for the failed locales)"
+            return
 
         STATUS["progress"] = 100
         STATUS["message"] = "✅ Completed successfully"
@@ -408,7 +416,31 @@ def index():
         });
         </script>
         
+        {% if status.failed_locales %}
+        <div style="background: #ffebee; padding: 10px 15px; border-radius: 5px; margin-bottom: 15px;">
+            <strong>❌ Failed locales:</strong>
+            {% for code, error in status.failed_locales.items() %}
+                <div><code>{{ code }}</code>: {{ error }}</div>
+            {% endfor %}
+        </div>
+        {% endif %}
+
+        {% if status.preview_files %}
+        <div style="background: #f3e5f5; padding: 10px 15px; border-radius: 5px; margin-bottom: 15px;">
+            <strong>⚡ Preview:</strong>
+            {% for f in status.preview_files %}
+                <a href="/preview-file/{{ f }}">{{ f }}</a>{% if not loop.last %} · {% endif %}
+            {% endfor %}
+            <small style="color: #777;">(approve to promote to the final render)</small>
+        </div>
+        {% endif %}
+
         <div style="display: flex; gap: 10px;">
+            <form method="POST" action="/preview" style="display: inline;">
+                <button type="submit" style="background: #9c27b0;" {% if status.running or not status.video_sequence %}disabled{% endif %}>
+                    ⚡ Quick Preview
+                </button>
+            </form>
             <form method="POST" action="/create-video" style="display: inline;">
                 <button type="submit" style="background: #4caf50;" {% if status.running or not status.video_sequence %}disabled{% endif %}>
                     ✅ Approve & Create Videos
@@ -639,15 +671,23 @@ def create_video():
             
             from datetime import datetime
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            success = crear_video_desde_guion(STATUS["script_preview"], timestamp, STATUS["video_sequence"])
+            success = crear_video_desde_guion(STATUS["script_preview"], timestamp, STATUS["video_sequence"],
+                                              profile="final")
             
+            STATUS["failed_locales"] = {}
             if success:
                 STATUS["message"] = "✅ Videos created successfully"
                 STATUS["progress"] = 100
                 STATUS["script_preview"] = None
+                STATUS["preview_files"] = []
+                limpar_previews()
             else:
                 STATUS["message"] = "❌ Error creating videos"
                 
+        except FalhaLocales as e:
+            # O roteiro fica para tentar de novo; os idiomas que deram certo já estão no output
+            STATUS["failed_locales"] = e.falhas
+            STATUS["message"] = f"❌ Failed locales: {', '.join(e.falhas)}"
         except Exception as e:
             STATUS["message"] = f"❌ Error: {e}"
         finally:
@@ -658,6 +698,51 @@ def create_video():
     return redirect("/")
 
 
+# ========================
+# QUICK PREVIEW (baixa resolução, só o idioma mestre)
+# ========================
+@app.route("/preview", methods=["POST"])
+def preview():
+    """Render rápido do roteiro + sequência atuais para conferir o corte"""
+    if STATUS["running"] or not STATUS["script_preview"] or not STATUS["video_sequence"]:
+        return redirect("/")
+    
+    profile = request.form.get("profile", "preview")
+    if profile not in RENDER_PROFILES:
+        profile = "preview"
+    
+    def run_preview():
+        try:
+            STATUS["running"] = True
+            STATUS["message"] = f"Rendering {profile}..."
+            STATUS["progress"] = 50
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Só o preview mais recente fica em disco
+            STATUS["preview_files"] = []
+            limpar_previews()
+            manifest = crear_videos_multilocale(STATUS["script_preview"], [FANOUT_CONFIG["master"]],
+                                                timestamp, STATUS["video_sequence"], profile=profile)
+            files = [os.path.basename(out["video"]) for out in manifest["locales"].values() if out["video"]]
+            STATUS["failed_locales"] = falhas_do_manifesto(manifest)
+            
+            if STATUS["failed_locales"]:
+                STATUS["message"] = f"❌ Failed locales: {', '.join(STATUS['failed_locales'])}"
+            elif files:
+                STATUS["preview_files"] = files
+                STATUS["message"] = "✅ Preview ready"
+            else:
+                STATUS["message"] = "❌ Error rendering preview"
+        except Exception as e:
+            STATUS["message"] = f"❌ Error: {e}"
+        finally:
+            STATUS["running"] = False
+            STATUS["progress"] = 0
+    
+    threading.Thread(target=run_preview).start()
+    return redirect("/")
+
+
 # ========================
 # CLEAR SCRIPT PREVIEW
 # ========================
@@ -666,6 +751,8 @@ def clear_script():
     """Descarta o roteiro atual"""
     STATUS["script_preview"] = None
     STATUS["video_sequence"] = None
+    STATUS["preview_files"] = []
+    limpar_previews()
     STATUS["message"] = "Script discarded"
     return redirect("/")
 
@@ -709,22 +796,32 @@ def download(filename):
     return send_from_directory(OUTPUT_DIR, filename, as_attachment=True)
 
 
+@app.route("/preview-file/<filename>")
+def preview_file(filename):
+    """Renders draft/preview (ficam em PREVIEW_DIR, fora da lista de vídeos gerados)"""
+    return send_from_directory(PREVIEW_DIR, filename)
+
+
 # ========================
 # UPLOAD
 # ========================
 @app.route("/upload", methods=["POST"])
 def upload():
     files = request.files.getlist("files")
-    uploaded_count = 0
+    uploaded = []
     
     for file in files:
         if file and file.filename.endswith('.mp4'):
             path = os.path.join(LIBRARY_DIR, file.filename)
             file.save(path)
-            uploaded_count += 1
+            uploaded.append(path)
     
-    if uploaded_count > 0:
-        STATUS["message"] = f"✅ {uploaded_count} video(s) uploaded successfully"
+    if uploaded:
+        STATUS["message"] = f"✅ {len(uploaded)} video(s) uploaded successfully"
+        # Normalize uploads in the background so renders can stream-copy them
+        threading.Thread(
+            target=lambda: [ensure_mezzanine(p) for p in uploaded], daemon=True
+        ).start()
     
     return redirect("/")
 
@@ -739,6 +836,7 @@ def delete(filename):
         file_path = os.path.join(LIBRARY_DIR, filename)
         if os.path.exists(file_path) and filename.endswith('.mp4'):
             os.remove(file_path)
+            remove_mezzanine(file_path)
     except Exception as e:
         print(f"Error deleting {filename}: {e}")
     return redirect("/")
@@ -748,4 +846,9 @@ def delete(filename):
 # START
 # ========================
 if __name__ == "__main__":
+    # Load Whisper once at startup so the first job does not pay for it
+    # (only in the reloader child process, which is the one serving requests)
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from modules.subtitles import warm_whisper_models
+        threading.Thread(target=warm_whisper_models, daemon=True).start()
     app.run(host="0.0.0.0", port=8000, debug=True)
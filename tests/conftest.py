@@ -0,0 +1,34 @@
+"""
+Utilidades compartidas de los tests
+Los tests cubren funciones puras: no necesitan ffmpeg ni el índice SQLite
+"""
+import os
+import sys
+
+import pytest
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeMediaIndex:
+    """Sustituto del índice de medios con duraciones fijas"""
+
+    def __init__(self, durations: dict):
+        self.durations = durations
+
+    def get_duration(self, path: str) -> float:
+        return self.durations.get(path)
+
+
+@pytest.fixture
+def media_durations(monkeypatch):
+    """
+    Devuelve una función que instala duraciones falsas en un módulo que
+    usa get_media_index (p.ej. media_durations(smart_render, {...}))
+    """
+    def install(module, durations: dict) -> FakeMediaIndex:
+        index = FakeMediaIndex(durations)
+        monkeypatch.setattr(module, "get_media_index", lambda: index)
+        return index
+    return install
@@ -0,0 +1,70 @@
+"""
+Tests de plan_chunks: fragmentos continuos que cubren toda la línea de tiempo
+"""
+import pytest
+
+from modules import chunked_render
+from modules.chunked_render import plan_chunks
+
+
+def _assert_continuous(chunks, duration):
+    assert chunks[0]["start"] == 0.0
+    assert chunks[-1]["end"] == pytest.approx(duration)
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert prev["end"] == cur["start"]
+    for chunk in chunks:
+        assert sum(c["length"] for c in chunk["clips"]) == pytest.approx(chunk["end"] - chunk["start"])
+
+
+def test_chunks_cover_the_timeline_without_gaps(media_durations):
+    media_durations(chunked_render, {"a": 17.3, "b": 25.1, "c": 9.6})
+    timeline = ["a", "b", "c", "a", "b", "c", "a", "b"]
+    duration = 120.0
+
+    chunks = plan_chunks(timeline, duration, workers=4)
+
+    assert len(chunks) == 4
+    _assert_continuous(chunks, duration)
+    # Cortes en segundos enteros (frame exacto y keyframe de las mezzanines)
+    for chunk in chunks[:-1]:
+        assert chunk["end"] == int(chunk["end"])
+
+
+def test_clip_across_a_cut_continues_in_the_next_chunk(media_durations):
+    media_durations(chunked_render, {"a": 25.0, "b": 25.0})
+
+    chunks = plan_chunks(["a", "b"], 50.0, workers=2)
+
+    first, second = chunks
+    assert first["end"] == 25.0
+    assert first["clips"] == [{"path": "a", "inpoint": 0.0, "length": 25.0}]
+    assert second["clips"] == [{"path": "b", "inpoint": 0.0, "length": 25.0}]
+
+    chunks = plan_chunks(["a", "b"], 50.0, workers=3)
+    for prev, cur in zip(chunks, chunks[1:]):
+        tail, head = prev["clips"][-1], cur["clips"][0]
+        if tail["path"] == head["path"]:
+            # El mismo clip sigue donde lo dejó el fragmento anterior
+            assert tail["inpoint"] + tail["length"] == pytest.approx(head["inpoint"])
+
+
+def test_short_remainder_joins_the_previous_chunk(media_durations):
+    media_durations(chunked_render, {"a": 100.0})
+
+    chunks = plan_chunks(["a"], 63.0, workers=3)
+
+    assert [(c["start"], c["end"]) for c in chunks] == [(0.0, 21.0), (21.0, 42.0), (42.0, 63.0)]
+
+    chunks = plan_chunks(["a"], 64.0, workers=3)
+    _assert_continuous(chunks, 64.0)
+    assert chunks[-1]["end"] - chunks[-1]["start"] >= 10
+
+
+def test_min_chunk_seconds_limits_the_split(media_durations):
+    media_durations(chunked_render, {"a": 100.0})
+
+    chunks = plan_chunks(["a"], 30.0, workers=16)
+
+    # min_chunk_seconds = 10: como mucho 3 fragmentos aunque haya 16 procesos
+    assert len(chunks) == 3
+    _assert_continuous(chunks, 30.0)
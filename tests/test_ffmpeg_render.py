@@ -0,0 +1,50 @@
+"""
+Tests de plan_cuts: cortes de split_youtube_to_shorts, con y sin keyframes
+"""
+import pytest
+
+from modules.ffmpeg_render import plan_cuts
+
+
+def _lengths(cuts):
+    return [b - a for a, b in zip(cuts, cuts[1:])]
+
+
+def test_without_keyframes_cuts_are_exact_multiples():
+    assert plan_cuts(95.0, 30.0) == [0.0, 30.0, 60.0, 90.0]
+    assert plan_cuts(29.0, 30.0) == []
+
+
+def test_cuts_snap_to_the_nearest_keyframe():
+    keyframes = [0.0, 4.0, 28.5, 33.0, 61.2, 88.0]
+
+    assert plan_cuts(95.0, 30.0, keyframes, 10.0, 60.0) == [0.0, 28.5, 61.2, 90.0]
+
+
+def test_snapped_cut_never_reaches_the_end():
+    # Keyframe pasado el último corte: antes daba [0, 91, 90]
+    cuts = plan_cuts(95.0, 30.0, [0.0, 91.0], 10.0, 60.0)
+
+    assert cuts == [0.0, 30.0, 60.0, 90.0]
+    assert cuts == sorted(set(cuts))
+
+
+def test_sparse_keyframes_do_not_merge_shorts_past_the_maximum():
+    # Un solo keyframe cerca de dos cortes: antes los juntaba en un short de 90 s
+    cuts = plan_cuts(120.0, 30.0, [0.0, 44.0], 10.0, 60.0)
+
+    assert len(cuts) == 5
+    assert all(10.0 <= length <= 60.0 for length in _lengths(cuts))
+
+
+@pytest.mark.parametrize("keyframes", [
+    [0.0, 12.0, 41.0, 44.0, 73.0, 76.0, 119.0],
+    [float(k) for k in range(0, 300, 7)],
+    [0.0, 59.0, 61.0, 119.0, 121.0],
+])
+def test_every_short_stays_within_bounds(keyframes):
+    cuts = plan_cuts(300.0, 30.0, keyframes, 10.0, 60.0)
+
+    assert cuts[0] == 0.0 and cuts[-1] == 300.0
+    assert len(cuts) == 11
+    assert all(10.0 <= length <= 60.0 for length in _lengths(cuts))
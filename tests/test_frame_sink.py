@@ -0,0 +1,112 @@
+"""
+Tests de FFmpegFrameSink con un proceso ffmpeg simulado (stdin en memoria)
+"""
+import threading
+
+import numpy as np
+import pytest
+
+from modules import frame_sink
+from modules.frame_sink import FFmpegFrameSink, encode_frames, frame_shape
+
+WIDTH, HEIGHT, FPS = 8, 4, 30
+
+
+class FakeStdin:
+    def __init__(self, fail_after=None):
+        self.chunks = []
+        self.fail_after = fail_after
+        self.broken = threading.Event()
+
+    def write(self, data):
+        if self.fail_after is not None and len(self.chunks) >= self.fail_after:
+            self.broken.set()
+            raise BrokenPipeError("pipe cerrado")
+        self.chunks.append(bytes(data))
+
+    def close(self):
+        pass
+
+
+class FakeProcess:
+    def __init__(self, stdin):
+        self.stdin = stdin
+
+    def wait(self):
+        return 1 if self.stdin.broken.is_set() else 0
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    """Sustituye Popen; devuelve el stdin simulado y el comando recibido"""
+    state = {"stdin": FakeStdin(), "cmd": None}
+
+    def popen(cmd, **kwargs):
+        state["cmd"] = cmd
+        return FakeProcess(state["stdin"])
+
+    monkeypatch.setattr(frame_sink.subprocess, "Popen", popen)
+    return state
+
+
+def _frames(n):
+    return [np.full((HEIGHT, WIDTH, 3), i, dtype=np.uint8) for i in range(n)]
+
+
+def test_frame_shape():
+    assert frame_shape("rgb24", WIDTH, HEIGHT) == (HEIGHT, WIDTH, 3)
+    assert frame_shape("rgba", WIDTH, HEIGHT) == (HEIGHT, WIDTH, 4)
+    assert frame_shape("gray", WIDTH, HEIGHT) == (HEIGHT, WIDTH)
+    assert frame_shape("yuv420p", WIDTH, HEIGHT) == (HEIGHT * 3 // 2, WIDTH)
+    with pytest.raises(ValueError):
+        frame_shape("nv12", WIDTH, HEIGHT)
+
+
+def test_frames_reach_ffmpeg_in_order(ffmpeg, tmp_path):
+    frames = _frames(20)
+
+    # Cola pequeña: los buffers se reciclan varias veces
+    stats = encode_frames(iter(frames), str(tmp_path / "out.mp4"), WIDTH, HEIGHT, FPS, queue_size=2)
+
+    assert ffmpeg["stdin"].chunks == [f.tobytes() for f in frames]
+    assert stats["frames"] == 20
+    assert stats["duration"] == pytest.approx(20 / FPS)
+    assert stats["returncode"] == 0 and stats["error"] is None
+
+
+def test_producer_array_can_be_reused(ffmpeg, tmp_path):
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    with FFmpegFrameSink(str(tmp_path / "out.mp4"), WIDTH, HEIGHT, FPS) as sink:
+        for i in range(5):
+            frame[:] = i
+            sink.write(frame)
+
+    assert [chunk[0] for chunk in ffmpeg["stdin"].chunks] == [0, 1, 2, 3, 4]
+
+
+def test_audio_and_rate_options(ffmpeg, tmp_path):
+    encode_frames(_frames(1), str(tmp_path / "out.mp4"), WIDTH, HEIGHT, FPS,
+                  audio_path="voz.mp3", crf=20, bitrate="8M", shortest=False)
+
+    cmd = ffmpeg["cmd"]
+    assert cmd[cmd.index("-s") + 1] == f"{WIDTH}x{HEIGHT}"
+    assert "voz.mp3" in cmd and "-shortest" not in cmd
+    # crf tiene prioridad sobre el bitrate
+    assert "-crf" in cmd and "-b:v" not in cmd
+
+
+def test_broken_pipe_returns_stats_with_error(ffmpeg, tmp_path):
+    ffmpeg["stdin"] = FakeStdin(fail_after=2)
+
+    def frames():
+        for i, frame in enumerate(_frames(10)):
+            if i == 4:
+                # Espera a que el hilo escritor vea el pipe roto
+                assert ffmpeg["stdin"].broken.wait(5)
+            yield frame
+
+    stats = encode_frames(frames(), str(tmp_path / "out.mp4"), WIDTH, HEIGHT, FPS, queue_size=1)
+
+    assert stats["returncode"] == 1
+    assert "ffmpeg dejó de aceptar frames" in stats["error"]
+    assert len(ffmpeg["stdin"].chunks) == 2
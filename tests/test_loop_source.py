@@ -0,0 +1,77 @@
+"""
+Tests de LoopingSource.frame: conversión YUV 4:2:0 → RGB con NumPy y repetición del ciclo
+"""
+import numpy as np
+import pytest
+
+from modules import loop_source
+from modules.loop_source import LoopingSource
+
+# Alto que no es múltiplo de 4: los planos U/V no caen en filas enteras
+WIDTH, HEIGHT, FPS = 8, 6, 10
+
+
+@pytest.fixture
+def numpy_only(monkeypatch):
+    """Fuerza el camino NumPy (sin OpenCV)"""
+    monkeypatch.setattr(loop_source, "cv2", None)
+
+
+def _yuv_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = np.empty((n, HEIGHT * 3 // 2, WIDTH), dtype=np.uint8)
+    frames[:, :HEIGHT] = rng.integers(16, 236, (n, HEIGHT, WIDTH))
+    frames[:, HEIGHT:] = rng.integers(16, 241, (n, HEIGHT // 2, WIDTH))
+    return frames
+
+
+def _float_rgb(yuv):
+    """BT.601 de rango limitado en coma flotante (referencia)"""
+    h, w = HEIGHT, WIDTH
+    planes = yuv.reshape(-1).astype(np.float64)
+    luma, chroma = h * w, (h // 2) * (w // 2)
+    y = planes[:luma].reshape(h, w) - 16
+    u = planes[luma:luma + chroma].reshape(h // 2, w // 2) - 128
+    v = planes[luma + chroma:].reshape(h // 2, w // 2) - 128
+    u = u.repeat(2, axis=0).repeat(2, axis=1)
+    v = v.repeat(2, axis=0).repeat(2, axis=1)
+    rgb = np.stack([
+        1.164 * y + 1.596 * v,
+        1.164 * y - 0.392 * u - 0.813 * v,
+        1.164 * y + 2.017 * u,
+    ], axis=-1)
+    return np.clip(np.rint(rgb), 0, 255).astype(np.uint8)
+
+
+def test_numpy_conversion_matches_float_bt601(numpy_only):
+    frames = _yuv_frames(3)
+    source = LoopingSource(frames, FPS)
+
+    for i in range(3):
+        rgb = source.frame(i / FPS)
+        assert rgb.shape == (HEIGHT, WIDTH, 3)
+        diff = np.abs(rgb.astype(np.int16) - _float_rgb(frames[i]).astype(np.int16))
+        assert diff.max() <= 1
+
+
+def test_extreme_values_saturate(numpy_only):
+    frames = np.empty((2, HEIGHT * 3 // 2, WIDTH), dtype=np.uint8)
+    frames[0] = 16
+    frames[0, HEIGHT:] = 128
+    frames[1] = 255
+    source = LoopingSource(frames, FPS)
+
+    # Negro de rango limitado → 0; Y, U y V al máximo saturan en vez de desbordar
+    assert (source.frame(0) == 0).all()
+    assert source.frame(1 / FPS).tolist() == _float_rgb(frames[1]).tolist()
+
+
+def test_cycle_repeats_and_buffer_is_shared(numpy_only):
+    frames = _yuv_frames(4, seed=1)
+    source = LoopingSource(frames, FPS)
+
+    first = source.frame(0).copy()
+    # 4 frames a 10 fps: t=0.4 vuelve al primero
+    assert np.array_equal(source.frame(0.4), first)
+    assert source.frame(0.1) is source.frame(0.2)
+    assert (source.width, source.height) == (WIDTH, HEIGHT)
@@ -0,0 +1,134 @@
+"""
+Tests de MediaIndex: ffprobe solo para archivos nuevos o modificados
+"""
+import json
+import os
+
+import pytest
+
+from modules import media_index
+from modules.media_index import MediaIndex, probe_media, _parse_rate, _parse_rotation
+
+
+class FakeProbe:
+    """Sustituto de subprocess.run para ffprobe: cuenta las llamadas"""
+
+    def __init__(self):
+        self.calls = []
+        self.unreadable = set()
+
+    def __call__(self, cmd, **kwargs):
+        path = cmd[-1]
+        self.calls.append(path)
+        if path in self.unreadable:
+            return _Result(1, "")
+        info = {
+            "format": {"duration": str(os.path.getsize(path) / 10), "bit_rate": "800000"},
+            "streams": [
+                {"codec_type": "video", "codec_name": "h264", "width": 1080, "height": 1920,
+                 "avg_frame_rate": "30000/1001", "tags": {"rotate": "90"}},
+                {"codec_type": "audio"},
+            ],
+        }
+        return _Result(0, json.dumps(info))
+
+
+class _Result:
+    def __init__(self, returncode, stdout):
+        self.returncode = returncode
+        self.stdout = stdout
+
+
+@pytest.fixture
+def probe(monkeypatch):
+    fake = FakeProbe()
+    monkeypatch.setattr(media_index.subprocess, "run", fake)
+    return fake
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = MediaIndex(str(tmp_path / "index.db"))
+    yield idx
+    idx.close()
+
+
+def _clip(directory, name, size):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_probe_media_parses_ffprobe_output(probe, tmp_path):
+    path = _clip(tmp_path, "a.mp4", 50)
+
+    meta = probe_media(path)
+
+    assert meta == {"duration": 5.0, "width": 1080, "height": 1920, "fps": pytest.approx(29.97, abs=0.01),
+                    "codec": "h264", "bitrate": 800000, "rotation": 90, "has_audio": 1}
+
+
+def test_parse_helpers():
+    assert _parse_rate("30/1") == 30.0
+    assert _parse_rate("0/0") == 0.0
+    assert _parse_rate(None) == 0.0
+    assert _parse_rotation({"side_data_list": [{"rotation": -90}]}) == 270
+    assert _parse_rotation({}) == 0
+
+
+def test_get_probes_once_until_the_file_changes(probe, index, tmp_path):
+    path = _clip(tmp_path, "a.mp4", 50)
+
+    assert index.get_duration(path) == 5.0
+    assert index.get(path)["has_audio"] is True
+    assert len(probe.calls) == 1
+
+    # Otro tamaño (y mtime): se vuelve a analizar
+    _clip(tmp_path, "a.mp4", 80)
+    os.utime(path, (1, 1))
+    assert index.get_duration(path) == 8.0
+    assert len(probe.calls) == 2
+
+
+def test_unreadable_file_is_cached_as_missing(probe, index, tmp_path):
+    path = _clip(tmp_path, "roto.mp4", 10)
+    probe.unreadable.add(path)
+
+    assert index.get(path) is None
+    assert index.get(path) is None
+    assert len(probe.calls) == 1
+    assert index.get(str(tmp_path / "no_existe.mp4")) is None
+
+
+def test_list_directory_syncs_new_and_removed_files(probe, index, tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    a = _clip(library, "a.mp4", 20)
+    b = _clip(library, "b.mp4", 30)
+    _clip(library, "notas.txt", 5)
+
+    assert [c["path"] for c in index.list_directory(str(library))] == [a, b]
+    assert len(probe.calls) == 2
+
+    # Sin cambios: solo stat, ningún ffprobe
+    assert index.sync_directory(str(library)) == 0
+    assert len(probe.calls) == 2
+
+    os.remove(a)
+    c = _clip(library, "c.mp4", 40)
+    assert [clip["path"] for clip in index.list_directory(str(library))] == [b, c]
+    assert probe.calls[2:] == [c]
+
+
+def test_index_persists_between_instances(probe, tmp_path):
+    path = _clip(tmp_path, "a.mp4", 50)
+    db = str(tmp_path / "index.db")
+
+    first = MediaIndex(db)
+    first.get(path)
+    first.close()
+    second = MediaIndex(db)
+    assert second.get_duration(path) == 5.0
+    second.close()
+
+    assert len(probe.calls) == 1
@@ -0,0 +1,116 @@
+"""
+Tests de KenBurnsEngine.trajectory frente a las curvas por frame de la
+versión anterior de create_ken_burns_clip, y de ffmpeg_filter frente a trajectory
+"""
+import math
+
+import pytest
+
+from modules.motion import KenBurnsEngine
+
+FPS = 30
+SCALE_FACTOR = 1.15
+
+
+def _old_rect(t, duration, w, h, zoom_direction, pan_direction):
+    """Recorte que calculaba zoom_pan_effect para el frame del instante t"""
+    progress = t / duration
+    if zoom_direction == "in":
+        zoom = 1 + (SCALE_FACTOR - 1) * progress
+    else:
+        zoom = SCALE_FACTOR - (SCALE_FACTOR - 1) * progress
+
+    new_w = int(w / zoom)
+    new_h = int(h / zoom)
+    x_offset = (w - new_w) // 2
+    y_offset = (h - new_h) // 2
+
+    pan_amount = int(25 * progress)
+    if pan_direction == "left":
+        x_offset -= pan_amount
+    elif pan_direction == "right":
+        x_offset += pan_amount
+    elif pan_direction == "up":
+        y_offset -= pan_amount
+    elif pan_direction == "down":
+        y_offset += pan_amount
+
+    x_offset = max(0, min(x_offset, w - new_w))
+    y_offset = max(0, min(y_offset, h - new_h))
+    return [x_offset, y_offset, new_w, new_h]
+
+
+@pytest.mark.parametrize("zoom_direction", ["in", "out"])
+@pytest.mark.parametrize("pan_direction", [None, "left", "right", "up", "down"])
+def test_trajectory_matches_old_per_frame_curves(zoom_direction, pan_direction):
+    engine = KenBurnsEngine(1080, 1920, FPS, scale_factor=SCALE_FACTOR)
+    img_w, img_h = 1242, 2484
+    duration = 4.3
+
+    rects = engine.trajectory(img_w, img_h, duration, zoom_direction, pan_direction)
+
+    assert rects.shape == (round(duration * FPS), 4)
+    for i, rect in enumerate(rects):
+        assert rect.tolist() == _old_rect(i / FPS, duration, img_w, img_h,
+                                          zoom_direction, pan_direction)
+
+
+def test_trajectory_stays_inside_the_image():
+    engine = KenBurnsEngine(1080, 1920, FPS, scale_factor=SCALE_FACTOR, pan_amount=500)
+    img_w, img_h = 1242, 2208
+
+    for pan_direction in ("left", "right", "up", "down"):
+        rects = engine.trajectory(img_w, img_h, 2.0, "out", pan_direction)
+        x, y, w, h = rects.T
+        assert (x >= 0).all() and (y >= 0).all()
+        assert (x + w <= img_w).all() and (y + h <= img_h).all()
+
+
+def test_zoom_in_shrinks_the_crop_over_time():
+    engine = KenBurnsEngine(1080, 1920, FPS, scale_factor=SCALE_FACTOR)
+
+    rects = engine.trajectory(1242, 2208, 3.0, "in")
+
+    widths = rects[:, 2]
+    assert widths[0] == 1242
+    assert (widths[1:] <= widths[:-1]).all()
+    assert widths[-1] == pytest.approx(1242 / SCALE_FACTOR, abs=2)
+
+
+def _zoompan_params(filter_str):
+    """Expresiones z, x, y y opciones de zoompan de un filtro"""
+    zoompan = filter_str.split("zoompan=", 1)[1]
+    params = {}
+    for part in zoompan.split(":"):
+        key, value = part.split("=", 1)
+        params[key] = value.strip("'")
+    return params
+
+
+def _evaluate(expr, **names):
+    """Evalúa una expresión de ffmpeg (solo floor/min/max y aritmética)"""
+    return eval(expr, {"__builtins__": {}}, dict(names, floor=math.floor, min=min, max=max))
+
+
+@pytest.mark.parametrize("zoom_direction", ["in", "out"])
+@pytest.mark.parametrize("pan_direction", [None, "left", "right", "up", "down"])
+def test_ffmpeg_filter_matches_trajectory(zoom_direction, pan_direction):
+    engine = KenBurnsEngine(1080, 1920, FPS, scale_factor=SCALE_FACTOR, pan_amount=60)
+    img_w, img_h = 1242, 2484
+    duration = 4.3
+
+    filter_str = engine.ffmpeg_filter(img_w, img_h, duration, zoom_direction, pan_direction)
+    rects = engine.trajectory(img_w, img_h, duration, zoom_direction, pan_direction)
+
+    assert filter_str.startswith(f"scale={img_w}:{img_h},")
+    params = _zoompan_params(filter_str)
+    assert int(params["d"]) == len(rects)
+    assert params["s"] == "1080x1920" and int(params["fps"]) == FPS
+
+    for on in (0, 1, 37, len(rects) // 2, len(rects) - 1):
+        zoom = _evaluate(params["z"], on=on)
+        names = dict(on=on, iw=img_w, ih=img_h, zoom=zoom)
+        x, y, w, h = rects[on].tolist()
+        # zoompan recorta iw/zoom x ih/zoom en (x, y): el mismo rectángulo
+        assert (math.floor(img_w / zoom), math.floor(img_h / zoom)) == (w, h)
+        assert (_evaluate(params["x"], **names), _evaluate(params["y"], **names)) == (x, y)
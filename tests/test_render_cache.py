@@ -0,0 +1,72 @@
+"""
+Tests de make_job_key y RenderCache
+"""
+import os
+
+from modules.render_cache import RenderCache, make_job_key
+
+SPEC = {"idioma": "ES", "text": "hola", "profile": {"width": 1080, "height": 1920}}
+
+
+def _file(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_job_key_depends_on_spec_and_inputs(tmp_path):
+    audio = _file(tmp_path, "voz.mp3", b"audio")
+    clip = _file(tmp_path, "a.mp4", b"video")
+    key = make_job_key(SPEC, [audio], [clip])
+
+    # Mismo trabajo (claves del dict en otro orden): misma clave
+    assert make_job_key(dict(reversed(list(SPEC.items()))), [audio], [clip]) == key
+    assert make_job_key(dict(SPEC, text="adiós"), [audio], [clip]) != key
+
+    # Audio con el mismo tamaño y otro contenido: se compara el hash completo
+    _file(tmp_path, "voz.mp3", b"otros")
+    assert make_job_key(SPEC, [audio], [clip]) != key
+
+
+def test_video_inputs_use_size_and_mtime(tmp_path):
+    audio = _file(tmp_path, "voz.mp3", b"audio")
+    clip = _file(tmp_path, "a.mp4", b"video")
+    os.utime(clip, (100, 100))
+    key = make_job_key(SPEC, [audio], [clip])
+
+    os.utime(clip, (200, 200))
+    assert make_job_key(SPEC, [audio], [clip]) != key
+
+
+def test_hit_copies_the_cached_video(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_mb=1)
+    render = _file(tmp_path, "short_ES_1.mp4", b"video")
+    cache.put("k1", render)
+
+    out = str(tmp_path / "short_ES_2.mp4")
+    assert cache.get("k1", out) == out
+    assert open(out, "rb").read() == b"video"
+    assert cache.get("otra", str(tmp_path / "x.mp4")) is None
+
+    # Sobrescribir el render no cambia la copia del cache
+    with open(render, "wb") as f:
+        f.write(b"nuevo")
+    cache.get("k1", out)
+    assert open(out, "rb").read() == b"video"
+
+
+def test_eviction_keeps_the_cache_under_max_bytes(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_mb=1)
+    cache.max_bytes = 25
+    for i, key in enumerate(["a", "b"]):
+        cache.put(key, _file(tmp_path, f"{key}.mp4", b"x" * 10))
+        os.utime(os.path.join(cache.cache_dir, f"{key}.mp4"), (100 + i, 100 + i))
+
+    # "a" se usa: pasa a ser la más reciente y sale "b"
+    cache.get("a", str(tmp_path / "out.mp4"))
+    cache.put("c", _file(tmp_path, "c.mp4", b"x" * 10))
+    assert sorted(os.listdir(cache.cache_dir)) == ["a.mp4", "c.mp4"]
+
+    # Un video mayor que el límite se guarda igual (y expulsa al resto)
+    cache.put("d", _file(tmp_path, "d.mp4", b"x" * 40))
+    assert os.listdir(cache.cache_dir) == ["d.mp4"]
@@ -0,0 +1,96 @@
+"""
+Tests de plan_segments: cortes por grupo y reutilización de segmentos
+"""
+import pytest
+
+from modules import smart_render
+from modules.smart_render import plan_segments, segment_key
+
+FPS = 30
+PROFILE = {"width": 540, "height": 960, "fps": FPS, "preset": "veryfast", "crf": 30}
+
+
+@pytest.fixture
+def clips(tmp_path):
+    """Archivos reales (segment_key usa tamaño y mtime)"""
+    def make(*names):
+        paths = []
+        for name in names:
+            path = tmp_path / f"{name}.mp4"
+            path.write_bytes(name.encode())
+            paths.append(str(path))
+        return paths
+    return make
+
+
+def _keys(segments):
+    return {seg["name"]: segment_key(seg, [], PROFILE) for seg in segments}
+
+
+def test_segments_start_at_frame_rounded_group_boundaries(media_durations):
+    media_durations(smart_render, {"a": 2.3, "b": 1.91, "c": 3.56, "d": 4.0})
+    groups = [("clip_1", ["a", "b"]), ("clip_2", ["c"]), ("clip_3", ["d"])]
+
+    segments = plan_segments(groups, 20.0, fps=FPS)
+
+    assert [s["name"] for s in segments] == ["clip_1", "clip_2", "clip_3"]
+    # Cada grupo dura su duración redondeada al frame (1/30 s), no al GOP de 1 s:
+    # 4.21 s = 126 frames, 3.56 s = 107 frames, 4 s = 120 frames
+    assert [round(s["start"] * FPS, 6) for s in segments] == [0, 126, 233]
+    assert round(segments[-1]["end"] * FPS, 6) == 353
+    for prev, cur in zip(segments, segments[1:]):
+        assert prev["end"] == cur["start"]
+    # Sin restos de los vecinos: cada clip empieza en 0 y dura como mucho medio frame de más o de menos
+    for seg in segments:
+        assert all(c["inpoint"] == 0.0 for c in seg["clips"])
+        assert sum(c["length"] for c in seg["clips"]) == pytest.approx(
+            seg["end"] - seg["start"], abs=0.5 / FPS)
+
+
+def test_each_segment_only_holds_its_own_group(media_durations):
+    media_durations(smart_render, {"a": 2.0, "b": 2.0, "c": 3.0, "d": 4.0})
+    groups = [("clip_1", ["a", "b"]), ("clip_2", ["c"]), ("clip_3", ["d"])]
+
+    segments = plan_segments(groups, 11.0, fps=FPS)
+
+    assert [[c["path"] for c in s["clips"]] for s in segments] == [["a", "b"], ["c"], ["d"]]
+
+
+def test_duration_shorter_than_timeline_truncates_last_group(media_durations):
+    media_durations(smart_render, {"a": 2.0, "b": 5.0})
+
+    segments = plan_segments([("clip_1", ["a"]), ("clip_2", ["b"])], 4.5, fps=FPS)
+
+    assert segments[-1]["end"] == 4.5
+    assert segments[-1]["clips"] == [{"path": "b", "inpoint": 0.0, "length": 2.5}]
+
+
+def test_head_and_tail_are_split_off(media_durations):
+    media_durations(smart_render, {"a": 4.0, "b": 6.0})
+
+    segments = plan_segments([("clip_1", ["a"]), ("clip_2", ["b"])], 10.0,
+                             head=1.5, tail=2.0, fps=FPS)
+
+    assert [(s["name"], s["start"], s["end"]) for s in segments] == [
+        ("head", 0.0, 1.5), ("clip_1", 1.5, 4.0), ("clip_2", 4.0, 8.0), ("tail", 8.0, 10.0),
+    ]
+    assert segments[1]["clips"] == [{"path": "a", "inpoint": 1.5, "length": 2.5}]
+
+
+def test_swapping_one_clip_keeps_the_other_segments(media_durations, clips):
+    a, b, c, c2, d = clips("a", "b", "c", "c2", "d")
+    index = media_durations(smart_render, {a: 2.3, b: 1.91, c: 3.55, c2: 3.55, d: 4.0})
+
+    before = plan_segments([("clip_1", [a, b]), ("clip_2", [c]), ("clip_3", [d])], 11.76, fps=FPS)
+    after = plan_segments([("clip_1", [a, b]), ("clip_2", [c2]), ("clip_3", [d])], 11.76, fps=FPS)
+
+    keys_before, keys_after = _keys(before), _keys(after)
+    assert keys_before["clip_1"] == keys_after["clip_1"]
+    assert keys_before["clip_2"] != keys_after["clip_2"]
+    assert keys_before["clip_3"] == keys_after["clip_3"]
+
+    # Aunque el clip nuevo dure otra cosa, el segmento siguiente no cambia de contenido
+    index.durations[c2] = 2.0
+    shorter = plan_segments([("clip_1", [a, b]), ("clip_2", [c2]), ("clip_3", [d])], 10.21, fps=FPS)
+    assert _keys(shorter)["clip_1"] == keys_before["clip_1"]
+    assert _keys(shorter)["clip_3"] == keys_before["clip_3"]
@@ -0,0 +1,135 @@
+"""
+Tests de map_timings_to_script y generate_ass
+"""
+from modules.subtitles import map_timings_to_script, generate_ass, format_ass_time
+
+
+def _words(text):
+    return text.split()
+
+
+def _recognized(*items):
+    return [{"word": w, "start": s, "end": e} for w, s, e in items]
+
+
+def _assert_monotonic(timings):
+    for prev, cur in zip(timings, timings[1:]):
+        assert prev["start"] <= prev["end"] <= cur["start"] + 1e-9
+
+
+def test_exact_match_keeps_recognized_timings():
+    script = _words("Hola, mundo cruel.")
+    recognized = _recognized(("hola", 0.0, 0.4), ("mundo", 0.5, 0.9), ("cruel", 1.0, 1.5))
+
+    timings = map_timings_to_script(script, recognized)
+
+    # Texto del guion (con puntuación), tiempos del reconocimiento
+    assert [t["word"] for t in timings] == script
+    assert [(t["start"], t["end"]) for t in timings] == [(0.0, 0.4), (0.5, 0.9), (1.0, 1.5)]
+
+
+def test_missing_word_is_interpolated_between_neighbours():
+    script = _words("uno dos tres")
+    recognized = _recognized(("uno", 0.0, 0.5), ("tres", 1.5, 2.0))
+
+    timings = map_timings_to_script(script, recognized)
+
+    assert len(timings) == 3
+    assert timings[1]["word"] == "dos"
+    assert (timings[1]["start"], timings[1]["end"]) == (0.5, 1.5)
+    _assert_monotonic(timings)
+
+
+def test_extra_recognized_words_are_ignored():
+    script = _words("uno tres")
+    recognized = _recognized(("uno", 0.0, 0.5), ("eh", 0.6, 0.8), ("tres", 1.0, 1.4))
+
+    timings = map_timings_to_script(script, recognized)
+
+    assert [t["word"] for t in timings] == script
+    assert (timings[1]["start"], timings[1]["end"]) == (1.0, 1.4)
+
+
+def test_replaced_words_share_the_recognized_span():
+    script = _words("el gato negro")
+    recognized = _recognized(("el", 0.0, 0.2), ("pato", 0.3, 0.6), ("bueno", 0.6, 1.2))
+
+    timings = map_timings_to_script(script, recognized)
+
+    assert timings[0]["end"] == 0.2
+    # "gato negro" cubre exactamente [0.3, 1.2], repartido por longitud
+    assert timings[1]["start"] == 0.3
+    assert abs(timings[2]["end"] - 1.2) < 1e-9
+    assert abs((timings[1]["end"] - 0.3) / (1.2 - 0.3) - 4 / 9) < 1e-9
+    _assert_monotonic(timings)
+
+
+def test_trailing_words_stretch_to_total_duration():
+    script = _words("uno dos tres")
+    recognized = _recognized(("uno", 0.0, 0.5))
+
+    timings = map_timings_to_script(script, recognized, total_duration=3.0)
+
+    assert timings[1]["start"] == 0.5
+    assert abs(timings[-1]["end"] - 3.0) < 1e-9
+    _assert_monotonic(timings)
+
+
+def test_nothing_recognized_spreads_over_duration():
+    script = _words("a bb ccc")
+
+    timings = map_timings_to_script(script, [], total_duration=6.0)
+
+    assert [t["word"] for t in timings] == script
+    assert timings[0]["start"] == 0.0
+    assert abs(timings[-1]["end"] - 6.0) < 1e-9
+    # Proporcional a la longitud de cada palabra
+    assert abs(timings[0]["end"] - 1.0) < 1e-9
+    _assert_monotonic(timings)
+
+
+def test_punctuation_only_tokens_are_skipped():
+    script = _words("sí señor")
+    recognized = _recognized(("sí", 0.0, 0.3), ("...", 0.3, 0.4), ("señor", 0.5, 1.0))
+
+    timings = map_timings_to_script(script, recognized)
+
+    assert [(t["start"], t["end"]) for t in timings] == [(0.0, 0.3), (0.5, 1.0)]
+
+
+def _dialogues(path):
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line.startswith("Dialogue:")]
+
+
+def test_generate_ass_groups_phrases_with_karaoke(tmp_path):
+    timings = _recognized(
+        ("Uno", 0.0, 0.4), ("dos", 0.5, 0.9), ("tres.", 1.0, 1.4),
+        ("Cuatro", 1.5, 2.0),
+    )
+    path = generate_ass(timings, str(tmp_path / "subs.ass"), style={"words_per_phrase": 4})
+
+    dialogues = _dialogues(path)
+    # La frase se corta en el punto final
+    assert len(dialogues) == 2
+    assert dialogues[0].startswith(f"Dialogue: 0,{format_ass_time(0.0)},{format_ass_time(1.4)},")
+    # Cada palabra se ilumina hasta que empieza la siguiente (centésimas)
+    assert "{\\k50}Uno {\\k50}dos {\\k40}tres." in dialogues[0]
+    assert dialogues[1].endswith("{\\k50}Cuatro")
+
+
+def test_generate_ass_splits_on_long_pause_and_escapes_braces(tmp_path):
+    timings = _recognized(("{hola}", 0.0, 0.4), ("mundo", 2.0, 2.5))
+    path = generate_ass(timings, str(tmp_path / "subs.ass"), karaoke=False)
+
+    dialogues = _dialogues(path)
+    assert len(dialogues) == 2
+    assert dialogues[0].endswith("(hola)")
+    assert dialogues[1].startswith(f"Dialogue: 0,{format_ass_time(2.0)},{format_ass_time(2.5)},")
+
+
+def test_format_ass_time():
+    assert format_ass_time(0) == "0:00:00.00"
+    assert format_ass_time(61.257) == "0:01:01.26"
+    assert format_ass_time(3600.5) == "1:00:00.50"
+    assert format_ass_time(-1) == "0:00:00.00"
@@ -0,0 +1,65 @@
+"""
+Tests de cached_text: un PNG por contenido y expulsión LRU por número de entradas
+"""
+import os
+
+import pytest
+from PIL import Image
+
+from modules import text_raster
+from modules.text_raster import cached_text, text_key
+
+
+@pytest.fixture
+def text_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "text_cache"
+    monkeypatch.setitem(text_raster.TEXT_CACHE_CONFIG, "dir", str(cache_dir))
+    monkeypatch.setitem(text_raster.TEXT_CACHE_CONFIG, "max_entries", 2)
+    return cache_dir
+
+
+def _age(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+def test_same_text_is_drawn_once(text_cache, monkeypatch):
+    first = cached_text("Suscríbete", 40, stroke_color="black", stroke_width=2)
+    with Image.open(first) as image:
+        assert image.mode == "RGBA"
+
+    calls = []
+    monkeypatch.setattr(text_raster, "render_text", lambda *a, **k: calls.append(a))
+    assert cached_text("Suscríbete", 40, stroke_color="black", stroke_width=2) == first
+    assert calls == []
+
+
+def test_key_ignores_stroke_width_without_stroke_color():
+    assert text_key("hola", 40, stroke_width=3) == text_key("hola", 40)
+    assert text_key("hola", 40, stroke_color="black", stroke_width=3) != text_key("hola", 40)
+    assert text_key("hola", 40) != text_key("hola", 41)
+
+
+def test_least_recently_used_png_is_evicted(text_cache):
+    a = cached_text("a", 30)
+    b = cached_text("b", 30)
+    _age(a, 100)
+    _age(b, 200)
+
+    # Un acierto renueva "a": al entrar "c" sale "b"
+    cached_text("a", 30)
+    c = cached_text("c", 30)
+
+    assert sorted(os.listdir(text_cache)) == sorted(os.path.basename(p) for p in (a, c))
+    assert not os.path.exists(b)
+
+
+def test_temporary_files_are_not_counted_or_evicted(text_cache):
+    a = cached_text("a", 30)
+    _age(a, 100)
+    leftover = text_cache / "x.tmp.png"
+    leftover.write_bytes(b"")
+    _age(leftover, 1)
+
+    b = cached_text("b", 30)
+
+    assert os.path.exists(a) and os.path.exists(b) and leftover.exists()
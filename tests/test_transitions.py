@@ -0,0 +1,95 @@
+"""
+Tests de TransitionEngine: las mezclas enteras en el sitio frente a la
+versión float anterior (máscara de crossfadein + CompositeVideoClip)
+"""
+import numpy as np
+import pytest
+
+from modules.transitions import TransitionEngine
+
+WIDTH, HEIGHT = 16, 8
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    shape = (HEIGHT, WIDTH, 3)
+    return (rng.integers(0, 256, shape, dtype=np.uint8),
+            rng.integers(0, 256, shape, dtype=np.uint8))
+
+
+def _float_blend(a, b, opacity):
+    """Composición de MoviePy: b con opacidad sobre a, truncada a uint8"""
+    return (opacity * b.astype(np.float64) + (1 - opacity) * a.astype(np.float64)).astype(np.uint8)
+
+
+@pytest.mark.parametrize("progress", [0.0, 0.1, 0.25, 1 / 3, 0.5, 0.8, 0.99, 1.0])
+def test_crossfade_matches_float_blend(frames, progress):
+    a, b = frames
+    engine = TransitionEngine(WIDTH, HEIGHT)
+    out = np.empty_like(a)
+
+    result = engine.crossfade(a, b, progress, out)
+
+    assert result is out
+    diff = np.abs(result.astype(np.int16) - _float_blend(a, b, progress).astype(np.int16))
+    assert diff.max() <= 1
+
+
+def test_crossfade_ends_are_exact(frames):
+    a, b = frames
+    engine = TransitionEngine(WIDTH, HEIGHT)
+    out = np.empty_like(a)
+
+    assert np.array_equal(engine.crossfade(a, b, 0.0, out), a)
+    assert np.array_equal(engine.crossfade(a, b, 1.0, out), b)
+    # Fuera de rango se satura
+    assert np.array_equal(engine.crossfade(a, b, 1.5, out), b)
+
+
+def test_blend_does_not_modify_inputs(frames):
+    a, b = frames
+    a_copy, b_copy = a.copy(), b.copy()
+    engine = TransitionEngine(WIDTH, HEIGHT)
+
+    for kind in ("crossfade", "dip", "slide"):
+        engine.blend(kind, a, b, 0.4, np.empty_like(a))
+
+    assert np.array_equal(a, a_copy)
+    assert np.array_equal(b, b_copy)
+
+
+@pytest.mark.parametrize("progress", [0.0, 0.2, 0.45, 0.5, 0.7, 1.0])
+def test_dip_matches_float_fade_to_black(frames, progress):
+    a, b = frames
+    engine = TransitionEngine(WIDTH, HEIGHT)
+    black = np.zeros_like(a)
+
+    result = engine.dip(a, b, progress, np.empty_like(a))
+
+    if progress < 0.5:
+        expected = _float_blend(black, a, 1 - 2 * progress)
+    else:
+        expected = _float_blend(black, b, 2 * progress - 1)
+    diff = np.abs(result.astype(np.int16) - expected.astype(np.int16))
+    assert diff.max() <= 1
+
+
+def test_slide_pushes_a_out_to_the_left(frames):
+    a, b = frames
+    engine = TransitionEngine(WIDTH, HEIGHT)
+    out = np.empty_like(a)
+
+    assert np.array_equal(engine.slide(a, b, 0.0, out), a)
+    assert np.array_equal(engine.slide(a, b, 1.0, out), b)
+
+    result = engine.slide(a, b, 0.25, out)
+    offset = WIDTH // 4
+    assert np.array_equal(result[:, :WIDTH - offset], a[:, offset:])
+    assert np.array_equal(result[:, WIDTH - offset:], b[:, :offset])
+
+
+def test_unknown_transition_raises(frames):
+    a, b = frames
+    with pytest.raises(ValueError):
+        TransitionEngine(WIDTH, HEIGHT).blend("wipe", a, b, 0.5, np.empty_like(a))
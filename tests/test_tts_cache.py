@@ -0,0 +1,78 @@
+"""
+Tests de TTSCache: claves por contenido, aciertos y expulsión LRU
+"""
+import os
+
+from modules.tts_cache import TTSCache, make_key, normalize_text, place_file
+
+
+def _audio(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_equivalent_texts_share_the_key():
+    assert normalize_text("  Hola\n  mundo ") == "Hola mundo"
+    assert make_key("elevenlabs", "adam", "Hola  mundo") == make_key("elevenlabs", "adam", "Hola mundo\n")
+    # La forma compuesta y la descompuesta de "ñ" son el mismo texto
+    assert make_key("elevenlabs", "adam", "ni\u00f1o") == make_key("elevenlabs", "adam", "nin\u0303o")
+
+
+def test_any_request_parameter_changes_the_key():
+    base = make_key("elevenlabs", "adam", "hola", "model_a", {"stability": 0.5})
+    assert base != make_key("edge", "adam", "hola", "model_a", {"stability": 0.5})
+    assert base != make_key("elevenlabs", "carmelo", "hola", "model_a", {"stability": 0.5})
+    assert base != make_key("elevenlabs", "adam", "hola", "model_b", {"stability": 0.5})
+    assert base != make_key("elevenlabs", "adam", "hola", "model_a", {"stability": 0.6})
+
+
+def test_put_then_get_restores_audio_and_timings(tmp_path):
+    cache = TTSCache(str(tmp_path / "cache"), max_mb=1)
+    timings = [{"word": "hola", "start": 0.0, "end": 0.4}]
+    cache.put("k1", _audio(tmp_path, "gen.mp3", b"audio"), timings, text="hola")
+
+    out = str(tmp_path / "out.mp3")
+    assert cache.get("k1", out) == (out, timings)
+    assert open(out, "rb").read() == b"audio"
+    assert cache.get("otra", out) is None
+
+
+def test_entry_without_timings_misses_when_they_are_needed(tmp_path):
+    cache = TTSCache(str(tmp_path / "cache"), max_mb=1)
+    cache.put("k1", _audio(tmp_path, "gen.mp3", b"audio"))
+    out = str(tmp_path / "out.mp3")
+
+    assert cache.get("k1", out, need_timings=True) is None
+    assert cache.get("k1", out) == (out, None)
+
+
+def test_output_is_a_copy_not_a_link(tmp_path):
+    cache = TTSCache(str(tmp_path / "cache"), max_mb=1)
+    cache.put("k1", _audio(tmp_path, "gen.mp3", b"audio"))
+    out = str(tmp_path / "out.mp3")
+    cache.get("k1", out)
+
+    # Sobrescribir la salida en el sitio no toca la entrada del cache
+    with open(out, "wb") as f:
+        f.write(b"otro")
+    assert cache.get("k1", out) == (out, None)
+    assert open(out, "rb").read() == b"audio"
+
+    place_file(out, out)  # misma ruta: no hace nada
+    assert os.path.exists(out)
+
+
+def test_least_recently_used_audio_is_evicted(tmp_path):
+    cache = TTSCache(str(tmp_path / "cache"), max_mb=1)
+    cache.max_bytes = 25
+    for i, key in enumerate(["a", "b"]):
+        cache.put(key, _audio(tmp_path, f"{key}.mp3", b"x" * 10))
+        os.utime(os.path.join(cache.cache_dir, f"{key}.mp3"), (100 + i, 100 + i))
+
+    # "a" se usa: pasa a ser la más reciente
+    cache.get("a", str(tmp_path / "out.mp3"))
+    cache.put("c", _audio(tmp_path, "c.mp3", b"x" * 10))
+
+    names = sorted(os.listdir(cache.cache_dir))
+    assert names == ["a.json", "a.mp3", "c.json", "c.mp3"]
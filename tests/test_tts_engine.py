@@ -0,0 +1,37 @@
+"""
+Tests de is_elevenlabs_outage: qué errores apagan ElevenLabs para los demás motores
+"""
+import pytest
+import requests
+
+from modules.tts_engine import is_elevenlabs_outage
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ConnectionError("sin red"),
+    requests.exceptions.ConnectTimeout("timeout"),
+    requests.exceptions.ReadTimeout("timeout"),
+    _http_error(500),
+    _http_error(503),
+    _http_error(401),
+])
+def test_outages_mark_the_provider_down(error):
+    assert is_elevenlabs_outage(error)
+
+
+@pytest.mark.parametrize("error", [
+    _http_error(400),
+    _http_error(422),
+    _http_error(429),
+    requests.exceptions.HTTPError("sin respuesta"),
+    ValueError("JSON inválido"),
+    KeyError("audio_base64"),
+])
+def test_request_errors_do_not(error):
+    assert not is_elevenlabs_outage(error)
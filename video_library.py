@@ -6,6 +6,7 @@ Comandos:
     python video_library.py list              # Ver videos en biblioteca
     python video_library.py add [N]           # Generar N clips nuevos (default: 3)
     python video_library.py short             # Crear short aleatorio de 30s
+    python video_library.py ingest            # Crear copias mezzanine normalizadas
     python video_library.py clean             # Limpiar videos temporales
 """
 import os
@@ -18,6 +19,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from modules.image_generator import ImageGenerator
+from modules.media_index import get_media_index
+from modules.mezzanine import mezzanines_for, concat_copy, ensure_mezzanine, ingest_library
+from modules.frame_sink import encode_frames, clip_frames
 from config import OUTPUT_DIR, TEMP_DIR, ASSETS_DIR
 
 # Directorio de la biblioteca de videos
@@ -27,7 +31,7 @@ os.makedirs(LIBRARY_DIR, exist_ok=True)
 
 def list_library():
     """Lista todos los videos en la biblioteca"""
-    videos = glob.glob(os.path.join(LIBRARY_DIR, "*.mp4"))
+    videos = get_media_index().list_directory(LIBRARY_DIR)
     
     print("\n📚 BIBLIOTECA DE VIDEOS")
     print("=" * 50)
@@ -37,15 +41,12 @@ def list_library():
         return
     
     total_duration = 0
-    for i, v in enumerate(sorted(videos), 1):
-        from moviepy.editor import VideoFileClip
-        clip = VideoFileClip(v)
-        duration = clip.duration
-        clip.close()
+    for i, v in enumerate(videos, 1):
+        duration = v["duration"]
         total_duration += duration
         
-        name = os.path.basename(v)
-        print(f"   {i}. {name} ({duration:.1f}s)")
+        name = os.path.basename(v["path"])
+        print(f"   {i}. {name} ({duration:.1f}s, {v['width']}x{v['height']} @ {v['fps']:.0f}fps)")
     
     print("=" * 50)
     print(f"   Total: {len(videos)} videos ({total_duration:.0f}s)")
@@ -83,6 +84,7 @@ def add_to_library(count: int = 3):
             lib_name = f"epic_{timestamp}_{i+1}.mp4"
             lib_path = os.path.join(LIBRARY_DIR, lib_name)
             shutil.copy2(video_path, lib_path)
+            ensure_mezzanine(lib_path)
             print(f"   ✅ Guardado: {lib_name}")
         else:
             print("   ❌ Error animando")
@@ -96,7 +98,7 @@ def create_short():
     """Crea un short de 30s con videos aleatorios de la biblioteca"""
     from moviepy.editor import VideoFileClip, concatenate_videoclips
     
-    videos = glob.glob(os.path.join(LIBRARY_DIR, "*.mp4"))
+    videos = get_media_index().list_directory(LIBRARY_DIR)
     
     if len(videos) < 3:
         print("❌ Necesitas al menos 3 videos en la biblioteca")
@@ -115,13 +117,25 @@ def create_short():
     for v in videos:
         if total_duration >= 30:
             break
-        selected.append(v)
-        clip = VideoFileClip(v)
-        total_duration += clip.duration
-        clip.close()
+        selected.append(v["path"])
+        total_duration += v["duration"]
     
     print(f"📽️ Videos seleccionados: {len(selected)}")
     
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = os.path.join(OUTPUT_DIR, f"random_short_{timestamp}.mp4")
+    
+    # Camino rápido: mezzanines normalizadas concatenadas sin recodificar
+    mezzanines = mezzanines_for(selected)
+    if mezzanines and concat_copy(mezzanines, output_path, duration=30):
+        for v in selected:
+            print(f"   + {os.path.basename(v)}")
+        print("\n" + "=" * 50)
+        print(f"✅ SHORT CREADO: {output_path}")
+        print(f"   ⏱️ Duración: ~30 segundos (sin recodificar)")
+        os.system(f'open "{output_path}"')
+        return
+    
     # Concatenar - resize cada clip individualmente antes
     clips = []
     for v in selected:
@@ -154,16 +168,18 @@ def create_short():
         final_clip = final_clip.subclip(0, 30)
     
     # Guardar
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = os.path.join(OUTPUT_DIR, f"random_short_{timestamp}.mp4")
-    
     print(f"\n💾 Guardando short...")
-    final_clip.write_videofile(output_path, fps=30, codec="libx264", audio=False)
+    # Frames por un pipe a ffmpeg (sin write_videofile)
+    stats = encode_frames(clip_frames(final_clip, 30), output_path, 1080, 1920, 30)
     
     for c in clips:
         c.close()
     final_clip.close()
     
+    if stats["error"]:
+        print(f"❌ No se pudo crear el short: {output_path}")
+        return
+    
     print("\n" + "=" * 50)
     print(f"✅ SHORT CREADO: {output_path}")
     print(f"   ⏱️ Duración: ~30 segundos")
@@ -211,6 +227,9 @@ def main():
     elif command == "short":
         create_short()
     
+    elif command == "ingest":
+        ingest_library(LIBRARY_DIR)
+    
     elif command == "save":
         save_current_clips()
     